@@ -1,5 +1,7 @@
-from django.contrib import admin
-from .models import IntegrationApp, WebhookSubscription, ApiRequestLog, WebhookDeliveryLog
+from django.contrib import admin, messages
+from .logbuffer import request_log_buffer
+from .models import IntegrationApp, WebhookSubscription, ApiRequestLog, WebhookDeliveryLog, WebhookOutbox
+from django.utils import timezone
 from django.utils.html import format_html
 
 
@@ -7,13 +9,14 @@ from django.utils.html import format_html
 class IntegrationAppAdmin(admin.ModelAdmin):
     change_list_template = "admin/api_dashboard.html"
     list_display = ("name", "is_active", "created_at", "masked_key", "scopes_list")
-    readonly_fields = ("api_key", "created_at")
-    search_fields = ("name", "api_key")
+    readonly_fields = ("key_prefix", "created_at")
+    search_fields = ("name", "key_prefix")
     list_filter = ("is_active",)
     filter_horizontal = ()
+    actions = ["rotate_key"]
 
     def masked_key(self, obj):
-        return f"{obj.api_key[:6]}...{obj.api_key[-4:]}"
+        return f"{obj.key_prefix}..."
 
     masked_key.short_description = "API Key"
 
@@ -21,6 +24,20 @@ class IntegrationAppAdmin(admin.ModelAdmin):
         return ", ".join(obj.scopes or [])
     scopes_list.short_description = "Escopos"
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        raw_key = getattr(obj, "raw_key", None)
+        if raw_key:
+            # Só o digest fica no banco: a chave é exibida uma única vez
+            self.message_user(request, f"API Key de {obj.name}: {raw_key} (copie agora, ela não será exibida novamente).", messages.WARNING)
+
+    @admin.action(description="Gerar nova API Key")
+    def rotate_key(self, request, queryset):
+        for app in queryset:
+            raw_key = app.set_new_key()
+            app.save(update_fields=["key_prefix", "key_digest"])
+            self.message_user(request, f"Nova API Key de {app.name}: {raw_key} (copie agora, ela não será exibida novamente).", messages.WARNING)
+
     def changelist_view(self, request, extra_context=None):
         # Usa o dashboard personalizado como lista
         context = extra_context or {}
@@ -59,13 +76,15 @@ class IntegrationAppAdmin(admin.ModelAdmin):
                 ],
                 "guide_url": "https://developer.mozilla.org/en-US/docs/Learn/Server-side/Django/Introduction",
                 "endpoints": [
-                    {"method": "GET", "path": "v1/projects/", "desc": "Lista projetos."},
+                    {"method": "GET", "path": "v1/projects/", "desc": "Lista projetos (paginação por cursor em next; aceita ?page_size= e ?fields=)."},
                     {"method": "GET", "path": "v1/tasks/", "desc": "Lista tarefas com projeto e responsável."},
                     {"method": "GET", "path": "v1/time-entries/", "desc": "Lista lançamentos de horas (timesheets)."},
+                    {"method": "GET", "path": "v1/changes/", "desc": "Feed incremental de alterações e exclusões (cursor opaco)."},
                     {"method": "GET", "path": "health/", "desc": "Ping de saúde (sem auth)."},
                     {"method": "GET", "path": "docs/", "desc": "Swagger UI da API."},
                 ],
                 "auth_header": "X-API-Key",
+                "request_log_stats": request_log_buffer.stats(),
             }
         )
         return super().changelist_view(request, extra_context=context)
@@ -141,3 +160,23 @@ class WebhookDeliveryLogAdmin(admin.ModelAdmin):
     @admin.display(description="OK?")
     def success_icon(self, obj):
         return format_html('<span style="color:{};">{}</span>', "#16a34a" if obj.success else "#ef4444", "●")
+
+
+@admin.register(WebhookOutbox)
+class WebhookOutboxAdmin(admin.ModelAdmin):
+    list_display = ("event", "subscription", "status", "attempts", "next_attempt_at", "last_error", "created_at")
+    list_filter = ("status", "event")
+    search_fields = ("subscription__target_url", "subscription__app__name", "last_error")
+    readonly_fields = ("subscription", "event", "body", "status", "attempts", "next_attempt_at", "locked_until", "last_error", "created_at", "delivered_at")
+    ordering = ("-created_at",)
+    actions = ["requeue"]
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description="Reenfileirar para nova tentativa")
+    def requeue(self, request, queryset):
+        count = queryset.exclude(status=WebhookOutbox.Status.DELIVERED).update(
+            status=WebhookOutbox.Status.PENDING, attempts=0, next_attempt_at=timezone.now(), locked_until=None,
+        )
+        self.message_user(request, f"{count} item(ns) reenfileirado(s).")
@@ -1,8 +1,96 @@
+import threading
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import caches
 from rest_framework.authentication import BaseAuthentication
 from rest_framework import exceptions
 from .models import IntegrationApp
 
 
+@dataclass(frozen=True)
+class AppRecord:
+    """Snapshot imutável de uma IntegrationApp usado como ``request.auth``."""
+    id: int
+    name: str
+    is_active: bool
+    scopes: frozenset
+
+    @property
+    def pk(self):
+        return self.id
+
+    @classmethod
+    def from_app(cls, app):
+        return cls(id=app.pk, name=app.name, is_active=app.is_active, scopes=frozenset(app.scopes or []))
+
+
+class APIKeyCache:
+    """
+    Cache digest da chave -> AppRecord em dois níveis.
+
+    O nível local (dict do processo, TTL ``API_KEY_CACHE_TTL``) resolve as
+    chaves quentes sem I/O; o nível compartilhado opcional (alias de cache em
+    ``API_KEY_SHARED_CACHE``) evita ir ao banco quando outro processo já
+    resolveu a chave. Alterações na app invalidam os dois níveis via signals;
+    outros processos enxergam a mudança em até ``API_KEY_CACHE_TTL`` segundos.
+    Chaves inválidas não são cacheadas.
+    """
+    key_format = "api:app:%s"
+
+    def __init__(self):
+        self._local = {}
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self):
+        return getattr(settings, "API_KEY_CACHE_TTL", 30)
+
+    @property
+    def shared(self):
+        alias = getattr(settings, "API_KEY_SHARED_CACHE", None)
+        return caches[alias] if alias else None
+
+    def get(self, digest):
+        hit = self._local.get(digest)
+        if hit and hit[0] > time.monotonic():
+            return hit[1]
+
+        record = None
+        shared = self.shared
+        if shared is not None:
+            record = shared.get(self.key_format % digest)
+        if record is None:
+            app = IntegrationApp.objects.filter(key_digest=digest).first()
+            if app is None:
+                return None
+            record = AppRecord.from_app(app)
+            if shared is not None:
+                shared.set(self.key_format % digest, record, getattr(settings, "API_KEY_SHARED_CACHE_TTL", 300))
+
+        with self._lock:
+            self._local[digest] = (time.monotonic() + self.ttl, record)
+        return record
+
+    def invalidate(self, *digests):
+        shared = self.shared
+        with self._lock:
+            for digest in digests:
+                if not digest:
+                    continue
+                self._local.pop(digest, None)
+                if shared is not None:
+                    shared.delete(self.key_format % digest)
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+
+
+api_key_cache = APIKeyCache()
+
+
 class APIKeyAuthentication(BaseAuthentication):
     """
     Autenticação por API Key via header X-API-Key.
@@ -14,9 +102,8 @@ class APIKeyAuthentication(BaseAuthentication):
         if not api_key:
             return None
 
-        try:
-            app = IntegrationApp.objects.get(api_key=api_key, is_active=True)
-        except IntegrationApp.DoesNotExist:
+        app = api_key_cache.get(IntegrationApp.hash_key(api_key))
+        if app is None or not app.is_active:
             raise exceptions.AuthenticationFailed("API Key inválida ou inativa.")
 
         # Usuário anônimo representando a app; permissões adicionais podem ser aplicadas depois
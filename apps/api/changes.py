@@ -0,0 +1,102 @@
+import base64
+import math
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from apps.projects.models import Project, Issue
+from apps.timesheet.models import TimeEntry
+from .models import ChangeLogEntry
+from .serializers import ProjectSerializer, IssueSerializer, TimeEntrySerializer
+
+# recurso -> (queryset, serializer, escopo de leitura exigido)
+FEED_RESOURCES = {
+    "project": (Project.objects.all(), ProjectSerializer, "projects:read"),
+    "issue": (Issue.objects.select_related("project", "assigned_to"), IssueSerializer, "issues:read"),
+    "timeentry": (TimeEntry.objects.select_related("project", "task", "timesheet__user"), TimeEntrySerializer, "timeentries:read"),
+}
+
+CURSOR_PREFIX = "c1:"
+
+
+def encode_cursor(last_id):
+    return base64.urlsafe_b64encode(f"{CURSOR_PREFIX}{last_id}".encode("ascii")).decode("ascii")
+
+
+def decode_cursor(raw):
+    """Retorna o último id já entregue; ``ValueError`` se o cursor for inválido."""
+    if not raw:
+        return 0
+    try:
+        value = base64.urlsafe_b64decode(raw.encode("ascii")).decode("ascii")
+    except Exception:
+        raise ValueError("cursor inválido")
+    if not value.startswith(CURSOR_PREFIX):
+        raise ValueError("cursor inválido")
+    return int(value[len(CURSOR_PREFIX):])
+
+
+def read_changes(resources, after_id, limit, context=None):
+    """
+    Lê até ``limit`` registros do change log após ``after_id``.
+
+    Várias alterações do mesmo objeto na página viram uma só (a última);
+    upserts são hidratados com o serializer do recurso (uma query por
+    recurso) e objetos que já não existem saem como exclusão.
+
+    Registros gravados há menos de ``CHANGE_FEED_LAG_SECONDS`` ainda não são
+    entregues. É uma heurística, não uma garantia: ``changed_at`` é o momento
+    do INSERT, então uma transação que confirma mais de ``LAG`` segundos depois
+    de gravar seus registros pode ter os ids pulados por clientes que já
+    avançaram o cursor. O SQLite serializa as escritas e não tem esse
+    problema; no PostgreSQL escolha um lag maior que a transação mais longa
+    que grava no change log.
+
+    Retorna ``(changes, last_id, has_more, retry_after)``. Quando registros são
+    retidos pelo lag, ``has_more`` é falso e ``retry_after`` diz em quantos
+    segundos o próximo fica disponível (None caso contrário).
+    """
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, "CHANGE_FEED_LAG_SECONDS", 5))
+    rows = list(
+        ChangeLogEntry.objects.filter(id__gt=after_id, resource__in=resources)
+        .order_by("id")[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    retry_after = None
+    for index, row in enumerate(rows):
+        if row.changed_at > cutoff:
+            rows = rows[:index]
+            # Re-polling right away would only get the same held-back rows
+            has_more = False
+            retry_after = max(1, math.ceil((row.changed_at - cutoff).total_seconds()))
+            break
+
+    latest = OrderedDict()
+    for row in rows:
+        key = (row.resource, row.object_id)
+        latest.pop(key, None)
+        latest[key] = row.action
+
+    data = {}
+    for resource in resources:
+        ids = [obj_id for (res, obj_id), action in latest.items() if res == resource and action == ChangeLogEntry.Action.UPSERT]
+        if not ids:
+            continue
+        queryset, serializer_class, _ = FEED_RESOURCES[resource]
+        for item in serializer_class(queryset.filter(pk__in=ids), many=True, context=context or {}).data:
+            data[(resource, item["id"])] = item
+
+    changes = []
+    for key, action in latest.items():
+        item = data.get(key) if action == ChangeLogEntry.Action.UPSERT else None
+        changes.append({
+            "resource": key[0],
+            "id": key[1],
+            "action": action if item is not None else ChangeLogEntry.Action.DELETE,
+            "data": item,
+        })
+    last_id = rows[-1].id if rows else after_id
+    return changes, last_id, has_more, retry_after
@@ -0,0 +1,111 @@
+import atexit
+import logging
+import random
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class RequestLogBuffer:
+    """
+    Buffer circular em memória para ApiRequestLog, gravado em lote por uma thread.
+
+    ``add`` apenas enfileira (sem I/O); a thread de gravação faz ``bulk_create``
+    quando há ``batch_size`` registros ou a cada ``flush_interval_ms``. Com o
+    buffer cheio o registro mais antigo é descartado e contado em ``dropped``.
+    Requisições 2xx são amostradas por ``sample_rate``; erros sempre entram.
+    """
+
+    def __init__(self, capacity=10000, batch_size=200, flush_interval_ms=1000, sample_rate=1.0):
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.sample_rate = sample_rate
+        self._records = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self.enqueued = 0
+        self.dropped = 0
+        self.sampled_out = 0
+        self.written = 0
+        self.failed = 0
+
+    def add(self, record):
+        """Enfileira ``record`` (kwargs de ApiRequestLog). Retorna False se foi descartado pela amostragem."""
+        if 200 <= record["status_code"] < 300 and self.sample_rate < 1 and random.random() >= self.sample_rate:
+            with self._lock:
+                self.sampled_out += 1
+            return False
+        with self._lock:
+            if len(self._records) == self.capacity:
+                self.dropped += 1
+            self._records.append(record)
+            self.enqueued += 1
+            pending = len(self._records)
+        self._ensure_started()
+        if pending >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def flush(self):
+        """Grava tudo o que está no buffer. Retorna o número de registros gravados."""
+        from .models import ApiRequestLog
+
+        with self._flush_lock:
+            with self._lock:
+                records = list(self._records)
+                self._records.clear()
+            if not records:
+                return 0
+            try:
+                ApiRequestLog.objects.bulk_create([ApiRequestLog(**r) for r in records], batch_size=self.batch_size)
+            except Exception:
+                self.failed += len(records)
+                logger.exception("Falha ao gravar %s log(s) de requisição da API", len(records))
+                return 0
+            self.written += len(records)
+            return len(records)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": len(self._records),
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "dropped": self.dropped,
+                "sampled_out": self.sampled_out,
+                "failed": self.failed,
+            }
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="api-request-log-flusher", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            close_old_connections()
+            self.flush()
+
+
+request_log_buffer = RequestLogBuffer(
+    capacity=getattr(settings, "API_LOG_BUFFER_SIZE", 10000),
+    batch_size=getattr(settings, "API_LOG_BATCH_SIZE", 200),
+    flush_interval_ms=getattr(settings, "API_LOG_FLUSH_INTERVAL_MS", 1000),
+    sample_rate=getattr(settings, "API_LOG_SAMPLE_RATE", 1.0),
+)
+
+# Grava o que restou no buffer quando o worker encerra
+atexit.register(request_log_buffer.flush)
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.api import webhooks
+
+
+class Command(BaseCommand):
+    help = "Drena a fila de webhooks (WebhookOutbox) com pool de threads, backoff e descarte após o limite de tentativas."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Processa os itens vencidos e encerra.")
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--workers", type=int, default=8, help="Threads de envio.")
+        parser.add_argument("--per-target", type=int, default=2, help="Envios simultâneos por host de destino.")
+        parser.add_argument("--timeout", type=int, default=webhooks.REQUEST_TIMEOUT, help="Timeout HTTP (s).")
+        parser.add_argument("--max-attempts", type=int, default=webhooks.MAX_ATTEMPTS)
+        parser.add_argument("--backoff-base", type=int, default=webhooks.BACKOFF_BASE, help="Atraso inicial (s).")
+        parser.add_argument("--backoff-max", type=int, default=webhooks.BACKOFF_MAX, help="Atraso máximo (s).")
+        parser.add_argument("--poll-interval", type=float, default=2.0, help="Espera quando a fila está vazia (s).")
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING("Processando fila de webhooks..."))
+        totals = {"delivered": 0, "retrying": 0, "dead": 0, "lost": 0}
+        lease = webhooks.batch_lease(options["batch_size"], options["per_target"], options["timeout"])
+        try:
+            while True:
+                items = webhooks.claim_batch(options["batch_size"], lease)
+                if not items:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll_interval"])
+                    continue
+                stats = webhooks.process_batch(
+                    items,
+                    workers=options["workers"],
+                    per_target=options["per_target"],
+                    timeout=options["timeout"],
+                    max_attempts=options["max_attempts"],
+                    backoff_base=options["backoff_base"],
+                    backoff_max=options["backoff_max"],
+                )
+                for key, value in stats.items():
+                    totals[key] += value
+                self.stdout.write(
+                    f" - lote: {len(items)} | entregues {stats['delivered']} | reagendados {stats['retrying']} | descartados {stats['dead']} | reserva perdida {stats['lost']}"
+                )
+        except KeyboardInterrupt:
+            self.stdout.write("Interrompido.")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Concluído. Entregues {totals['delivered']}, reagendados {totals['retrying']}, descartados {totals['dead']}, reserva perdida {totals['lost']}."
+        ))
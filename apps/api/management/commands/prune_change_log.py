@@ -0,0 +1,18 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.api.models import ChangeLogEntry
+
+
+class Command(BaseCommand):
+    help = "Remove registros antigos do feed de alterações (ChangeLogEntry)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=90, help="Mantém os registros dos últimos N dias.")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        deleted, _ = ChangeLogEntry.objects.filter(changed_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f"Concluído. {deleted} registro(s) removido(s)."))
@@ -1,11 +1,14 @@
 import time
 from django.utils.deprecation import MiddlewareMixin
-from .models import ApiRequestLog, IntegrationApp
+from .logbuffer import request_log_buffer
 
 
 class ApiRequestLogMiddleware(MiddlewareMixin):
     """
     Registra requisições da API (rota /api/...), associando à IntegrationApp quando presente.
+
+    Os registros vão para um buffer em memória gravado em lote (ver logbuffer),
+    sem INSERT no caminho da requisição.
     """
 
     def process_request(self, request):
@@ -15,40 +18,34 @@ class ApiRequestLogMiddleware(MiddlewareMixin):
         path = request.path
         if not path.startswith("/api/"):
             return response
-
-        duration_ms = None
-        if hasattr(request, "_api_start"):
-            duration_ms = int((time.time() - request._api_start) * 1000)
-
-        app = getattr(request, "auth", None)
-        ApiRequestLog.objects.create(
-            app=app if isinstance(app, IntegrationApp) else None,
-            method=request.method,
-            path=path,
-            status_code=response.status_code,
-            duration_ms=duration_ms,
-            remote_ip=self._get_ip(request),
-        )
+        # Já registrado por process_exception
+        if getattr(request, "_api_logged", False):
+            return response
+        request_log_buffer.add(self._record(request, response.status_code))
         return response
 
     def process_exception(self, request, exception):
         path = request.path
         if not path.startswith("/api/"):
             return None
-        app = getattr(request, "auth", None)
+        request_log_buffer.add(self._record(request, 500, error_message=str(exception)[:500]))
+        request._api_logged = True
+        return None
+
+    def _record(self, request, status_code, error_message=""):
         duration_ms = None
         if hasattr(request, "_api_start"):
             duration_ms = int((time.time() - request._api_start) * 1000)
-        ApiRequestLog.objects.create(
-            app=app if isinstance(app, IntegrationApp) else None,
-            method=request.method,
-            path=path,
-            status_code=500,
-            duration_ms=duration_ms,
-            remote_ip=self._get_ip(request),
-            error_message=str(exception)[:500],
-        )
-        return None
+        app = getattr(request, "auth", None)
+        return {
+            "app_id": getattr(app, "pk", None),
+            "method": request.method,
+            "path": request.path[:255],
+            "status_code": status_code,
+            "duration_ms": duration_ms,
+            "remote_ip": self._get_ip(request),
+            "error_message": error_message,
+        }
 
     def _get_ip(self, request):
         xff = request.META.get("HTTP_X_FORWARDED_FOR")
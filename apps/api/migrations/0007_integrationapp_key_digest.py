@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:20
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def hash_existing_keys(apps, schema_editor):
+    IntegrationApp = apps.get_model('api', 'IntegrationApp')
+    for app in IntegrationApp.objects.all():
+        app.key_prefix = app.api_key[:6]
+        app.key_digest = hashlib.sha256(app.api_key.encode('utf-8')).hexdigest()
+        app.save(update_fields=['key_prefix', 'key_digest'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_webhookoutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='integrationapp',
+            name='key_prefix',
+            field=models.CharField(blank=True, editable=False, max_length=8),
+        ),
+        migrations.AddField(
+            model_name='integrationapp',
+            name='key_digest',
+            field=models.CharField(editable=False, max_length=64, null=True),
+        ),
+        migrations.RunPython(hash_existing_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='integrationapp',
+            name='key_digest',
+            field=models.CharField(editable=False, max_length=64, unique=True),
+        ),
+        migrations.RemoveField(
+            model_name='integrationapp',
+            name='api_key',
+        ),
+    ]
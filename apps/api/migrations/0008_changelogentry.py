@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_integrationapp_key_digest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogEntry',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('resource', models.CharField(max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('action', models.CharField(choices=[('upsert', 'Criado/alterado'), ('delete', 'Excluído')], max_length=10)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Registro de alteração',
+                'verbose_name_plural': 'Registros de alteração',
+                'indexes': [models.Index(fields=['resource', 'id'], name='api_changel_resourc_9a3c13_idx'), models.Index(fields=['changed_at'], name='api_changel_changed_0dbe04_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_changelogentry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='apirequestlog',
+            index=models.Index(fields=['created_at'], name='api_apirequ_created_5a817e_idx'),
+        ),
+    ]
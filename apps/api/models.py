@@ -1,5 +1,9 @@
+import hashlib
 import secrets
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from apps.timesheet.signals import time_entries_bulk_saved
 from django.utils import timezone
 
 
@@ -7,7 +11,9 @@ class IntegrationApp(models.Model):
     """Cliente externo autorizado a usar a API via API Key."""
 
     name = models.CharField(max_length=150, unique=True)
-    api_key = models.CharField(max_length=64, unique=True, editable=False)
+    # A chave em texto puro só existe na criação/rotação; guardamos o SHA-256
+    key_prefix = models.CharField(max_length=8, editable=False, blank=True)
+    key_digest = models.CharField(max_length=64, unique=True, editable=False)
     is_active = models.BooleanField(default=True)
     scopes = models.JSONField(default=list, blank=True, help_text="Lista de escopos permitidos (ex.: projects:read, issues:write)")
     created_at = models.DateTimeField(default=timezone.now, editable=False)
@@ -16,15 +22,35 @@ class IntegrationApp(models.Model):
         verbose_name = "Aplicação de Integração"
         verbose_name_plural = "Aplicações de Integração"
 
+    @staticmethod
+    def hash_key(raw_key):
+        return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+    def set_new_key(self):
+        """Gera uma nova chave, guarda apenas prefixo e digest e retorna a chave em texto puro."""
+        raw_key = secrets.token_hex(32)
+        self._previous_digest = self.key_digest or None
+        self.key_prefix = raw_key[:6]
+        self.key_digest = self.hash_key(raw_key)
+        self.raw_key = raw_key
+        return raw_key
+
     def save(self, *args, **kwargs):
-        if not self.api_key:
-            self.api_key = secrets.token_hex(32)
+        if not self.key_digest:
+            self.set_new_key()
         return super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
 
 
+@receiver(post_save, sender=IntegrationApp)
+@receiver(post_delete, sender=IntegrationApp)
+def invalidate_api_key_cache(sender, instance, **kwargs):
+    from .authentication import api_key_cache
+    api_key_cache.invalidate(instance.key_digest, getattr(instance, "_previous_digest", None))
+
+
 class WebhookSubscription(models.Model):
     """Inscrição de webhook para eventos de integração."""
     EVENT_CHOICES = [
@@ -68,6 +94,9 @@ class ApiRequestLog(models.Model):
         verbose_name = "Log de requisição"
         verbose_name_plural = "Logs de requisição"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["created_at"]),
+        ]
 
     def __str__(self):
         return f"{self.method} {self.path} [{self.status_code}]"
@@ -93,3 +122,98 @@ class WebhookDeliveryLog(models.Model):
 
     def __str__(self):
         return f"{self.event} -> {self.target_url} (tentativa {self.attempt})"
+
+
+class WebhookOutbox(models.Model):
+    """Fila persistente de entregas de webhook, drenada pelo comando process_webhooks."""
+
+    class Status(models.TextChoices):
+        PENDING = "PENDING", "Pendente"
+        IN_PROGRESS = "IN_PROGRESS", "Em envio"
+        DELIVERED = "DELIVERED", "Entregue"
+        DEAD = "DEAD", "Descartada"
+
+    subscription = models.ForeignKey(WebhookSubscription, on_delete=models.CASCADE, related_name="outbox")
+    event = models.CharField(max_length=50)
+    body = models.TextField(help_text="Corpo JSON exato enviado (assinado a cada tentativa)")
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.CharField(max_length=500, blank=True)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Fila de Webhook"
+        verbose_name_plural = "Fila de Webhooks"
+        ordering = ["next_attempt_at", "id"]
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.event} -> {self.subscription_id} [{self.status}]"
+
+
+class ChangeLogEntry(models.Model):
+    """Registro de alterações (upsert/exclusão) consumido pelo feed /api/v1/changes/."""
+
+    class Action(models.TextChoices):
+        UPSERT = "upsert", "Criado/alterado"
+        DELETE = "delete", "Excluído"
+
+    id = models.BigAutoField(primary_key=True)
+    resource = models.CharField(max_length=20)
+    object_id = models.PositiveBigIntegerField()
+    action = models.CharField(max_length=10, choices=Action.choices)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Registro de alteração"
+        verbose_name_plural = "Registros de alteração"
+        indexes = [
+            models.Index(fields=["resource", "id"]),
+            models.Index(fields=["changed_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.resource}#{self.object_id} {self.action}"
+
+
+# Modelos expostos no feed de alterações: label do model -> nome do recurso
+CHANGE_FEED_RESOURCES = {
+    "projects.Project": "project",
+    "projects.Issue": "issue",
+    "timesheet.TimeEntry": "timeentry",
+}
+
+
+def _record_change(sender, instance, action):
+    resource = CHANGE_FEED_RESOURCES.get(sender._meta.label)
+    if resource:
+        ChangeLogEntry.objects.create(resource=resource, object_id=instance.pk, action=action)
+
+
+@receiver(post_save, sender="projects.Project")
+@receiver(post_save, sender="projects.Issue")
+@receiver(post_save, sender="timesheet.TimeEntry")
+def record_upsert(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _record_change(sender, instance, ChangeLogEntry.Action.UPSERT)
+
+
+@receiver(post_delete, sender="projects.Project")
+@receiver(post_delete, sender="projects.Issue")
+@receiver(post_delete, sender="timesheet.TimeEntry")
+def record_delete(sender, instance, **kwargs):
+    _record_change(sender, instance, ChangeLogEntry.Action.DELETE)
+
+
+@receiver(time_entries_bulk_saved)
+def record_bulk_time_entries(sender, entry_ids, **kwargs):
+    now = timezone.now()
+    ChangeLogEntry.objects.bulk_create([
+        ChangeLogEntry(resource="timeentry", object_id=pk, action=ChangeLogEntry.Action.UPSERT, changed_at=now)
+        for pk in entry_ids
+    ])
@@ -0,0 +1,115 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginação por cursor (keyset) sobre uma ordenação estável.
+
+    O cursor opaco guarda os valores da ordenação do último item da página;
+    a próxima página é um ``WHERE (a, b) > (x, y)`` com ``LIMIT``, então o
+    custo por página é constante, independente da profundidade. A ordenação
+    vem de ``view.cursor_ordering`` e deve terminar em um campo único (``id``).
+    Somente avanço: pensado para sincronizações incrementais página a página.
+    """
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    ordering = ("-created_at", "id")
+    invalid_cursor_message = "Cursor inválido."
+
+    @property
+    def default_page_size(self):
+        return settings.REST_FRAMEWORK.get("PAGE_SIZE") or 100
+
+    @property
+    def max_page_size(self):
+        return getattr(settings, "API_MAX_PAGE_SIZE", 1000)
+
+    def get_ordering(self, view):
+        return tuple(getattr(view, "cursor_ordering", self.ordering))
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.default_page_size))
+        except (TypeError, ValueError):
+            size = self.default_page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering_fields = self.get_ordering(view)
+        self.page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering_fields)
+
+        position = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self._after(position))
+
+        page = list(queryset[:self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        self.page = page[:self.page_size]
+        return self.page
+
+    def _after(self, position):
+        """Monta ``(a, b, ...) > (x, y, ...)`` respeitando a direção de cada campo."""
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering_fields, position):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def _field_names(self):
+        return [field.lstrip("-") for field in self.ordering_fields]
+
+    def encode_cursor(self, item):
+        values = []
+        for name in self._field_names():
+            value = getattr(item, name)
+            values.append(value.isoformat() if hasattr(value, "isoformat") else value)
+        return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii")
+
+    def decode_cursor(self, request, model):
+        raw = request.query_params.get(self.cursor_query_param)
+        if not raw:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(raw.encode("ascii")).decode("utf-8"))
+            names = self._field_names()
+            if len(values) != len(names):
+                raise ValueError
+            return [model._meta.get_field(name).to_python(value) for name, value in zip(names, values)]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("next", self.get_next_link()),
+            ("results", data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
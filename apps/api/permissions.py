@@ -20,5 +20,6 @@ class HasScope(BasePermission):
         required = getattr(view, "required_scopes", [])
         if not required:
             return True
-        scopes = set(getattr(app, "scopes", []) or [])
-        return any(scope in scopes for scope in required)
+        # AppRecord.scopes já é um frozenset pré-calculado na autenticação
+        scopes = getattr(app, "scopes", None) or frozenset()
+        return not scopes.isdisjoint(required)
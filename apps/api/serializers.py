@@ -1,9 +1,32 @@
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
 from apps.projects.models import Project, Issue
 from apps.timesheet.models import TimeEntry, Timesheet, Activity
 
 
-class ProjectSerializer(serializers.ModelSerializer):
+def requested_fields(request):
+    """Campos pedidos em ``?fields=a,b`` (somente leitura); None quando não há filtro."""
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    raw = request.query_params.get("fields")
+    if not raw:
+        return None
+    return {name.strip() for name in raw.split(",") if name.strip()} | {"id"}
+
+
+class SparseFieldsetMixin:
+    """Remove da saída os campos não pedidos em ``?fields=``."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = requested_fields(self.context.get("request"))
+        if requested:
+            for name in list(self.fields):
+                if name not in requested and not self.fields[name].write_only:
+                    self.fields.pop(name)
+
+
+class ProjectSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Project
         fields = [
@@ -22,7 +45,7 @@ class ProjectSerializer(serializers.ModelSerializer):
         ]
 
 
-class IssueSerializer(serializers.ModelSerializer):
+class IssueSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     project = serializers.PrimaryKeyRelatedField(queryset=Project.objects.all())
     assigned_to = serializers.SerializerMethodField()
     assigned_to_id = serializers.IntegerField(write_only=True, required=False, allow_null=True)
@@ -72,7 +95,7 @@ class IssueSerializer(serializers.ModelSerializer):
         return super().update(instance, validated_data)
 
 
-class TimeEntrySerializer(serializers.ModelSerializer):
+class TimeEntrySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     project = serializers.SerializerMethodField(read_only=True)
     task = serializers.SerializerMethodField(read_only=True)
     user = serializers.SerializerMethodField(read_only=True)
@@ -138,6 +161,16 @@ class TimeEntrySerializer(serializers.ModelSerializer):
             except Activity.DoesNotExist:
                 raise serializers.ValidationError({"activity_id": "Atividade não encontrada."})
 
+        # Uma célula da grade (timesheet, projeto, tarefa, atividade, data) tem um único lançamento
+        day = attrs.get("date", getattr(self.instance, "date", None))
+        cell = TimeEntry.objects.filter(
+            timesheet_id=ts_id, project_id=pr_id, task_id=task_id or None, activity_id=act_id or None, date=day,
+        )
+        if self.instance is not None:
+            cell = cell.exclude(pk=self.instance.pk)
+        if cell.exists():
+            raise serializers.ValidationError("Já existe lançamento para este projeto, tarefa e atividade nesta data.")
+
         return attrs
 
     def create(self, validated_data):
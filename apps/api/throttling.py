@@ -10,7 +10,7 @@ class APIKeyRateThrottle(SimpleRateThrottle):
     def get_cache_key(self, request, view):
         ident = None
         if getattr(request, "auth", None):
-            ident = getattr(request.auth, "api_key", None)
+            ident = f"app-{request.auth.pk}"
         if not ident:
             ident = self.get_ident(request)
-        return self.cache_key % {"scope": self.scope, "ident": ident}
+        return self.cache_format % {"scope": self.scope, "ident": ident}
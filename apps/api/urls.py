@@ -4,7 +4,7 @@ from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from rest_framework import permissions
 
-from .views import ProjectViewSet, IssueViewSet, TimeEntryViewSet, HealthView
+from .views import ProjectViewSet, IssueViewSet, TimeEntryViewSet, ChangeFeedView, HealthView
 
 router = DefaultRouter()
 router.register(r"v1/projects", ProjectViewSet, basename="api-projects")
@@ -23,6 +23,7 @@ schema_view = get_schema_view(
 
 urlpatterns = [
     path("health/", HealthView.as_view(), name="api-health"),
+    path("v1/changes/", ChangeFeedView.as_view(), name="api-changes"),
     path("docs/", schema_view.with_ui("swagger", cache_timeout=0), name="api-docs"),
     path("", include(router.urls)),
 ]
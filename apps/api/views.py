@@ -1,15 +1,19 @@
 from rest_framework import viewsets, mixins, status
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from django.conf import settings
 from django.utils.dateparse import parse_datetime, parse_date
+from django.db import transaction
 from django.db.models import Q
 
 from apps.projects.models import Project, Issue
 from apps.timesheet.models import TimeEntry
-from .serializers import ProjectSerializer, IssueSerializer, TimeEntrySerializer
+from .serializers import ProjectSerializer, IssueSerializer, TimeEntrySerializer, requested_fields
 from .models import WebhookSubscription
 from .webhooks import dispatch_event
 from .authentication import APIKeyAuthentication
+from .changes import FEED_RESOURCES, decode_cursor, encode_cursor, read_changes
 from .permissions import HasAPIKey, HasScope
 
 
@@ -18,18 +22,47 @@ class BaseAPIKeyViewSet(viewsets.GenericViewSet,
                         mixins.RetrieveModelMixin):
     authentication_classes = [APIKeyAuthentication]
     permission_classes = [HasAPIKey]
+    cursor_ordering = ("-created_at", "id")
+    # Colunas lidas por campo de saída em ?fields= (padrão: o próprio campo)
+    field_columns = {}
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        requested = requested_fields(self.request)
+        if not requested:
+            return queryset
+
+        model_fields = {f.name for f in queryset.model._meta.get_fields() if f.concrete}
+        columns = {field.lstrip("-") for field in self.cursor_ordering}
+        for name in requested:
+            if name in self.field_columns:
+                columns.update(self.field_columns[name])
+            elif name in model_fields:
+                columns.add(name)
+        relations = {column.rsplit("__", 1)[0] for column in columns if "__" in column}
+        return queryset.select_related(None).select_related(*relations).only(*columns)
 
 
 class ProjectViewSet(BaseAPIKeyViewSet):
-    queryset = Project.objects.all().order_by("-created_at")
+    queryset = Project.objects.all().order_by("-created_at", "id")
     serializer_class = ProjectSerializer
     required_scopes = ["projects:read"]
     permission_classes = [HasAPIKey, HasScope]
 
+    def get_queryset(self):
+        qs = super().get_queryset()
+        updated_after = self.request.query_params.get("updated_after")
+        if updated_after:
+            dt = parse_datetime(updated_after)
+            if dt:
+                qs = qs.filter(updated_at__gte=dt)
+        return qs
+
 
 class IssueViewSet(BaseAPIKeyViewSet):
-    queryset = Issue.objects.select_related("project", "assigned_to").order_by("-created_at")
+    queryset = Issue.objects.select_related("project", "assigned_to").order_by("-created_at", "id")
     serializer_class = IssueSerializer
+    field_columns = {"assigned_to": ["assigned_to__id", "assigned_to__username", "assigned_to__email"]}
     required_scopes = ["issues:read"]
     permission_classes = [HasAPIKey, HasScope]
 
@@ -56,9 +89,10 @@ class IssueViewSet(BaseAPIKeyViewSet):
         self.required_scopes = ["issues:write"]
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
+        with transaction.atomic():
+            self.perform_create(serializer)
+            dispatch_event("issue.created", serializer.data, WebhookSubscription.objects.filter(event="issue.created", is_active=True))
         headers = self.get_success_headers(serializer.data)
-        dispatch_event("issue.created", serializer.data, WebhookSubscription.objects.filter(event="issue.created", is_active=True))
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
     def update(self, request, *args, **kwargs):
@@ -67,8 +101,9 @@ class IssueViewSet(BaseAPIKeyViewSet):
         self.required_scopes = ["issues:write"]
         serializer = self.get_serializer(instance, data=request.data, partial=partial)
         serializer.is_valid(raise_exception=True)
-        self.perform_update(serializer)
-        dispatch_event("issue.updated", serializer.data, WebhookSubscription.objects.filter(event="issue.updated", is_active=True))
+        with transaction.atomic():
+            self.perform_update(serializer)
+            dispatch_event("issue.updated", serializer.data, WebhookSubscription.objects.filter(event="issue.updated", is_active=True))
         return Response(serializer.data)
 
     def destroy(self, request, *args, **kwargs):
@@ -79,8 +114,10 @@ class TimeEntryViewSet(BaseAPIKeyViewSet,
                        mixins.CreateModelMixin,
                        mixins.UpdateModelMixin,
                        mixins.DestroyModelMixin):
-    queryset = TimeEntry.objects.select_related("project", "task", "timesheet__user").order_by("-date")
+    queryset = TimeEntry.objects.select_related("project", "task", "timesheet__user").order_by("-date", "id")
     serializer_class = TimeEntrySerializer
+    cursor_ordering = ("-date", "id")
+    field_columns = {"user": ["timesheet__user__id", "timesheet__user__username", "timesheet__user__email"]}
     required_scopes = ["timeentries:read"]
     permission_classes = [HasAPIKey, HasScope]
 
@@ -90,6 +127,7 @@ class TimeEntryViewSet(BaseAPIKeyViewSet,
         task_param = self.request.query_params.get("task")
         start_param = self.request.query_params.get("start_date")
         end_param = self.request.query_params.get("end_date")
+        updated_after = self.request.query_params.get("updated_after")
 
         if project_param:
             qs = qs.filter(project_id=project_param)
@@ -103,15 +141,20 @@ class TimeEntryViewSet(BaseAPIKeyViewSet,
             ed = parse_date(end_param)
             if ed:
                 qs = qs.filter(date__lte=ed)
+        if updated_after:
+            dt = parse_datetime(updated_after)
+            if dt:
+                qs = qs.filter(updated_at__gte=dt)
         return qs
 
     def create(self, request, *args, **kwargs):
         self.required_scopes = ["timeentries:write"]
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
+        with transaction.atomic():
+            self.perform_create(serializer)
+            dispatch_event("timeentry.created", serializer.data, WebhookSubscription.objects.filter(event="timeentry.created", is_active=True))
         headers = self.get_success_headers(serializer.data)
-        dispatch_event("timeentry.created", serializer.data, WebhookSubscription.objects.filter(event="timeentry.created", is_active=True))
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
     def update(self, request, *args, **kwargs):
@@ -120,8 +163,9 @@ class TimeEntryViewSet(BaseAPIKeyViewSet,
         self.required_scopes = ["timeentries:write"]
         serializer = self.get_serializer(instance, data=request.data, partial=partial)
         serializer.is_valid(raise_exception=True)
-        self.perform_update(serializer)
-        dispatch_event("timeentry.updated", serializer.data, WebhookSubscription.objects.filter(event="timeentry.updated", is_active=True))
+        with transaction.atomic():
+            self.perform_update(serializer)
+            dispatch_event("timeentry.updated", serializer.data, WebhookSubscription.objects.filter(event="timeentry.updated", is_active=True))
         return Response(serializer.data)
 
     def destroy(self, request, *args, **kwargs):
@@ -133,6 +177,48 @@ class TimeEntryViewSet(BaseAPIKeyViewSet,
 from rest_framework.views import APIView
 
 
+class ChangeFeedView(APIView):
+    """
+    Feed incremental de alterações (upserts e exclusões) de projetos, issues e lançamentos.
+
+    ``?cursor=`` é o valor devolvido pela chamada anterior (vazio = desde o início
+    do registro); ``?types=project,issue,timeentry`` restringe os recursos,
+    sempre limitados aos escopos de leitura da app. ``has_more`` indica que há
+    mais registros disponíveis agora; ``retry_after`` (segundos) que há
+    registros recentes retidos pelo ``CHANGE_FEED_LAG_SECONDS``.
+    """
+    authentication_classes = [APIKeyAuthentication]
+    permission_classes = [HasAPIKey]
+
+    def get(self, request, *args, **kwargs):
+        scopes = request.auth.scopes
+        resources = [name for name, (_, _, scope) in FEED_RESOURCES.items() if scope in scopes]
+        types_param = request.query_params.get("types")
+        if types_param:
+            wanted = {t.strip() for t in types_param.split(",")}
+            resources = [name for name in resources if name in wanted]
+        if not resources:
+            raise PermissionDenied("Nenhum recurso disponível para os escopos desta aplicação.")
+
+        try:
+            after_id = decode_cursor(request.query_params.get("cursor"))
+        except ValueError:
+            raise ValidationError({"cursor": "Cursor inválido."})
+        try:
+            limit = int(request.query_params.get("limit", 500))
+        except ValueError:
+            limit = 500
+        limit = max(1, min(limit, settings.API_MAX_PAGE_SIZE))
+
+        changes, last_id, has_more, retry_after = read_changes(resources, after_id, limit, context={"request": request})
+        return Response({
+            "changes": changes,
+            "cursor": encode_cursor(last_id),
+            "has_more": has_more,
+            "retry_after": retry_after,
+        })
+
+
 class HealthView(APIView):
     permission_classes = [AllowAny]
 
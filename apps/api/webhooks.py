@@ -1,11 +1,31 @@
 import json
 import hmac
 import hashlib
+import logging
+import math
+import random
 import time
 import urllib.request
 import urllib.error
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from collections import defaultdict, deque
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
-from .models import WebhookDeliveryLog
+from .models import WebhookDeliveryLog, WebhookOutbox
+
+logger = logging.getLogger(__name__)
+
+# Padrões do worker (sobrescritos pelas opções do comando process_webhooks)
+REQUEST_TIMEOUT = 5
+MAX_ATTEMPTS = 8
+BACKOFF_BASE = 10        # segundos até a 2ª tentativa
+BACKOFF_MAX = 60 * 60    # teto entre tentativas
+LEASE_SECONDS = 5 * 60   # reserva mínima de um lote; itens "em envio" há mais tempo voltam para a fila
+LEASE_MARGIN = 30        # folga (s) sobre o pior caso de cada envio
 
 
 def _log_delivery(sub, event_name, success, status_code=None, body="", error="", attempt=1, duration_ms=None):
@@ -24,40 +44,192 @@ def _log_delivery(sub, event_name, success, status_code=None, body="", error="",
 
 def dispatch_event(event_name, payload, subscriptions):
     """
-    Dispara webhooks síncronos para as inscrições fornecidas.
-    Em produção, ideal mover para fila/worker.
+    Enfileira o evento no outbox para cada inscrição ativa.
+
+    Não faz I/O de rede: as entregas são feitas pelo comando process_webhooks.
+    Chamado dentro da mesma transação da alteração do modelo, o evento só é
+    gravado se a alteração for confirmada.
     """
-    body = json.dumps({"event": event_name, "data": payload, "sent_at": timezone.now().isoformat()}).encode("utf-8")
+    body = json.dumps({"event": event_name, "data": payload, "sent_at": timezone.now().isoformat()}, default=str)
+    WebhookOutbox.objects.bulk_create([
+        WebhookOutbox(subscription=sub, event=event_name, body=body)
+        for sub in subscriptions
+        if sub.is_active
+    ])
+
+
+def backoff_delay(attempts, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """Atraso exponencial com jitter ("equal jitter") após ``attempts`` falhas."""
+    delay = min(cap, base * 2 ** max(attempts - 1, 0))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def send_lease(timeout):
+    """Reserva de um item a partir do envio: conexão e leitura têm ``timeout`` cada."""
+    return 2 * timeout + LEASE_MARGIN
+
+
+def batch_lease(limit, per_target, timeout):
+    """
+    Reserva de um lote na pior hipótese: todos os itens para o mesmo host,
+    enviados ``per_target`` por vez e esgotando o timeout.
+    """
+    return max(LEASE_SECONDS, math.ceil(limit / max(per_target, 1)) * send_lease(timeout))
+
+
+def claim_batch(limit, lease_seconds=LEASE_SECONDS):
+    """
+    Reserva até ``limit`` itens vencidos marcando-os como em envio.
+
+    Usa ``SELECT ... FOR UPDATE SKIP LOCKED`` onde o banco suporta, para que
+    vários workers possam drenar a fila em paralelo; itens cuja reserva
+    expirou (worker interrompido) são retomados.
+    """
+    now = timezone.now()
+    due = (
+        Q(status=WebhookOutbox.Status.PENDING, next_attempt_at__lte=now)
+        | Q(status=WebhookOutbox.Status.IN_PROGRESS, locked_until__lt=now)
+    )
+    with transaction.atomic():
+        ids = list(
+            WebhookOutbox.objects.select_for_update(skip_locked=True)
+            .filter(due)
+            .order_by("next_attempt_at", "id")
+            .values_list("id", flat=True)[:limit]
+        )
+        WebhookOutbox.objects.filter(id__in=ids).update(
+            status=WebhookOutbox.Status.IN_PROGRESS,
+            locked_until=now + timedelta(seconds=lease_seconds),
+        )
+    return list(WebhookOutbox.objects.filter(id__in=ids).select_related("subscription").order_by("next_attempt_at", "id"))
+
+
+def _post(target_url, secret, body, timeout):
+    """Uma tentativa de entrega. Executa nas threads do pool: apenas rede, sem acesso ao banco."""
     headers = {
         "Content-Type": "application/json",
         "User-Agent": "Sentinel360-Webhook/1.0",
     }
+    data = body.encode("utf-8")
+    if secret:
+        headers["X-Sentinel-Signature"] = hmac.new(secret.encode("utf-8"), data, hashlib.sha256).hexdigest()
+
+    start = time.time()
+    result = {"success": False, "status_code": None, "body": "", "error": ""}
+    try:
+        req = urllib.request.Request(target_url, data=data, headers=headers, method="POST")
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            result["body"] = resp.read().decode("utf-8") if resp else ""
+            result["status_code"] = resp.getcode()
+            result["success"] = 200 <= resp.getcode() < 300
+    except urllib.error.HTTPError as e:
+        result.update(status_code=e.code, error=str(e))
+    except Exception as e:
+        result["error"] = str(e)
+    result["duration_ms"] = int((time.time() - start) * 1000)
+    return result
+
+
+def _save_leased(item, *fields):
+    """
+    Grava ``fields`` só se a reserva do item ainda é desta execução (mesmo
+    ``locked_until``); False se ela expirou e outro worker retomou o item.
+    """
+    held = WebhookOutbox.objects.filter(pk=item.pk, status=WebhookOutbox.Status.IN_PROGRESS, locked_until=item.lease)
+    return bool(held.update(**{field: getattr(item, field) for field in fields}))
+
+
+def _renew_lease(item, seconds):
+    """Estende a reserva imediatamente antes do envio."""
+    item.locked_until = timezone.now() + timedelta(seconds=seconds)
+    if not _save_leased(item, "locked_until"):
+        return False
+    item.lease = item.locked_until
+    return True
 
-    for sub in subscriptions:
+
+def _record_result(item, result, max_attempts, backoff_base, backoff_max):
+    """Registra a tentativa; False se a reserva foi perdida (o item já é de outro worker)."""
+    sub = item.subscription
+    item.attempts += 1
+    _log_delivery(
+        sub, item.event, result["success"],
+        status_code=result["status_code"], body=result["body"], error=result["error"],
+        attempt=item.attempts, duration_ms=result["duration_ms"],
+    )
+    item.locked_until = None
+    if result["success"]:
+        item.status = WebhookOutbox.Status.DELIVERED
+        item.delivered_at = timezone.now()
+        item.last_error = ""
+    else:
+        item.last_error = (result["error"] or f"HTTP {result['status_code']}")[:500]
+        if item.attempts >= max_attempts:
+            item.status = WebhookOutbox.Status.DEAD
+            logger.warning("Webhook %s descartado após %s tentativas: %s", item.pk, item.attempts, item.last_error)
+        else:
+            item.status = WebhookOutbox.Status.PENDING
+            item.next_attempt_at = timezone.now() + timedelta(seconds=backoff_delay(item.attempts, backoff_base, backoff_max))
+    return _save_leased(item, "attempts", "status", "next_attempt_at", "locked_until", "last_error", "delivered_at")
+
+
+def process_batch(items, workers=8, per_target=2, timeout=REQUEST_TIMEOUT,
+                  max_attempts=MAX_ATTEMPTS, backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX):
+    """
+    Entrega ``items`` com um pool de ``workers`` threads.
+
+    No máximo ``per_target`` envios simultâneos por host de destino, para que
+    um receptor lento não ocupe o pool inteiro. Os resultados são gravados
+    pela thread chamadora (log de entrega, reagendamento ou descarte).
+
+    A reserva de cada item é renovada por ``send_lease(timeout)`` logo antes
+    do envio e toda gravação confere que ela ainda é desta execução: um item
+    cuja reserva expirou na fila e foi retomado por outro worker não é
+    enviado de novo (conta como ``lost``).
+    Retorna ``{'delivered': n, 'retrying': n, 'dead': n, 'lost': n}``.
+    """
+    stats = {"delivered": 0, "retrying": 0, "dead": 0, "lost": 0}
+    queues = defaultdict(deque)
+    for item in items:
+        item.lease = item.locked_until
+        sub = item.subscription
         if not sub.is_active:
+            item.status = WebhookOutbox.Status.DEAD
+            item.locked_until = None
+            item.last_error = "Inscrição inativa"
+            stats["dead" if _save_leased(item, "status", "locked_until", "last_error") else "lost"] += 1
             continue
-        req_headers = headers.copy()
-        if sub.secret:
-            signature = hmac.new(sub.secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
-            req_headers["X-Sentinel-Signature"] = signature
-
-        for attempt in range(1, 4):  # até 3 tentativas
-            start = time.time()
-            try:
-                req = urllib.request.Request(sub.target_url, data=body, headers=req_headers, method="POST")
-                with urllib.request.urlopen(req, timeout=5) as resp:
-                    resp_body = resp.read().decode("utf-8") if resp else ""
-                    duration_ms = int((time.time() - start) * 1000)
-                    success = 200 <= resp.getcode() < 300
-                    _log_delivery(sub, event_name, success, status_code=resp.getcode(), body=resp_body, attempt=attempt, duration_ms=duration_ms)
-                    if success:
-                        break
-            except urllib.error.HTTPError as e:
-                duration_ms = int((time.time() - start) * 1000)
-                _log_delivery(sub, event_name, False, status_code=e.code, body="", error=str(e), attempt=attempt, duration_ms=duration_ms)
-            except urllib.error.URLError as e:
-                duration_ms = int((time.time() - start) * 1000)
-                _log_delivery(sub, event_name, False, status_code=None, body="", error=str(e), attempt=attempt, duration_ms=duration_ms)
-            except Exception as e:
-                duration_ms = int((time.time() - start) * 1000)
-                _log_delivery(sub, event_name, False, status_code=None, body="", error=str(e), attempt=attempt, duration_ms=duration_ms)
+        queues[urlsplit(sub.target_url).netloc].append(item)
+
+    running = {}
+    in_flight = defaultdict(int)
+
+    def submit_ready(pool):
+        for target, queue in queues.items():
+            while queue and in_flight[target] < per_target:
+                item = queue.popleft()
+                if not _renew_lease(item, send_lease(timeout)):
+                    stats["lost"] += 1
+                    continue
+                future = pool.submit(_post, item.subscription.target_url, item.subscription.secret, item.body, timeout)
+                running[future] = (target, item)
+                in_flight[target] += 1
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        submit_ready(pool)
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                target, item = running.pop(future)
+                in_flight[target] -= 1
+                if not _record_result(item, future.result(), max_attempts, backoff_base, backoff_max):
+                    logger.warning("Webhook %s: reserva expirada durante o envio, resultado descartado", item.pk)
+                    stats["lost"] += 1
+                elif item.status == WebhookOutbox.Status.DELIVERED:
+                    stats["delivered"] += 1
+                elif item.status == WebhookOutbox.Status.DEAD:
+                    stats["dead"] += 1
+                else:
+                    stats["retrying"] += 1
+            submit_ready(pool)
+    return stats
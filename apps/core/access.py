@@ -0,0 +1,64 @@
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.db.models import BooleanField, Exists, ExpressionWrapper, OuterRef, Q
+
+MODULE_FLAGS = {
+    'helpdesk': 'access_helpdesk',
+    'approvals': 'access_approvals',
+    'approvals_he': 'access_approvals_he',
+    'admin': 'access_admin',
+    'reports': 'access_reports',
+}
+
+VERSION_KEY = 'core:module_access:version'
+# Bounds staleness when the cache backend is not shared between processes
+CACHE_TTL = 5 * 60
+
+
+def _version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+def bump_module_access_version():
+    """Invalidate every cached flag set (group flags, membership or permissions changed)."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 2, None)
+
+
+def _compute_flags(user):
+    from django.contrib.auth import get_user_model
+    from .models import GroupModuleAccess
+
+    # One query: a flag is on when a group enables it or the user holds the
+    # permission directly or through a group (same rule as before)
+    annotations = {}
+    for flag, codename in MODULE_FLAGS.items():
+        perms = Permission.objects.filter(content_type__app_label='core', codename=codename).filter(
+            Q(user=OuterRef('pk')) | Q(group__user=OuterRef('pk'))
+        )
+        groups = GroupModuleAccess.objects.filter(group__user=OuterRef('pk'), **{flag: True})
+        annotations[flag] = ExpressionWrapper(Q(Exists(perms)) | Q(Exists(groups)), output_field=BooleanField())
+
+    row = get_user_model().objects.filter(pk=user.pk).values(**annotations).first() or {}
+    return {flag: bool(row.get(flag)) for flag in MODULE_FLAGS}
+
+
+def get_module_access(user):
+    """Navigation flags for ``user``, cached per user and invalidated by a global version."""
+    if not user or not user.is_authenticated:
+        return {flag: False for flag in MODULE_FLAGS}
+    if user.is_superuser:
+        return {flag: True for flag in MODULE_FLAGS}
+
+    key = f'core:module_access:{_version()}:{user.pk}'
+    flags = cache.get(key)
+    if flags is None:
+        flags = _compute_flags(user)
+        cache.set(key, flags, CACHE_TTL)
+    return flags
@@ -0,0 +1,69 @@
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from django.db.models import F, Q
+from django.shortcuts import reverse
+from django.utils import timezone
+
+from .caching import cached_query
+
+CACHE_TTL = 60
+NEAR_DUE_DAYS = 10
+ALERTS_PER_TYPE = 4
+
+
+def _url_template(name):
+    # Reverse once with a placeholder pk instead of once per alert
+    return reverse(name, kwargs={'pk': 0}).replace('/0/', '/{pk}/')
+
+
+def compute_alerts(user):
+    """Near-due tickets and tasks the user is involved in (assignee, colleague or creator), one query per type."""
+    from apps.projects.models import Issue
+
+    today = timezone.localdate()
+    near_due = today + timedelta(days=NEAR_DUE_DAYS)
+    in_window = Q(due_date__range=(today, near_due))
+
+    involved = (
+        Issue.objects
+        .filter(Q(assigned_to=user) | Q(colleagues=user) | Q(created_by=user))
+        .values('id', 'public_id', 'title', 'status', 'due_date')
+        .distinct()
+    )
+    # NULL due dates last, as in PostgreSQL's ascending order
+    due = F('due_date').asc(nulls_last=True)
+    # Same ordering as before: tickets by -status then due date, tasks by due date
+    tickets = involved.filter(
+        Q(status__in=[Issue.Status.TODO, Issue.Status.DOING]) | in_window, issue_type=Issue.IssueType.HELP_DESK,
+    ).order_by('-status', due, 'id')[:ALERTS_PER_TYPE]
+    tasks = involved.filter(
+        Q(status=Issue.Status.TODO) | in_window, issue_type=Issue.IssueType.TASK,
+    ).order_by(due, 'id')[:ALERTS_PER_TYPE]
+
+    query = urlencode({'redirect_to': reverse('core:dashboard')})
+    ticket_url = _url_template('helpdesk:ticket_update')
+    task_url = _url_template('projects:task_edit')
+    alerts = []
+    for ticket in tickets:
+        alerts.append({
+            'type': 'ticket',
+            'label': ticket['title'],
+            'subtitle': f"Chamado #{ticket['public_id'] or ticket['id']}",
+            'url': f"{ticket_url.format(pk=ticket['id'])}?{query}",
+        })
+    for task in tasks:
+        alerts.append({
+            'type': 'task',
+            'label': task['title'],
+            'subtitle': f"Tarefa #{task['public_id'] or task['id']}",
+            'url': f"{task_url.format(pk=task['id'])}?{query}",
+        })
+    return alerts
+
+
+def get_alerts(user):
+    """Cached per user for ``CACHE_TTL`` seconds; any Issue change invalidates all users."""
+    if not user or not user.is_authenticated:
+        return []
+    return cached_query(f'core:alerts:{user.pk}', ['issue'], CACHE_TTL, lambda: compute_alerts(user))
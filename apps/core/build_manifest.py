@@ -0,0 +1,137 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+IGNORED_DIRS = {
+    '.cache',
+    '.git',
+    '.venv',
+    'staticfiles',
+    'media',
+    'node_modules',
+    '__pycache__',
+}
+
+WATCHED_RELATIVE_PATHS = (
+    'apps',
+    'templates',
+    'static',
+    'erp_core',
+)
+
+
+def _watched_paths() -> Iterator[Path]:
+    base = settings.BASE_DIR
+    yield base
+    for rel in WATCHED_RELATIVE_PATHS:
+        candidate = base / rel
+        if candidate.exists():
+            yield candidate
+
+
+def _latest_filesystem_timestamp() -> Optional[datetime]:
+    latest_ts: float = 0.0
+    for path in _watched_paths():
+        if path.is_file():
+            try:
+                latest_ts = max(latest_ts, path.stat().st_mtime)
+            except OSError:
+                continue
+            continue
+
+        for root, dirs, files in os.walk(path):
+            dirs[:] = [d for d in dirs if d not in IGNORED_DIRS]
+            for name in files:
+                if name.startswith('.') or name == manifest_path().name:
+                    continue
+                full_path = Path(root) / name
+                try:
+                    latest_ts = max(latest_ts, full_path.stat().st_mtime)
+                except OSError:
+                    continue
+
+    if latest_ts <= 0:
+        return None
+
+    tz = timezone.get_default_timezone()
+    return datetime.fromtimestamp(latest_ts, tz)
+
+
+def manifest_path() -> Path:
+    return Path(getattr(settings, 'BUILD_MANIFEST_PATH', settings.BASE_DIR / 'build_manifest.json'))
+
+
+def write_manifest() -> Optional[datetime]:
+    """Walk the source tree once and store the newest mtime in the manifest file."""
+    last_update = _latest_filesystem_timestamp()
+    path = manifest_path()
+    path.write_text(json.dumps({
+        'last_update': last_update.isoformat() if last_update else None,
+        'generated_at': timezone.now().isoformat(),
+    }))
+    return last_update
+
+
+def _read_manifest(path: Path) -> Optional[datetime]:
+    data = json.loads(path.read_text())
+    value = data.get('last_update')
+    return datetime.fromisoformat(value) if value else None
+
+
+class _LastUpdate:
+    """
+    In-memory ``admin_last_update`` value.
+
+    Loaded once from the manifest written by ``write_build_manifest`` (or,
+    without one, from a single walk of the tree). With
+    ``BUILD_MANIFEST_REFRESH_SECONDS`` > 0 the manifest mtime is re-checked at
+    most that often and the value reloaded when the file changed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._value = None
+        self._mtime = None
+        self._checked_at = 0.0
+
+    def _load(self):
+        path = manifest_path()
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            mtime = None
+        if mtime is not None:
+            if mtime != self._mtime:
+                try:
+                    self._value = _read_manifest(path)
+                except (OSError, ValueError):
+                    self._value = _latest_filesystem_timestamp()
+                self._mtime = mtime
+        elif not self._loaded:
+            self._value = _latest_filesystem_timestamp()
+        self._loaded = True
+        self._checked_at = time.monotonic()
+
+    def get(self) -> Optional[datetime]:
+        refresh = getattr(settings, 'BUILD_MANIFEST_REFRESH_SECONDS', 0)
+        stale = refresh and time.monotonic() - self._checked_at >= refresh
+        if not self._loaded or stale:
+            with self._lock:
+                if not self._loaded or stale:
+                    self._load()
+        return self._value
+
+
+_last_update = _LastUpdate()
+
+
+def get_last_update() -> Optional[datetime]:
+    return _last_update.get()
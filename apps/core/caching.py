@@ -0,0 +1,175 @@
+"""
+Cache-aside helper with tag-based invalidation.
+
+``cached_query(key, version_tags, ttl, compute)`` stores ``compute()`` under
+``key`` plus the current version of each tag. Bumping a tag makes every entry
+that depends on it miss on its next read (the old entries simply expire), so
+callers never have to know which keys to delete. The receivers in
+``core.models`` bump the tags of Project, Issue, TimeEntry and Timesheet after
+each commit: a model-wide tag (``'issue'``) and a scoped one
+(``'issue:project:5'``, see ``tag_for`` and ``SCOPES``).
+
+Reads never write to the cache: a hit is one ``get_many`` of the tag versions
+and one ``get``. Bumps store a fresh clock value instead of ``incr`` (a
+non-atomic get+set on the file backend), so two concurrent bumps cannot
+collapse into one. Hits and misses are counted per namespace (the first two
+segments of the key) in process memory and added to shared counters at most
+every ``CACHE_STATS_FLUSH_SECONDS``, so ``manage.py cache_stats`` sees every
+worker without a write per hit.
+"""
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+MODEL_TAGS = {
+    'projects.Project': 'project',
+    'projects.Issue': 'issue',
+    'timesheet.TimeEntry': 'time_entry',
+    'timesheet.Timesheet': 'timesheet',
+}
+
+# Scope of the narrower tag bumped with each model tag: (scope, attribute)
+SCOPES = {
+    'projects.Project': ('project', 'pk'),
+    'projects.Issue': ('project', 'project_id'),
+    'timesheet.TimeEntry': ('project', 'project_id'),
+    'timesheet.Timesheet': ('user', 'user_id'),
+}
+
+NAMESPACES_KEY = 'core:cache:namespaces'
+_MISSING = object()
+
+
+def tag_for(name, **scope):
+    """``tag_for('time_entry', project=5)`` -> ``'time_entry:project:5'``."""
+    (field, value), = scope.items()
+    return f'{name}:{field}:{value}'
+
+
+def instance_tags(instance):
+    """Model tag and scoped tag of a Project, Issue, TimeEntry or Timesheet."""
+    label = instance._meta.label
+    name = MODEL_TAGS[label]
+    field, attribute = SCOPES[label]
+    value = getattr(instance, attribute)
+    return [name, tag_for(name, **{field: value})] if value is not None else [name]
+
+
+def _version_key(tag):
+    return f'core:cache:tag:{tag}'
+
+
+def tag_versions(tags):
+    """Current version of each tag, in order."""
+    keys = [_version_key(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # A lost version (evicted or never set) restarts from the clock, so
+            # it cannot come back to a number older entries were stored under
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key, 0)
+    return [versions[key] for key in keys]
+
+
+def bump_tags(*tags):
+    """Invalidate every entry depending on ``tags`` once the transaction commits."""
+    tags = set(filter(None, tags))
+    if not tags:
+        return
+
+    def bump():
+        # Any value never used before will do; set() is atomic on every backend
+        cache.set_many({_version_key(tag): time.time_ns() for tag in tags}, None)
+    transaction.on_commit(bump)
+
+
+def invalidate(*instances):
+    """Bump the tags of saved or deleted instances (e.g. after a queryset ``update()``)."""
+    bump_tags(*(tag for instance in instances for tag in instance_tags(instance)))
+
+
+def cached_query(key, version_tags, ttl, compute):
+    """
+    ``compute()`` cached under ``key`` for ``ttl`` seconds or until one of
+    ``version_tags`` is bumped. ``None`` results are cached too.
+    """
+    versions = '.'.join(map(str, tag_versions(version_tags)))
+    full_key = f'{key}:{versions}' if versions else key
+    value = cache.get(full_key, _MISSING)
+    if value is not _MISSING:
+        _count(key, 'hits')
+        return value
+    _count(key, 'misses')
+    value = compute()
+    cache.set(full_key, value, ttl)
+    return value
+
+
+# Hit/miss counters
+
+def namespace(key):
+    return ':'.join(key.split(':')[:2])
+
+
+def _counter_key(name, outcome):
+    return f'core:cache:stats:{name}:{outcome}'
+
+
+_counts = Counter()
+_counts_lock = threading.Lock()
+_flushed_at = time.monotonic()
+
+
+def _count(key, outcome):
+    global _flushed_at
+    if not getattr(settings, 'CACHE_STATS', True):
+        return
+    with _counts_lock:
+        _counts[namespace(key), outcome] += 1
+        if time.monotonic() - _flushed_at < getattr(settings, 'CACHE_STATS_FLUSH_SECONDS', 60):
+            return
+        pending = dict(_counts)
+        _counts.clear()
+        _flushed_at = time.monotonic()
+    flush_stats(pending)
+
+
+def flush_stats(pending=None):
+    """Add this process' counters (or ``pending``) to the shared ones."""
+    if pending is None:
+        with _counts_lock:
+            pending = dict(_counts)
+            _counts.clear()
+    if not pending:
+        return
+    names = cache.get(NAMESPACES_KEY, set())
+    new_names = {name for name, _ in pending} - names
+    if new_names:
+        cache.set(NAMESPACES_KEY, names | new_names, None)
+    for (name, outcome), value in pending.items():
+        counter = _counter_key(name, outcome)
+        try:
+            cache.incr(counter, value)
+        except ValueError:
+            cache.set(counter, value, None)
+
+
+def stats():
+    """``{namespace: {'hits', 'misses'}}`` flushed by every process."""
+    names = sorted(cache.get(NAMESPACES_KEY, set()))
+    keys = {(name, outcome): _counter_key(name, outcome) for name in names for outcome in ('hits', 'misses')}
+    values = cache.get_many(keys.values())
+    return {
+        name: {outcome: values.get(keys[name, outcome], 0) for outcome in ('hits', 'misses')}
+        for name in names
+    }
+
+
+def reset_stats():
+    names = cache.get(NAMESPACES_KEY, set())
+    cache.delete_many([_counter_key(name, outcome) for name in names for outcome in ('hits', 'misses')])
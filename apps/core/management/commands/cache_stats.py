@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.core import caching
+
+
+class Command(BaseCommand):
+    help = (
+        "Mostra acertos e falhas do cache de consultas (apps.core.caching) por namespace. "
+        "Cada processo envia seus contadores a cada CACHE_STATS_FLUSH_SECONDS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="Zera os contadores depois de exibi-los.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Backend: {settings.CACHES['default']['BACKEND']}")
+        rows = caching.stats()
+        if not rows:
+            self.stdout.write(self.style.WARNING("Nenhuma consulta cacheada registrada ainda."))
+        for name, counts in rows.items():
+            total = counts['hits'] + counts['misses']
+            ratio = counts['hits'] / total * 100 if total else 0
+            self.stdout.write(f"{name:<30} {counts['hits']:>8} acertos {counts['misses']:>8} falhas {ratio:6.1f}%")
+        if options['reset']:
+            caching.reset_stats()
+            self.stdout.write(self.style.SUCCESS("Contadores zerados."))
@@ -0,0 +1,177 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.api.models import ApiRequestLog
+from apps.core.models import SearchDocument, User
+from apps.projects.models import Issue, Project, ProjectMembership
+from apps.timesheet.models import Activity, TimeEntry, Timesheet
+
+SEED_PREFIX = 'plancheck'
+# Synthetic search documents stay clear of real object ids
+SEED_OBJECT_ID = 10 ** 9
+
+
+def canonical_queries():
+    """``(name, table, queryset)`` for the hot paths of the views and the API."""
+    today = timezone.localdate()
+    month_start = today.replace(day=1)
+    return [
+        ('grade da folha de ponto', 'timesheet_timeentry',
+         TimeEntry.objects.filter(timesheet_id=1)),
+        ('célula da grade', 'timesheet_timeentry',
+         TimeEntry.objects.filter(timesheet_id=1, project_id=1, task_id=None, activity_id=1, date=today)),
+        ('lançamentos por período', 'timesheet_timeentry',
+         TimeEntry.objects.filter(date__range=(month_start, today))),
+        ('horas do projeto por período', 'timesheet_timeentry',
+         TimeEntry.objects.filter(project_id=1, date__range=(month_start, today))),
+        ('quadro de tarefas por status', 'projects_issue',
+         Issue.objects.filter(issue_type=Issue.IssueType.TASK, status=Issue.Status.TODO, due_date__lte=today)),
+        ('minhas tarefas', 'projects_issue',
+         Issue.objects.filter(assigned_to_id=1, issue_type=Issue.IssueType.TASK)),
+        ('issues abertas a vencer', 'projects_issue',
+         Issue.objects.filter(status__in=[Issue.Status.TODO, Issue.Status.DOING],
+                              due_date__range=(today, today + timedelta(days=7)))),
+        ('aprovações pendentes', 'timesheet_timesheet',
+         Timesheet.objects.filter(status__in=[Timesheet.Status.SUBMITTED, Timesheet.Status.PARTIALLY_APPROVED])
+         .order_by('-start_date')),
+        ('folhas por status e período', 'timesheet_timesheet',
+         Timesheet.objects.filter(status=Timesheet.Status.APPROVED, start_date__gte=month_start)),
+        ('logs recentes da API', 'api_apirequestlog',
+         ApiRequestLog.objects.filter(created_at__gte=timezone.now() - timedelta(days=1))),
+        ('projetos do usuário', 'projects_projectmembership',
+         ProjectMembership.objects.filter(user_id=1, role__in=list(ProjectMembership.Role)).values('project_id')),
+        ('documento de busca', 'core_searchdocument',
+         SearchDocument.objects.filter(kind='task', object_id=1)),
+    ]
+
+
+def sequential_scans(plan, table):
+    """Plan lines reading every row of ``table`` instead of an index."""
+    if connection.vendor == 'postgresql':
+        return [line.strip() for line in plan.splitlines() if f"Seq Scan on {table}" in line]
+    # SQLite: "SCAN <table>" without "USING [COVERING] INDEX" is a full table scan
+    return [
+        line.strip() for line in plan.splitlines()
+        if f"SCAN {table}" in line and 'USING' not in line
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Roda EXPLAIN nas consultas críticas (grade de horas, quadros, aprovações, logs da API) "
+        "e falha se alguma fizer leitura sequencial da tabela."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed', type=int, default=5000,
+            help="Insere cerca de N lançamentos sintéticos (e dados relacionados) antes do EXPLAIN; "
+                 "tudo é desfeito ao final. Use 0 para avaliar só os dados atuais.",
+        )
+        parser.add_argument('--verbose-plans', action='store_true', help="Mostra o plano completo de cada consulta.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['seed']:
+                self.stdout.write(self.style.WARNING(f"Gerando massa de teste (~{options['seed']} lançamentos)..."))
+                self.seed(options['seed'])
+            self.prepare_planner()
+            failures = self.check_plans(options['verbose_plans'])
+            # Nada do que foi gerado (nem as estatísticas) fica no banco
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(f"{failures} consulta(s) com leitura sequencial.")
+        self.stdout.write(self.style.SUCCESS("Todas as consultas usam índice."))
+
+    def prepare_planner(self):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute("ANALYZE")
+                # Small tables are cheaper to scan; we want to know whether an index is usable at all
+                cursor.execute("SET LOCAL enable_seqscan = off")
+            elif connection.vendor == 'sqlite':
+                cursor.execute("ANALYZE")
+
+    def check_plans(self, verbose):
+        failures = 0
+        for name, table, queryset in canonical_queries():
+            plan = queryset.explain()
+            scans = sequential_scans(plan, table)
+            if scans:
+                failures += 1
+                self.stdout.write(self.style.ERROR(f"[SCAN] {name}: {'; '.join(scans)}"))
+            else:
+                self.stdout.write(f"[ OK ] {name}")
+            if verbose or scans:
+                self.stdout.write(plan)
+        return failures
+
+    def seed(self, entries):
+        today = timezone.localdate()
+        users = User.objects.bulk_create(
+            User(username=f"{SEED_PREFIX}{i}", password='!') for i in range(20)
+        )
+        projects = Project.objects.bulk_create(
+            Project(name=f"{SEED_PREFIX} {i}", description='', start_date=today, end_date=today) for i in range(20)
+        )
+        activity = Activity.objects.create(name=SEED_PREFIX)
+        statuses = list(Timesheet.Status)
+        weeks = max(1, entries // (len(users) * 5))
+        first_monday = today - timedelta(days=today.weekday(), weeks=weeks)
+        timesheets = Timesheet.objects.bulk_create(
+            Timesheet(
+                user=user,
+                start_date=first_monday + timedelta(weeks=week),
+                end_date=first_monday + timedelta(weeks=week, days=6),
+                status=statuses[(week + i) % len(statuses)],
+            )
+            for week in range(weeks) for i, user in enumerate(users)
+        )
+        TimeEntry.objects.bulk_create(
+            (
+                TimeEntry(
+                    timesheet=timesheet, project=projects[(i + day) % len(projects)], activity=activity,
+                    date=timesheet.start_date + timedelta(days=day), hours=Decimal('8'),
+                )
+                for i, timesheet in enumerate(timesheets) for day in range(5)
+            ),
+            batch_size=1000,
+        )
+        issue_statuses = list(Issue.Status)
+        issue_types = list(Issue.IssueType)
+        Issue.objects.bulk_create(
+            (
+                Issue(
+                    project=projects[i % len(projects)], title=f"{SEED_PREFIX} {i}",
+                    assigned_to=users[i % len(users)], status=issue_statuses[i % len(issue_statuses)],
+                    issue_type=issue_types[i % len(issue_types)], due_date=today + timedelta(days=i % 60 - 30),
+                )
+                for i in range(entries // 2)
+            ),
+            batch_size=1000,
+        )
+        ProjectMembership.objects.bulk_create(
+            ProjectMembership(user=user, project=project, role=ProjectMembership.Role.TEAM)
+            for i, user in enumerate(users) for project in projects[i % 4::4]
+        )
+        now = timezone.now()
+        ApiRequestLog.objects.bulk_create(
+            (
+                ApiRequestLog(method='GET', path='/api/v1/projects/', status_code=200,
+                              created_at=now - timedelta(minutes=i))
+                for i in range(entries)
+            ),
+            batch_size=1000,
+        )
+        SearchDocument.objects.bulk_create(
+            (
+                SearchDocument(kind='task', object_id=SEED_OBJECT_ID + i, title=f"{SEED_PREFIX} {i}", body='')
+                for i in range(entries // 2)
+            ),
+            batch_size=1000,
+        )
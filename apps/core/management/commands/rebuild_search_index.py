@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from apps.core import search
+
+
+class Command(BaseCommand):
+    help = "Reconstrói os documentos da busca global (chamados, tarefas, projetos e folhas de ponto)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Documentos por INSERT em lote.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING("Reconstruindo índice de busca..."))
+        written = search.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Concluído. {written} documento(s) indexados (backend: {search.backend()})."
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.core.build_manifest import manifest_path, write_manifest
+
+
+class Command(BaseCommand):
+    help = "Grava o manifesto de build com a data da última alteração do código (exibida no admin)."
+
+    def handle(self, *args, **options):
+        last_update = write_manifest()
+        self.stdout.write(self.style.SUCCESS(f"Manifesto gravado em {manifest_path()}: {last_update or 'sem arquivos'}"))
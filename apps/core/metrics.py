@@ -0,0 +1,75 @@
+import calendar
+
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .caching import cached_query, tag_for
+
+CACHE_TTL = 60
+
+
+def _compute_dashboard(user):
+    from apps.projects.membership import visible_projects
+    from apps.projects.models import Issue, Project
+    from apps.timesheet.rollup import sum_hours
+
+    # Tickets abertos e tarefas do usuario numa unica passada sobre Issue
+    issues = Issue.objects.filter(Q(created_by=user) | Q(assigned_to=user)).aggregate(
+        open_tickets=Count('id', filter=Q(
+            issue_type=Issue.IssueType.HELP_DESK,
+            status__in=[Issue.Status.TODO, Issue.Status.DOING],
+        )),
+        my_tasks=Count('id', filter=Q(issue_type=Issue.IssueType.TASK, assigned_to=user)),
+    )
+
+    # Horas no mes: intervalo de datas (sargable), lido do consolidado semanal
+    today = timezone.localdate()
+    month_start = today.replace(day=1)
+    month_end = month_start.replace(day=calendar.monthrange(today.year, today.month)[1])
+    total_hours = sum_hours(month_start, month_end, user=user)
+
+    # Projetos: apenas os visiveis ao usuario
+    if user.is_superuser or user.has_perm('projects.view_project') or user.has_perm('projects.change_project'):
+        projects = Project.objects.all()
+    else:
+        projects = visible_projects(user)
+
+    return {
+        'open_tickets_count': issues['open_tickets'],
+        'total_hours_month': f"{int(total_hours)}h",
+        'active_projects_count': projects.filter(status=Project.Status.IN_PROGRESS).count(),
+        'my_tasks_count': issues['my_tasks'],
+    }
+
+
+def dashboard_metrics(user):
+    """Widgets of the internal dashboard, cached per user for ``CACHE_TTL`` seconds or until a source changes."""
+    day = timezone.localdate().isoformat()
+    return cached_query(
+        f'core:dashboard:{user.pk}:{day}', ['issue', 'time_entry', 'project'], CACHE_TTL,
+        lambda: _compute_dashboard(user),
+    )
+
+
+def _compute_portal(project_id):
+    from apps.projects.models import Issue
+
+    return Issue.objects.filter(
+        project_id=project_id,
+        issue_type=Issue.IssueType.HELP_DESK,
+    ).aggregate(
+        open=Count('id', filter=Q(status=Issue.Status.TODO)),
+        in_progress=Count('id', filter=Q(status=Issue.Status.DOING)),
+        closed=Count('id', filter=Q(status=Issue.Status.DONE)),
+    )
+
+
+def portal_ticket_stats(user):
+    """Ticket status counts of the client's project, cached for ``CACHE_TTL`` seconds or until one of its issues changes."""
+    project_id = getattr(user, 'client_project_id', None)
+    if not project_id:
+        return {'open': 0, 'in_progress': 0, 'closed': 0}
+    return cached_query(
+        f'core:portal:{project_id}', [tag_for('issue', project=project_id)], CACHE_TTL,
+        lambda: _compute_portal(project_id),
+    )
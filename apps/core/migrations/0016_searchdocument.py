@@ -0,0 +1,131 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Frozen copies of apps.core.search at the time of this migration, so later
+# changes to the live module do not alter what this migration does.
+FTS_TABLE = 'core_searchdocument_fts'
+ISSUE_KINDS = {'Help Desk': 'ticket', 'Tarefa': 'task'}
+
+
+def create_index(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            "ALTER TABLE core_searchdocument ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(body, '')), 'B')) STORED"
+        )
+        schema_editor.execute(
+            "CREATE INDEX core_searchdocument_vector_gin ON core_searchdocument USING gin (search_vector)"
+        )
+    elif vendor == 'sqlite':
+        from django.db import OperationalError
+        try:
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(title, body, "
+                "content='core_searchdocument', content_rowid='id', "
+                "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+        except OperationalError:
+            # SQLite built without FTS5: search falls back to icontains
+            return
+        schema_editor.execute(
+            f"CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON core_searchdocument BEGIN "
+            f"INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON core_searchdocument BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE ON core_searchdocument BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body); "
+            f"INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body); END"
+        )
+
+
+def documents(apps):
+    Issue = apps.get_model('projects', 'Issue')
+    Project = apps.get_model('projects', 'Project')
+    Timesheet = apps.get_model('timesheet', 'Timesheet')
+    for issue in Issue.objects.only(
+        'id', 'public_id', 'title', 'description', 'issue_type', 'created_by_id', 'assigned_to_id',
+    ).iterator(chunk_size=1000):
+        kind = ISSUE_KINDS.get(issue.issue_type)
+        if kind is not None:
+            yield dict(
+                kind=kind, object_id=issue.pk, public_id=issue.public_id, title=issue.title[:255],
+                body=issue.description or '', owner_id=issue.created_by_id, assignee_id=issue.assigned_to_id,
+            )
+    for project in Project.objects.only('id', 'name', 'description').iterator(chunk_size=1000):
+        yield dict(kind='project', object_id=project.pk, title=project.name[:255], body=project.description or '')
+    status_labels = dict(Timesheet._meta.get_field('status').choices)
+    for timesheet in Timesheet.objects.select_related('user').iterator(chunk_size=1000):
+        user = timesheet.user
+        yield dict(
+            kind='timesheet',
+            object_id=timesheet.pk,
+            title=f"{user.username} {timesheet.start_date:%d/%m/%Y} {timesheet.end_date:%d/%m/%Y}"[:255],
+            body=' '.join(filter(None, [
+                user.first_name, user.last_name, timesheet.status, str(status_labels.get(timesheet.status, '')),
+            ])),
+            owner_id=timesheet.user_id,
+        )
+
+
+def create_search_index(apps, schema_editor):
+    SearchDocument = apps.get_model('core', 'SearchDocument')
+    create_index(schema_editor)
+    batch = []
+    for document in documents(apps):
+        batch.append(SearchDocument(**document))
+        if len(batch) >= 1000:
+            SearchDocument.objects.bulk_create(batch)
+            batch = []
+    SearchDocument.objects.bulk_create(batch)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS core_searchdocument_vector_gin")
+        schema_editor.execute("ALTER TABLE core_searchdocument DROP COLUMN IF EXISTS search_vector")
+    elif vendor == 'sqlite':
+        for suffix in ('ai', 'ad', 'au'):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_create_default_admin'),
+        ('projects', '0009_issue_colleagues'),
+        ('timesheet', '0007_weeklyhoursrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('ticket', 'Chamado'), ('task', 'Tarefa'), ('project', 'Projeto'), ('timesheet', 'Folha de ponto')], max_length=20)),
+                ('object_id', models.PositiveIntegerField()),
+                ('public_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('title', models.CharField(max_length=255)),
+                ('body', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('assignee', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('owner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Documento de busca',
+                'verbose_name_plural': 'Documentos de busca',
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='core_searchdocument_kind_object')],
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:45
+
+from django.db import migrations, models
+from django.db.models import Max
+
+# Frozen copy of apps.core.sequences at the time of this migration
+SEQUENCES = {
+    'projects.issue.public_id': ('projects', 'Issue', 'public_id'),
+    'helpdesk.ticket.public_id': ('helpdesk', 'Ticket', 'public_id'),
+}
+
+
+def pg_sequence_name(name):
+    return 'core_seq_' + name.replace('.', '_')
+
+
+def create_sequences(apps, schema_editor):
+    """Create (PostgreSQL) or seed (others) every sequence from the current maximum."""
+    Sequence = apps.get_model('core', 'Sequence')
+    for name, (app_label, model_name, field) in SEQUENCES.items():
+        start = apps.get_model(app_label, model_name).objects.aggregate(value=Max(field))['value'] or 0
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.execute(
+                f"CREATE SEQUENCE IF NOT EXISTS {pg_sequence_name(name)} START WITH {start + 1} MINVALUE 1"
+            )
+        else:
+            Sequence.objects.update_or_create(name=name, defaults={'last_value': start})
+
+
+def drop_sequences(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for name in SEQUENCES:
+            schema_editor.execute(f"DROP SEQUENCE IF EXISTS {pg_sequence_name(name)}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_searchdocument'),
+        ('helpdesk', '0004_ticket_public_id'),
+        ('projects', '0009_issue_colleagues'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Sequence',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('last_value', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Sequência',
+                'verbose_name_plural': 'Sequências',
+            },
+        ),
+        migrations.RunPython(create_sequences, drop_sequences),
+    ]
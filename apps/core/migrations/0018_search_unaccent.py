@@ -0,0 +1,55 @@
+from django.db import migrations
+
+# Text search configuration used by apps.core.search on PostgreSQL: 'simple'
+# with accents stripped, like the FTS5 tokenizer (remove_diacritics) on SQLite.
+CONFIG = 'core_search'
+
+
+def vector_sql(config):
+    return (
+        "ALTER TABLE core_searchdocument ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+        f"setweight(to_tsvector('{config}', coalesce(title, '')), 'A') || "
+        f"setweight(to_tsvector('{config}', coalesce(body, '')), 'B')) STORED"
+    )
+
+
+def rebuild_vector(schema_editor, config):
+    # A generated column's expression cannot be altered: drop and add it again
+    schema_editor.execute("DROP INDEX IF EXISTS core_searchdocument_vector_gin")
+    schema_editor.execute("ALTER TABLE core_searchdocument DROP COLUMN IF EXISTS search_vector")
+    schema_editor.execute(vector_sql(config))
+    schema_editor.execute(
+        "CREATE INDEX core_searchdocument_vector_gin ON core_searchdocument USING gin (search_vector)"
+    )
+
+
+def use_unaccent(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    schema_editor.execute(f"DROP TEXT SEARCH CONFIGURATION IF EXISTS {CONFIG}")
+    schema_editor.execute(f"CREATE TEXT SEARCH CONFIGURATION {CONFIG} (COPY = simple)")
+    schema_editor.execute(
+        f"ALTER TEXT SEARCH CONFIGURATION {CONFIG} "
+        "ALTER MAPPING FOR hword, hword_part, word WITH unaccent, simple"
+    )
+    rebuild_vector(schema_editor, CONFIG)
+
+
+def use_simple(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    rebuild_vector(schema_editor, 'simple')
+    # The extension is left installed: other schemas may rely on it
+    schema_editor.execute(f"DROP TEXT SEARCH CONFIGURATION IF EXISTS {CONFIG}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_sequence'),
+    ]
+
+    operations = [
+        migrations.RunPython(use_unaccent, use_simple),
+    ]
@@ -1,9 +1,13 @@
 from django.contrib.auth.models import AbstractUser, UserManager, Group, Permission
 from django.db import models
 from django.utils.translation import gettext_lazy as _
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
 from django.dispatch import receiver
 
+from apps.timesheet.signals import time_entries_bulk_saved
+
+from .access import bump_module_access_version
+
 class User(AbstractUser):
     class Role(models.TextChoices):
         ADMIN = 'ADMIN', _('Admin')
@@ -134,3 +138,168 @@ def _sync_perms_from_flags(gma: GroupModuleAccess):
 @receiver(post_save, sender=GroupModuleAccess)
 def sync_group_permissions(sender, instance, **kwargs):
     _sync_perms_from_flags(instance)
+    bump_module_access_version()
+
+
+@receiver(post_delete, sender=GroupModuleAccess)
+@receiver(post_delete, sender=Group)
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_module_access(sender, **kwargs):
+    # Membership or permission changes alter the cached navigation flags
+    if kwargs.get('action', 'post_').startswith('post_'):
+        bump_module_access_version()
+
+
+class SearchDocument(models.Model):
+    """Denormalized searchable text, one row per indexed ticket, task, project or timesheet.
+
+    Maintained by the receivers below and rebuilt with ``rebuild_search_index``.
+    The full-text index itself (tsvector/GIN on PostgreSQL, FTS5 on SQLite) is
+    created by migration 0016 outside of the model; see ``apps.core.search``.
+    """
+    class Kind(models.TextChoices):
+        TICKET = 'ticket', _('Chamado')
+        TASK = 'task', _('Tarefa')
+        PROJECT = 'project', _('Projeto')
+        TIMESHEET = 'timesheet', _('Folha de ponto')
+
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    object_id = models.PositiveIntegerField()
+    public_id = models.PositiveIntegerField(null=True, blank=True)
+    title = models.CharField(max_length=255)
+    body = models.TextField(blank=True)
+    # Visibility columns: issue creator / timesheet user, and issue assignee
+    owner = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    assignee = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('Documento de busca')
+        verbose_name_plural = _('Documentos de busca')
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='core_searchdocument_kind_object'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.object_id}"
+
+
+@receiver(post_save, sender='projects.Issue')
+@receiver(post_save, sender='projects.Project')
+@receiver(post_save, sender='timesheet.Timesheet')
+def update_search_document(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    from .search import index_instance
+    from .suggest import bump_suggest_version, suggest_index
+    index_instance(instance)
+    if sender._meta.label != 'timesheet.Timesheet':
+        suggest_index.update(instance)
+        bump_suggest_version()
+
+
+@receiver(post_delete, sender='projects.Issue')
+@receiver(post_delete, sender='projects.Project')
+@receiver(post_delete, sender='timesheet.Timesheet')
+def delete_search_document(sender, instance, **kwargs):
+    from .search import remove_instance
+    from .suggest import bump_suggest_version, suggest_index
+    remove_instance(instance)
+    if sender._meta.label != 'timesheet.Timesheet':
+        suggest_index.remove(instance)
+        bump_suggest_version()
+
+
+# Fields copied into search documents (timesheets) and suggestions (plus is_active)
+USER_DOCUMENT_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(pre_save, sender=User)
+@receiver(pre_save, sender=InternalUser)
+@receiver(pre_save, sender=ExternalUser)
+def remember_user_document_fields(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or not instance.pk or (update_fields is not None and not {*USER_DOCUMENT_FIELDS, 'is_active'} & set(update_fields)):
+        instance._document_old = None
+        return
+    instance._document_old = User.objects.filter(pk=instance.pk).values_list(*USER_DOCUMENT_FIELDS, 'is_active').first()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=InternalUser)
+@receiver(post_save, sender=ExternalUser)
+def update_user_search_documents(sender, instance, created, raw=False, **kwargs):
+    # Documents carry the username and full name; skip saves that did not change them
+    if raw:
+        return
+    old = getattr(instance, '_document_old', None)
+    instance._document_old = None
+    current = tuple(getattr(instance, field) for field in USER_DOCUMENT_FIELDS) + (instance.is_active,)
+    if not created and (old is None or old == current):
+        return
+    from .search import index_many
+    from .suggest import bump_suggest_version, suggest_index
+    suggest_index.update(instance)
+    bump_suggest_version()
+    if created or old[:-1] == current[:-1]:
+        return
+    index_many(instance.timesheets.select_related('user'))
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=InternalUser)
+@receiver(post_delete, sender=ExternalUser)
+def delete_user_suggestions(sender, instance, **kwargs):
+    from .suggest import bump_suggest_version, suggest_index
+    suggest_index.remove(instance)
+    bump_suggest_version()
+
+
+@receiver(pre_save, sender='timesheet.TimeEntry')
+def remember_cached_entry_project(sender, instance, raw=False, **kwargs):
+    if raw or not instance.pk:
+        instance._cache_old_project = None
+        return
+    instance._cache_old_project = sender.objects.filter(pk=instance.pk).values_list('project_id', flat=True).first()
+
+
+@receiver(post_save, sender='projects.Project')
+@receiver(post_save, sender='projects.Issue')
+@receiver(post_save, sender='timesheet.TimeEntry')
+@receiver(post_save, sender='timesheet.Timesheet')
+@receiver(post_delete, sender='projects.Project')
+@receiver(post_delete, sender='projects.Issue')
+@receiver(post_delete, sender='timesheet.TimeEntry')
+@receiver(post_delete, sender='timesheet.Timesheet')
+def invalidate_cached_queries(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    from .caching import bump_tags, invalidate, tag_for
+    invalidate(instance)
+    # An entry moved to another project also changes the old one
+    old_project = getattr(instance, '_cache_old_project', None)
+    instance._cache_old_project = None
+    if old_project and old_project != instance.project_id:
+        bump_tags(tag_for('time_entry', project=old_project))
+
+
+@receiver(time_entries_bulk_saved)
+def invalidate_cached_entries(sender, entry_ids, **kwargs):
+    from apps.timesheet.models import TimeEntry
+    from .caching import bump_tags, tag_for
+    project_ids = TimeEntry.objects.filter(pk__in=entry_ids).values_list('project_id', flat=True).distinct()
+    bump_tags('time_entry', *(tag_for('time_entry', project=pk) for pk in project_ids if pk))
+
+
+class Sequence(models.Model):
+    """Counter row per named sequence, used by ``apps.core.sequences`` on databases without native sequences."""
+    name = models.CharField(max_length=100, primary_key=True)
+    last_value = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = _('Sequência')
+        verbose_name_plural = _('Sequências')
+
+    def __str__(self):
+        return f"{self.name} = {self.last_value}"
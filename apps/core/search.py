@@ -0,0 +1,269 @@
+"""
+Global search over the denormalized ``SearchDocument`` table.
+
+Each ticket, task, project and timesheet has one document (title, body and the
+columns the visibility rules need). Matching goes through a real full-text
+index so lookups stay flat as the tables grow:
+
+* PostgreSQL: generated ``search_vector`` tsvector column with a GIN index
+  (title weighted A, body B), ranked with ``ts_rank``. The ``core_search``
+  text search configuration (``simple`` plus ``unaccent``, migration 0018)
+  strips accents from documents and queries alike;
+* SQLite: external-content FTS5 table ``core_searchdocument_fts`` kept in sync
+  by triggers, ranked with ``bm25``;
+* anything else: ``icontains`` on the document table.
+
+Every query term is matched as a prefix and all terms must match. Accents are
+ignored by the full-text backends.
+"""
+import re
+
+from django.apps import apps as global_apps
+from django.db import connection, transaction
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'core_searchdocument_fts'
+# PostgreSQL text search configuration, created by migration 0018
+SEARCH_CONFIG = 'core_search'
+MAX_TERMS = 8
+RESULTS_PER_KIND = 10
+
+# Issue.IssueType values -> document kind (historical models in migrations have no IssueType)
+ISSUE_KINDS = {'Help Desk': 'ticket', 'Tarefa': 'task'}
+
+MODEL_KINDS = {
+    'projects.Issue': ('ticket', 'task'),
+    'projects.Project': ('project',),
+    'timesheet.Timesheet': ('timesheet',),
+}
+
+
+def issue_document(issue):
+    kind = ISSUE_KINDS.get(issue.issue_type)
+    if kind is None:
+        return None
+    return {
+        'kind': kind,
+        'object_id': issue.pk,
+        'public_id': issue.public_id,
+        'title': issue.title[:255],
+        'body': issue.description or '',
+        'owner_id': issue.created_by_id,
+        'assignee_id': issue.assigned_to_id,
+    }
+
+
+def project_document(project):
+    return {
+        'kind': 'project',
+        'object_id': project.pk,
+        'public_id': None,
+        'title': project.name[:255],
+        'body': project.description or '',
+        'owner_id': None,
+        'assignee_id': None,
+    }
+
+
+def timesheet_document(timesheet):
+    user = timesheet.user
+    period = f"{timesheet.start_date:%d/%m/%Y} {timesheet.end_date:%d/%m/%Y}"
+    return {
+        'kind': 'timesheet',
+        'object_id': timesheet.pk,
+        'public_id': None,
+        'title': f"{user.username} {period}"[:255],
+        'body': ' '.join(filter(None, [
+            user.first_name, user.last_name, timesheet.status, str(timesheet.get_status_display()),
+        ])),
+        'owner_id': timesheet.user_id,
+        'assignee_id': None,
+    }
+
+
+BUILDERS = {
+    'projects.Issue': issue_document,
+    'projects.Project': project_document,
+    'timesheet.Timesheet': timesheet_document,
+}
+
+
+def index_instance(instance):
+    """Create, update or drop the document of ``instance`` after it was saved."""
+    from .models import SearchDocument
+
+    label = instance._meta.label
+    document = BUILDERS[label](instance)
+    stale = SearchDocument.objects.filter(kind__in=MODEL_KINDS[label], object_id=instance.pk)
+    if document is None:
+        stale.delete()
+        return
+    # An issue whose type changed moves from one kind to the other
+    stale.exclude(kind=document['kind']).delete()
+    SearchDocument.objects.update_or_create(
+        kind=document.pop('kind'), object_id=document.pop('object_id'), defaults=document,
+    )
+
+
+def index_many(instances):
+    """Rewrite the documents of ``instances`` (one model) after a queryset ``update()``."""
+    from .models import SearchDocument
+
+    instances = list(instances)
+    if not instances:
+        return
+    label = instances[0]._meta.label
+    documents = [document for document in map(BUILDERS[label], instances) if document is not None]
+    with transaction.atomic():
+        SearchDocument.objects.filter(
+            kind__in=MODEL_KINDS[label], object_id__in=[instance.pk for instance in instances],
+        ).delete()
+        SearchDocument.objects.bulk_create([SearchDocument(**document) for document in documents])
+
+
+def remove_instance(instance):
+    from .models import SearchDocument
+
+    SearchDocument.objects.filter(kind__in=MODEL_KINDS[instance._meta.label], object_id=instance.pk).delete()
+
+
+def _sources(apps):
+    Issue = apps.get_model('projects', 'Issue')
+    Project = apps.get_model('projects', 'Project')
+    Timesheet = apps.get_model('timesheet', 'Timesheet')
+    yield issue_document, Issue.objects.only(
+        'id', 'public_id', 'title', 'description', 'issue_type', 'created_by_id', 'assigned_to_id',
+    )
+    yield project_document, Project.objects.only('id', 'name', 'description')
+    yield timesheet_document, Timesheet.objects.select_related('user').only(
+        'id', 'start_date', 'end_date', 'status', 'user__username', 'user__first_name', 'user__last_name',
+    )
+
+
+def rebuild(apps=global_apps, batch_size=1000):
+    """Rewrite every document from the source tables (``manage.py rebuild_search_index``)."""
+    SearchDocument = apps.get_model('core', 'SearchDocument')
+    written = 0
+    with transaction.atomic():
+        SearchDocument.objects.all().delete()
+        batch = []
+        for build, queryset in _sources(apps):
+            for obj in queryset.order_by('pk').iterator(chunk_size=batch_size):
+                document = build(obj)
+                if document is None:
+                    continue
+                batch.append(SearchDocument(**document))
+                if len(batch) >= batch_size:
+                    SearchDocument.objects.bulk_create(batch)
+                    written += len(batch)
+                    batch = []
+        SearchDocument.objects.bulk_create(batch)
+        written += len(batch)
+    return written
+
+
+_backends = {}
+
+
+def backend():
+    """'postgresql', 'fts5' or 'like', detected once per database."""
+    key = connection.settings_dict['NAME']
+    if key not in _backends:
+        if connection.vendor == 'postgresql':
+            _backends[key] = 'postgresql'
+        elif connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names():
+            _backends[key] = 'fts5'
+        else:
+            _backends[key] = 'like'
+    return _backends[key]
+
+
+def parse_terms(query):
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def match_text(queryset, terms):
+    """Restrict ``queryset`` to documents matching every term as a prefix, ordered by relevance."""
+    kind = backend()
+    if kind == 'postgresql':
+        params = (SEARCH_CONFIG, ' & '.join(f"{term}:*" for term in terms))
+        return queryset.filter(
+            RawSQL("core_searchdocument.search_vector @@ to_tsquery(%s::regconfig, %s)", params, BooleanField()),
+        ).annotate(
+            rank=RawSQL("ts_rank(core_searchdocument.search_vector, to_tsquery(%s::regconfig, %s))", params, FloatField()),
+        ).order_by('-rank', '-object_id')
+    if kind == 'fts5':
+        # Joined (not a correlated subquery) so FTS5 evaluates the MATCH once;
+        # bm25 is lower-is-better and the title weighs 10x the body
+        return queryset.extra(
+            select={'rank': f"bm25({FTS_TABLE}, 10.0, 1.0)"},
+            tables=[FTS_TABLE],
+            where=[f"{FTS_TABLE}.rowid = core_searchdocument.id", f"{FTS_TABLE} MATCH %s"],
+            params=(' '.join(f'"{term}"*' for term in terms),),
+        ).order_by('rank', '-object_id')
+    for term in terms:
+        queryset = queryset.filter(Q(title__icontains=term) | Q(body__icontains=term))
+    return queryset.order_by('-object_id')
+
+
+def search_documents(query, kind, visibility=Q(), limit=RESULTS_PER_KIND):
+    """Ranked ``object_id`` list of ``kind`` documents matching ``query`` within ``visibility``.
+
+    For tickets and tasks a ``#123`` style query also matches the id or
+    public id; those hits come first.
+    """
+    from .models import SearchDocument
+
+    terms = parse_terms(query)
+    if not terms:
+        return []
+    documents = SearchDocument.objects.filter(visibility, kind=kind)
+    ids = []
+    number = query.strip().lstrip('#')
+    if number.isdigit() and kind in ('ticket', 'task'):
+        ids = list(
+            documents.filter(Q(object_id=int(number)) | Q(public_id=int(number)))
+            .order_by('-object_id').values_list('object_id', flat=True)[:limit]
+        )
+    for object_id in match_text(documents, terms).values_list('object_id', flat=True)[:limit]:
+        if len(ids) >= limit:
+            break
+        if object_id not in ids:
+            ids.append(object_id)
+    return ids
+
+
+def _hydrate(queryset, ids):
+    objects = queryset.in_bulk(ids)
+    return [objects[pk] for pk in ids if pk in objects]
+
+
+def search(user, query, limit=RESULTS_PER_KIND):
+    """Results for GlobalSearchView, keeping its per-role visibility rules."""
+    from apps.projects.models import Issue, Project
+    from apps.timesheet.models import Timesheet
+
+    results = {'tickets': [], 'projects': [], 'tasks': [], 'timesheets': []}
+    if not parse_terms(query):
+        return results
+
+    if user.has_perm('helpdesk.view_ticket'):
+        ids = search_documents(query, 'ticket', Q(owner=user) | Q(assignee=user), limit)
+        results['tickets'] = _hydrate(Issue.objects.all(), ids)
+
+    if user.has_perm('projects.view_project'):
+        ids = search_documents(query, 'project', Q(), limit)
+        results['projects'] = _hydrate(Project.objects.all(), ids)
+
+    # Tarefas: limitadas as atribuidas se nao for staff
+    if user.has_perm('projects.view_task'):
+        ids = search_documents(query, 'task', Q() if user.is_staff else Q(assignee=user), limit)
+        results['tasks'] = _hydrate(Issue.objects.all(), ids)
+
+    # Timesheets: proprias; se staff, todas
+    if user.has_perm('timesheet.view_timesheet'):
+        ids = search_documents(query, 'timesheet', Q() if user.is_staff else Q(owner=user), limit)
+        results['timesheets'] = _hydrate(Timesheet.objects.select_related('user'), ids)
+
+    return results
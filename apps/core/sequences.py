@@ -0,0 +1,99 @@
+"""
+Allocation of human-facing numbers such as ``Issue.public_id`` and ``Ticket.public_id``.
+
+Replaces ``Max(public_id) + 1``, which scanned the index on every insert and
+raced under concurrent creates. On PostgreSQL each sequence is a native
+sequence (``nextval`` never blocks and is not rolled back). Elsewhere it is a
+``core.Sequence`` counter row bumped with a single ``UPDATE``; outside a
+transaction each process reserves ``PUBLIC_ID_BLOCK_SIZE`` values per round
+trip and hands them out from memory, so the row is touched once per block.
+Inside a transaction only one value is reserved, since a rollback also undoes
+the reservation.
+
+Numbers are unique and increasing per process but may have gaps (values
+reserved by a process that exits, or used by a rolled back transaction).
+"""
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+SEQUENCES = {
+    # name: (app_label, model_name, field)
+    'projects.issue.public_id': ('projects', 'Issue', 'public_id'),
+    'helpdesk.ticket.public_id': ('helpdesk', 'Ticket', 'public_id'),
+}
+
+
+def pg_sequence_name(name):
+    return 'core_seq_' + name.replace('.', '_')
+
+
+def current_max(apps, name):
+    from django.db.models import Max
+
+    app_label, model_name, field = SEQUENCES[name]
+    model = apps.get_model(app_label, model_name)
+    return model.objects.aggregate(value=Max(field))['value'] or 0
+
+
+class SequenceAllocator:
+    def __init__(self):
+        self._blocks = {}
+        self._lock = threading.Lock()
+
+    @property
+    def block_size(self):
+        return max(1, getattr(settings, 'PUBLIC_ID_BLOCK_SIZE', 10))
+
+    def next_value(self, name):
+        if connection.vendor == 'postgresql':
+            return self.reserve(name, 1)[0]
+        with self._lock:
+            block = self._blocks.get(name)
+            if block:
+                return block.popleft()
+        if connection.in_atomic_block:
+            # The reservation joins the caller's transaction and is undone with
+            # it: keeping the rest of a block would hand out values another
+            # process reserves after the rollback
+            return self.reserve(name, 1)[0]
+        values = self.reserve(name, self.block_size)
+        with self._lock:
+            self._blocks.setdefault(name, deque()).extend(values[1:])
+        return values[0]
+
+    def reserve(self, name, count):
+        """Reserve ``count`` values straight from the database (bypassing the local block)."""
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT nextval(%s) FROM generate_series(1, %s)", [pg_sequence_name(name), count],
+                )
+                return [row[0] for row in cursor.fetchall()]
+
+        from django.apps import apps
+        from .models import Sequence
+
+        rows = Sequence.objects.filter(name=name)
+        with transaction.atomic():
+            # A single UPDATE takes the write lock; no read-modify-write window
+            if not rows.update(last_value=F('last_value') + count):
+                # Sequence missing (e.g. a fresh test database): start after the current maximum
+                Sequence.objects.get_or_create(name=name, defaults={'last_value': current_max(apps, name)})
+                rows.update(last_value=F('last_value') + count)
+            last = rows.values_list('last_value', flat=True).get()
+        return list(range(last - count + 1, last + 1))
+
+    def clear(self):
+        with self._lock:
+            self._blocks.clear()
+
+
+allocator = SequenceAllocator()
+
+
+def next_value(name):
+    return allocator.next_value(name)
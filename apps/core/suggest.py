@@ -0,0 +1,295 @@
+"""
+Typeahead suggestions for the navbar search box.
+
+Suggestions come from an in-process prefix index over project names, issue
+titles and usernames: every word of a label is kept in a sorted list of
+``(word, object_id)`` pairs per kind and a prefix is looked up with
+``bisect``. Each kind holds at most ``SEARCH_SUGGEST_INDEX_SIZE`` of its most
+recent objects; when a kind has more, lookups that do not fill their limit
+from memory continue with the indexed ``SearchDocument`` prefix query (or a
+username filter). The index is loaded on first use, updated by the
+Issue/Project/User receivers in ``core.models`` once their transaction commits
+and reloaded every ``SEARCH_SUGGEST_INDEX_TTL`` seconds so that changes made by
+other processes are picked up. Results are also cached per user for a few
+seconds.
+"""
+import hashlib
+import threading
+import time
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.urls import reverse
+
+from .search import BUILDERS, match_text, parse_terms
+
+VERSION_KEY = 'core:suggest:version'
+RESULTS_TTL = 30
+MIN_PREFIX = 2
+DEFAULT_LIMIT = 5
+MAX_LIMIT = 10
+
+# Suggestion group per indexed kind, in display order
+GROUPS = {'ticket': 'tickets', 'task': 'tasks', 'project': 'projects', 'user': 'users'}
+
+DOCUMENT_FIELDS = ('object_id', 'public_id', 'title', 'owner_id', 'assignee_id')
+
+
+@dataclass(frozen=True)
+class Entry:
+    kind: str
+    object_id: int
+    label: str
+    number: int = None
+    owner_id: int = None
+    assignee_id: int = None
+
+    @property
+    def words(self):
+        words = set(parse_terms(self.label))
+        if self.number is not None:
+            words.add(str(self.number))
+        return words
+
+
+def document_entry(kind, object_id, public_id, title, owner_id, assignee_id):
+    number = None if kind == 'project' else public_id or object_id
+    return Entry(kind, object_id, title, number, owner_id, assignee_id)
+
+
+def user_entry(pk, username):
+    return Entry('user', pk, username, owner_id=pk)
+
+
+def bump_suggest_version():
+    """Invalidate every user's cached suggestions once the transaction commits."""
+    def bump():
+        try:
+            cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.set(VERSION_KEY, 2, None)
+    transaction.on_commit(bump)
+
+
+class PrefixIndex:
+    def __init__(self):
+        self._words = {}
+        self._entries = {}
+        self._truncated = set()
+        self._lock = threading.Lock()
+        self.loaded_at = None
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'SEARCH_SUGGEST_INDEX_TTL', 300)
+
+    @property
+    def size(self):
+        return max(1, getattr(settings, 'SEARCH_SUGGEST_INDEX_SIZE', 5000))
+
+    def _add(self, entry):
+        entries = self._entries.setdefault(entry.kind, {})
+        words = self._words.setdefault(entry.kind, [])
+        entries[entry.object_id] = entry
+        for word in entry.words:
+            insort(words, (word, entry.object_id))
+        if len(entries) > self.size:
+            # Keep the most recent objects; older ones are found through the database
+            self._remove(entry.kind, min(entries))
+            self._truncated.add(entry.kind)
+
+    def _remove(self, kind, object_id):
+        entry = self._entries.get(kind, {}).pop(object_id, None)
+        if entry is None:
+            return
+        words = self._words[kind]
+        for word in entry.words:
+            position = bisect_left(words, (word, object_id))
+            if position < len(words) and words[position] == (word, object_id):
+                del words[position]
+
+    def load(self):
+        from apps.core.models import SearchDocument, User
+
+        size = self.size
+        loaded = {}
+        for kind in ('ticket', 'task', 'project'):
+            rows = SearchDocument.objects.filter(kind=kind).order_by('-object_id').values_list(*DOCUMENT_FIELDS)
+            loaded[kind] = [document_entry(kind, *row) for row in rows[:size + 1]]
+        users = User.objects.filter(is_active=True).order_by('-pk').values_list('id', 'username')
+        loaded['user'] = [user_entry(*row) for row in users[:size + 1]]
+
+        truncated = {kind for kind, entries in loaded.items() if len(entries) > size}
+        entries = {kind: {entry.object_id: entry for entry in rows[:size]} for kind, rows in loaded.items()}
+        words = {
+            kind: sorted((word, object_id) for object_id, entry in rows.items() for word in entry.words)
+            for kind, rows in entries.items()
+        }
+        with self._lock:
+            self._entries = entries
+            self._words = words
+            self._truncated = truncated
+            self.loaded_at = time.monotonic()
+
+    def _ensure_loaded(self):
+        if self.loaded_at is None or time.monotonic() - self.loaded_at > self.ttl:
+            self.load()
+
+    def update(self, instance):
+        """Reflect a saved Issue, Project or User after commit; no-op until the index is loaded."""
+        if self.loaded_at is None:
+            return
+        kinds, pk, entry = self._kinds_for(instance), instance.pk, self._entry_for(instance)
+
+        def apply():
+            with self._lock:
+                for kind in kinds:
+                    self._remove(kind, pk)
+                if entry is not None:
+                    self._add(entry)
+        transaction.on_commit(apply)
+
+    def remove(self, instance):
+        if self.loaded_at is None:
+            return
+        kinds, pk = self._kinds_for(instance), instance.pk
+
+        def apply():
+            with self._lock:
+                for kind in kinds:
+                    self._remove(kind, pk)
+        transaction.on_commit(apply)
+
+    @staticmethod
+    def _kinds_for(instance):
+        label = instance._meta.concrete_model._meta.label
+        return {'projects.Issue': ('ticket', 'task'), 'projects.Project': ('project',)}.get(label, ('user',))
+
+    @staticmethod
+    def _entry_for(instance):
+        label = instance._meta.concrete_model._meta.label
+        if label in ('projects.Issue', 'projects.Project'):
+            document = BUILDERS[label](instance)
+            if document is None:
+                return None
+            return document_entry(*(document[field] for field in ('kind', *DOCUMENT_FIELDS)))
+        if not instance.is_active:
+            return None
+        return user_entry(instance.pk, instance.username)
+
+    def _match(self, kind, terms):
+        words = self._words.get(kind, [])
+        ids = None
+        # Narrowest term first keeps the candidate set small
+        for term in sorted(terms, key=len, reverse=True):
+            matched = set()
+            position = bisect_left(words, (term,))
+            while position < len(words) and words[position][0].startswith(term):
+                matched.add(words[position][1])
+                position += 1
+            ids = matched if ids is None else ids & matched
+            if not ids:
+                return []
+        return [self._entries[kind][object_id] for object_id in ids]
+
+    def lookup(self, terms, rules, limit):
+        """Entries whose label has a word starting with each term, ``limit`` per kind.
+
+        ``rules`` maps each kind the user may see to ``(predicate, condition)``:
+        a filter over index entries and the same filter as a ``Q`` for the
+        database fallback.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            candidates = {kind: self._match(kind, terms) for kind in rules}
+            truncated = self._truncated & set(rules)
+
+        grouped = {}
+        for kind, entries in candidates.items():
+            visible, condition = rules[kind]
+            # Labels that start with the first term first, then the most recent objects
+            entries.sort(key=lambda entry: (not entry.label.lower().startswith(terms[0]), -entry.object_id))
+            bucket = [entry for entry in entries if visible(entry)][:limit]
+            if len(bucket) < limit and kind in truncated:
+                exclude = [entry.object_id for entry in bucket]
+                bucket += database_lookup(kind, terms, condition, exclude, limit - len(bucket))
+            if bucket:
+                grouped[kind] = bucket
+        return grouped
+
+
+def database_lookup(kind, terms, condition, exclude, limit):
+    """Matches of ``kind`` outside the in-memory index, most relevant first."""
+    from apps.core.models import SearchDocument, User
+
+    if kind == 'user':
+        users = User.objects.filter(condition, is_active=True).exclude(pk__in=exclude)
+        for term in terms:
+            users = users.filter(username__icontains=term)
+        return [user_entry(*row) for row in users.order_by('-pk').values_list('id', 'username')[:limit]]
+    documents = SearchDocument.objects.filter(condition, kind=kind).exclude(object_id__in=exclude)
+    rows = match_text(documents, terms).values_list(*DOCUMENT_FIELDS)[:limit]
+    return [document_entry(kind, *row) for row in rows]
+
+
+suggest_index = PrefixIndex()
+
+
+def _visibility(user):
+    """Same rules as GlobalSearchView: ``{kind: (predicate over entries, Q)}``."""
+    rules = {}
+    if user.has_perm('helpdesk.view_ticket'):
+        rules['ticket'] = (
+            lambda entry: user.pk in (entry.owner_id, entry.assignee_id), Q(owner=user) | Q(assignee=user),
+        )
+    if user.has_perm('projects.view_project'):
+        rules['project'] = (lambda entry: True, Q())
+    # Tarefas: limitadas as atribuidas se nao for staff
+    if user.has_perm('projects.view_task'):
+        rules['task'] = (
+            lambda entry: user.is_staff or entry.assignee_id == user.pk, Q() if user.is_staff else Q(assignee=user),
+        )
+    # Usuários levam às folhas de ponto: próprias; se staff, todas
+    if user.has_perm('timesheet.view_timesheet'):
+        rules['user'] = (
+            lambda entry: user.is_staff or entry.owner_id == user.pk, Q() if user.is_staff else Q(pk=user.pk),
+        )
+    return rules
+
+
+def _url(entry):
+    if entry.kind == 'ticket':
+        return reverse('helpdesk:ticket_detail', args=[entry.object_id])
+    if entry.kind == 'task':
+        return reverse('projects:task_edit', args=[entry.object_id])
+    if entry.kind == 'project':
+        return reverse('projects:project_detail', args=[entry.object_id])
+    return f"{reverse('core:search')}?{urlencode({'q': entry.label})}"
+
+
+def get_suggestions(user, query, limit=DEFAULT_LIMIT):
+    """``{group: [{'id', 'number', 'label', 'url'}, ...]}`` for the typeahead, cached per user."""
+    terms = parse_terms(query)
+    if not terms or (max(len(term) for term in terms) < MIN_PREFIX and not terms[0].isdigit()):
+        return {}
+    limit = max(1, min(limit, MAX_LIMIT))
+    digest = hashlib.md5(f"{limit}:{' '.join(terms)}".encode('utf-8')).hexdigest()
+    key = f"core:suggest:{cache.get(VERSION_KEY, 1)}:{user.pk}:{digest}"
+    results = cache.get(key)
+    if results is None:
+        grouped = suggest_index.lookup(terms, _visibility(user), limit)
+        results = {
+            GROUPS[kind]: [
+                {'id': entry.object_id, 'number': entry.number, 'label': entry.label, 'url': _url(entry)}
+                for entry in grouped[kind]
+            ]
+            for kind in GROUPS
+            if grouped.get(kind)
+        }
+        cache.set(key, results, RESULTS_TTL)
+    return results
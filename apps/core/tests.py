@@ -1,3 +1,54 @@
-from django.test import TestCase
+from unittest import skipIf
 
-# Create your tests here.
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from .models import Sequence
+from .sequences import SequenceAllocator
+
+SEQUENCE = 'projects.issue.public_id'
+
+
+@skipIf(connection.vendor == 'postgresql', "Native sequences are not rolled back")
+@override_settings(PUBLIC_ID_BLOCK_SIZE=10)
+class SequenceAllocatorTests(TestCase):
+    def setUp(self):
+        Sequence.objects.update_or_create(name=SEQUENCE, defaults={'last_value': 0})
+        self.allocator = SequenceAllocator()
+
+    def last_value(self):
+        return Sequence.objects.get(name=SEQUENCE).last_value
+
+    def test_reserve_returns_consecutive_values(self):
+        self.assertEqual(self.allocator.reserve(SEQUENCE, 3), [1, 2, 3])
+        self.assertEqual(self.allocator.reserve(SEQUENCE, 2), [4, 5])
+        self.assertEqual(self.last_value(), 5)
+
+    def test_reserve_creates_missing_sequence(self):
+        Sequence.objects.filter(name=SEQUENCE).delete()
+        values = self.allocator.reserve(SEQUENCE, 2)
+        self.assertEqual(values, [values[0], values[0] + 1])
+        self.assertEqual(self.last_value(), values[-1])
+
+    def test_rolled_back_allocation_is_not_reused(self):
+        try:
+            with transaction.atomic():
+                self.assertEqual(self.allocator.next_value(SEQUENCE), 1)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual(self.last_value(), 0)
+
+        # Another process reserves the values released by the rollback
+        taken = self.allocator.reserve(SEQUENCE, self.allocator.block_size)
+        self.assertNotIn(self.allocator.next_value(SEQUENCE), taken)
+
+
+@skipIf(connection.vendor == 'postgresql', "Native sequences have no local block")
+@override_settings(PUBLIC_ID_BLOCK_SIZE=10)
+class SequenceAllocatorBlockTests(TransactionTestCase):
+    def test_block_is_cached_outside_transactions(self):
+        Sequence.objects.update_or_create(name=SEQUENCE, defaults={'last_value': 0})
+        allocator = SequenceAllocator()
+        self.assertEqual([allocator.next_value(SEQUENCE) for _ in range(3)], [1, 2, 3])
+        self.assertEqual(Sequence.objects.get(name=SEQUENCE).last_value, 10)
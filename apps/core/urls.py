@@ -15,6 +15,8 @@ from .views import (
     ProfileView,
     SettingsView,
     GlobalSearchView,
+    SearchSuggestView,
+    AlertsView,
     ForcePasswordChangeView,
 )
 
@@ -27,6 +29,8 @@ urlpatterns = [
     path('perfil/', ProfileView.as_view(), name='profile'),
     path('configuracoes/', SettingsView.as_view(), name='settings'),
     path('search/', GlobalSearchView.as_view(), name='search'),
+    path('search/suggest/', SearchSuggestView.as_view(), name='search_suggest'),
+    path('alertas/', AlertsView.as_view(), name='alerts'),
     path('portal/', portal_dashboard, name='portal_dashboard'),
     path('redefinir-senha/', ForcePasswordChangeView.as_view(), name='force_password_change'),
     path('forcar-troca/', RedirectView.as_view(pattern_name='core:force_password_change', permanent=True)),
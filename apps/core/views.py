@@ -2,6 +2,8 @@ from django.shortcuts import render, redirect
 from django.contrib.auth.views import LoginView
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.http import JsonResponse
+from django.views import View
 from django.views.generic import TemplateView, FormView, ListView, CreateView
 from django.urls import reverse_lazy
 from django.db.models import Q
@@ -10,6 +12,10 @@ from django.contrib import messages
 from django.contrib.auth import get_user_model, update_session_auth_hash
 
 from apps.projects.models import Issue
+from .alerts import get_alerts
+from .metrics import dashboard_metrics, portal_ticket_stats
+from .search import search
+from .suggest import DEFAULT_LIMIT, get_suggestions
 from .forms import ExternalUserForm, InternalUserForm
 
 class ForcePasswordChangeView(LoginRequiredMixin, FormView):
@@ -88,48 +94,16 @@ class DashboardView(LoginRequiredMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        from apps.projects.models import Project
-        from apps.timesheet.models import TimeEntry
-        from django.utils import timezone
-        from django.db.models import Sum
+        context.update(dashboard_metrics(self.request.user))
+        return context
 
-        user = self.request.user
 
-        # Tickets (Issues do tipo Help Desk) do usuario
-        context['open_tickets_count'] = Issue.objects.filter(
-            issue_type=Issue.IssueType.HELP_DESK,
-            status__in=[Issue.Status.TODO, Issue.Status.DOING],
-        ).filter(
-            Q(created_by=user) | Q(assigned_to=user)
-        ).distinct().count()
-        
-        # Horas no mes: apenas do usuario logado
-        now = timezone.now()
-        entries = TimeEntry.objects.filter(
-            date__year=now.year,
-            date__month=now.month,
-            timesheet__user=user
-        )
-        total_hours = entries.aggregate(total=Sum('hours'))['total'] or 0
-        context['total_hours_month'] = f"{int(total_hours)}h"
-        
-        # Projetos: apenas os visiveis ao usuario
-        if user.is_superuser or user.has_perm('projects.view_project') or user.has_perm('projects.change_project'):
-            projects_qs = Project.objects.all()
-        elif user.is_client():
-            projects_qs = Project.objects.filter(
-                external_access=True
-            ).filter(Q(client=user) | Q(team=user))
-        else:
-            projects_qs = Project.objects.filter(
-                Q(team=user) | Q(project_manager=user) | Q(project_owner=user)
-            )
-        context['active_projects_count'] = projects_qs.filter(status=Project.Status.IN_PROGRESS).distinct().count()
-        
-        # Tasks assigned to the current user (any status)
-        context['my_tasks_count'] = Issue.objects.filter(issue_type=Issue.IssueType.TASK, assigned_to=user).count()
-        
-        return context
+class AlertsView(LoginRequiredMixin, View):
+    """Alertas do usuário em JSON, carregados pela navbar depois da página."""
+
+    def get(self, request, *args, **kwargs):
+        alerts = get_alerts(request.user)
+        return JsonResponse({'count': len(alerts), 'alerts': alerts})
 
 
 class GlobalSearchView(LoginRequiredMixin, TemplateView):
@@ -138,61 +112,25 @@ class GlobalSearchView(LoginRequiredMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         query = self.request.GET.get('q', '').strip()
-        user = self.request.user
-
-        from apps.projects.models import Project
-        from apps.timesheet.models import Timesheet
-
-        results = {
-            'tickets': [],
-            'projects': [],
-            'tasks': [],
-            'timesheets': [],
-        }
-
-        if query:
-            # Tickets (Issues Help Desk)
-            if user.has_perm('helpdesk.view_ticket'):
-                ticket_filter = Q(title__icontains=query) | Q(description__icontains=query)
-                num = query.lstrip('#')
-                if num.isdigit():
-                    ticket_filter |= Q(id=int(num)) | Q(public_id=int(num))
-                tickets_qs = Issue.objects.filter(ticket_filter, issue_type=Issue.IssueType.HELP_DESK).filter(
-                    Q(created_by=user) | Q(assigned_to=user)
-                ).distinct()[:10]
-                results['tickets'] = tickets_qs
-
-            # Projetos
-            if user.has_perm('projects.view_project'):
-                results['projects'] = Project.objects.filter(
-                    Q(name__icontains=query) | Q(description__icontains=query)
-                ).distinct()[:10]
-
-            # Tarefas: limitadas as atribuidas se nao for staff
-            if user.has_perm('projects.view_task'):
-                task_filter = Q(title__icontains=query) | Q(description__icontains=query)
-                num = query.lstrip('#')
-                if num.isdigit():
-                    task_filter |= Q(id=int(num)) | Q(public_id=int(num))
-                if not user.is_staff:
-                    task_filter &= Q(assigned_to=user)
-                results['tasks'] = Issue.objects.filter(task_filter, issue_type=Issue.IssueType.TASK).distinct()[:10]
-
-            # Timesheets: proprias; se staff, todas
-            if user.has_perm('timesheet.view_timesheet'):
-                ts_filter = Q(user=user) if not user.is_staff else Q()
-                results['timesheets'] = Timesheet.objects.filter(
-                    ts_filter & (
-                        Q(user__username__icontains=query) |
-                        Q(status__icontains=query)
-                    )
-                ).select_related('user').distinct()[:10]
+        results = search(self.request.user, query)
 
         context['query'] = query
         context['results'] = results
         return context
 
 
+class SearchSuggestView(LoginRequiredMixin, View):
+    """Typeahead da busca: até ``limit`` sugestões por tipo para o prefixo digitado."""
+
+    def get(self, request, *args, **kwargs):
+        query = request.GET.get('q', '').strip()
+        try:
+            limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+        except ValueError:
+            limit = DEFAULT_LIMIT
+        return JsonResponse({'query': query, 'results': get_suggestions(request.user, query, limit)})
+
+
 class FAQView(LoginRequiredMixin, TemplateView):
     template_name = 'faq.html'
 
@@ -221,22 +159,13 @@ def portal_dashboard(request):
         return redirect('core:dashboard')
     
     tickets = []
-    stats = {
-        'open': 0,
-        'in_progress': 0,
-        'closed': 0
-    }
-
-    if getattr(request.user, 'client_project', None):
+    if request.user.client_project_id:
         tickets = Issue.objects.filter(
-            project=request.user.client_project,
+            project_id=request.user.client_project_id,
             issue_type=Issue.IssueType.HELP_DESK,
         ).order_by('-created_at')
-        
-        stats['open'] = tickets.filter(status=Issue.Status.TODO).count()
-        stats['in_progress'] = tickets.filter(status=Issue.Status.DOING).count()
-        stats['closed'] = tickets.filter(status=Issue.Status.DONE).count()
-    
+    stats = portal_ticket_stats(request.user)
+
     context = {
         'tickets': tickets[:5], # Show only recent 5
         'stats': stats
@@ -1,7 +1,9 @@
-from django.db import models, transaction
+from django.db import models
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 
+from apps.core import sequences
+
 class Category(models.Model):
     name = models.CharField(max_length=100)
     sla_hours = models.IntegerField(help_text="SLA in hours for resolution")
@@ -50,9 +52,7 @@ class Ticket(models.Model):
 
     def save(self, *args, **kwargs):
         if self.public_id is None:
-            with transaction.atomic():
-                last = Ticket.objects.aggregate(models.Max('public_id'))['public_id__max'] or 0
-                self.public_id = last + 1
+            self.public_id = sequences.next_value('helpdesk.ticket.public_id')
         return super().save(*args, **kwargs)
 
 class Comment(models.Model):
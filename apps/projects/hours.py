@@ -0,0 +1,100 @@
+"""
+Hours of a project by month and user, for ProjectHoursView.
+
+The matrix is grouped in the database over the weekly rollup (buckets never
+cross a month, so ``TruncMonth(period_start)`` is exact) and cached per
+project until one of its TimeEntry rows changes (the ``time_entry:project:<id>``
+tag, see ``core.caching``). Raw entries are paginated by keyset on ``(date, id)``.
+"""
+from datetime import date
+
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth
+
+from apps.core.caching import cached_query, tag_for
+from apps.timesheet.models import TimeEntry, WeeklyHoursRollup
+
+CACHE_TTL = 3600
+ENTRIES_PER_PAGE = 50
+
+
+def _compute_matrix(project_id):
+    rows = (
+        WeeklyHoursRollup.objects.filter(project_id=project_id)
+        .values(month=TruncMonth('period_start'), username=F('user__username'))
+        .annotate(hours=Sum('hours'))
+        .order_by()
+    )
+    months = {}
+    for row in rows:
+        if not row['hours']:
+            continue
+        month = months.setdefault(row['month'], {})
+        username = row['username'] or '-'
+        month[username] = month.get(username, 0) + row['hours']
+
+    matrix = []
+    for month in sorted(months, reverse=True):
+        per_user = sorted(
+            ({'user': user, 'hours': hours} for user, hours in months[month].items()),
+            key=lambda row: (-row['hours'], row['user']),
+        )
+        matrix.append({
+            'key': month.strftime('%Y-%m'),
+            'month': month,
+            'label': month.strftime('%b/%Y'),
+            'per_user': per_user,
+            'total': sum(row['hours'] for row in per_user),
+        })
+    return matrix
+
+
+def month_user_matrix(project_id):
+    """``[{'key', 'month', 'label', 'per_user': [{'user', 'hours'}], 'total'}]``, newest month first."""
+    return cached_query(
+        f'projects:hours:{project_id}', [tag_for('time_entry', project=project_id)], CACHE_TTL,
+        lambda: _compute_matrix(project_id),
+    )
+
+
+def user_totals(matrix):
+    """Whole-project hours per user, from the month matrix."""
+    totals = {}
+    for month in matrix:
+        for row in month['per_user']:
+            totals[row['user']] = totals.get(row['user'], 0) + row['hours']
+    return sorted(({'user': user, 'hours': hours} for user, hours in totals.items()), key=lambda row: (-row['hours'], row['user']))
+
+
+def encode_cursor(entry):
+    return f'{entry.date.isoformat()}.{entry.pk}'
+
+
+def decode_cursor(cursor):
+    """``(date, id)`` or None for a missing/invalid cursor (first page)."""
+    try:
+        day, pk = cursor.split('.')
+        return date.fromisoformat(day), int(pk)
+    except (AttributeError, ValueError):
+        return None
+
+
+def entries_page(project_id, cursor=None, per_page=ENTRIES_PER_PAGE):
+    """
+    One page of the project's entries, newest first, and the cursor of the next page.
+
+    Seeks from the last ``(date, id)`` seen instead of an OFFSET, so deep pages
+    cost the same as the first one.
+    """
+    entries = (
+        TimeEntry.objects.filter(project_id=project_id)
+        .select_related('task', 'activity', 'timesheet__user')
+        .order_by('-date', '-id')
+    )
+    position = decode_cursor(cursor)
+    if position is not None:
+        day, pk = position
+        entries = entries.filter(date__lte=day).exclude(date=day, id__gte=pk)
+    entries = list(entries[:per_page + 1])
+    next_cursor = encode_cursor(entries[per_page - 1]) if len(entries) > per_page else None
+    return entries[:per_page], next_cursor
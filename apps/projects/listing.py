@@ -0,0 +1,115 @@
+"""
+Project list figures (hours, open tasks, budget burn), filters and sorting.
+
+Shared by ProjectListView and its JSON twin ProjectListDataView. Every
+figure is a correlated subquery on an indexed table (the weekly hours
+rollup, ``Issue(project)``), so visibility filtering never multiplies the
+rows being summed and there is no GROUP BY over the project columns.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, NullIf
+
+from apps.timesheet.models import WeeklyHoursRollup
+
+from .models import Issue, Project
+
+SORT_FIELDS = {
+    'name': 'name',
+    'status': 'status',
+    'start_date': 'start_date',
+    'end_date': 'end_date',
+    'budget': 'budget',
+    'total_hours': 'total_hours',
+    'open_tasks': 'open_tasks',
+    'budget_burn': 'budget_burn',
+    'created_at': 'created_at',
+}
+DEFAULT_SORT = '-created_at'
+OPEN_STATUSES = (Issue.Status.TODO, Issue.Status.DOING)
+
+
+def annotate_figures(queryset):
+    """Add ``total_hours``, ``open_tasks`` and ``budget_burn`` (percent of the budget, or None)."""
+    hours = (
+        WeeklyHoursRollup.objects.filter(project=OuterRef('pk'))
+        .order_by()
+        .values('project')
+        .annotate(total=Sum('hours'))
+        .values('total')
+    )
+    open_tasks = (
+        Issue.objects.filter(project=OuterRef('pk'), issue_type=Issue.IssueType.TASK, status__in=OPEN_STATUSES)
+        .order_by()
+        .values('project')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    money = DecimalField(max_digits=20, decimal_places=2)
+    queryset = queryset.annotate(
+        total_hours=Coalesce(Subquery(hours), Value(Decimal('0')), output_field=money),
+        open_tasks=Coalesce(Subquery(open_tasks, output_field=IntegerField()), Value(0)),
+    )
+    hourly_cost = getattr(settings, 'PROJECT_HOURLY_COST', Decimal('0'))
+    if not hourly_cost:
+        # No cost rate configured: hours cannot be turned into money
+        return queryset.annotate(budget_burn=Value(None, output_field=money))
+    return queryset.annotate(
+        budget_burn=ExpressionWrapper(
+            F('total_hours') * Value(hourly_cost) * Value(100) / NullIf(F('budget'), Value(0)),
+            output_field=money,
+        ),
+    )
+
+
+def apply_filters(queryset, params):
+    """``q`` (name), ``status`` (repeatable), ``external_access`` (1/0), ``has_open_tasks`` (1/0)."""
+    term = params.get('q', '').strip()
+    if term:
+        queryset = queryset.filter(name__icontains=term)
+    statuses = [status for status in params.getlist('status') if status in Project.Status.values]
+    if statuses:
+        queryset = queryset.filter(status__in=statuses)
+    if params.get('external_access') in ('0', '1'):
+        queryset = queryset.filter(external_access=params['external_access'] == '1')
+    if params.get('has_open_tasks') in ('0', '1'):
+        lookup = Q(open_tasks__gt=0)
+        queryset = queryset.filter(lookup) if params['has_open_tasks'] == '1' else queryset.exclude(lookup)
+    return queryset
+
+
+def sort_key(params):
+    """Validated ``sort`` parameter (``field`` or ``-field``)."""
+    sort = params.get('sort', DEFAULT_SORT)
+    return sort if sort.lstrip('-') in SORT_FIELDS else DEFAULT_SORT
+
+
+def apply_sort(queryset, sort):
+    field = F(SORT_FIELDS[sort.lstrip('-')])
+    field = field.desc(nulls_last=True) if sort.startswith('-') else field.asc(nulls_last=True)
+    # pk breaks ties so pages are stable
+    return queryset.order_by(field, '-pk' if sort.startswith('-') else 'pk')
+
+
+def project_list(queryset, params):
+    """Visible ``queryset`` with figures, filtered and sorted from request ``params``."""
+    return apply_sort(apply_filters(annotate_figures(queryset), params), sort_key(params))
+
+
+def as_json(project):
+    return {
+        'id': project.pk,
+        'name': project.name,
+        'status': project.status,
+        'status_display': str(project.get_status_display()),
+        'start_date': project.start_date,
+        'end_date': project.end_date,
+        'external_access': project.external_access,
+        'budget': project.budget,
+        'currency': project.currency,
+        'total_hours': project.total_hours,
+        'open_tasks': project.open_tasks,
+        'budget_burn': project.budget_burn,
+    }
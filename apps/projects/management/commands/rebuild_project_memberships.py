@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from apps.projects import membership
+
+
+class Command(BaseCommand):
+    help = "Reconstrói a tabela de participação em projetos (ProjectMembership) a partir dos projetos e equipes."
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING("Reconstruindo participações em projetos..."))
+        written = membership.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Concluído. {written} participação(ões) gravadas."))
@@ -0,0 +1,173 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Issue, Project, ProjectMembership
+
+VERSION_KEY = 'projects:members:version'
+CACHE_TTL = 300
+
+Role = ProjectMembership.Role
+MEMBER_ROLES = (Role.TEAM, Role.MANAGER, Role.OWNER)
+CLIENT_ROLES = (Role.CLIENT, Role.TEAM)
+FK_ROLES = {
+    Role.CLIENT: 'client_id',
+    Role.MANAGER: 'project_manager_id',
+    Role.OWNER: 'project_owner_id',
+}
+
+
+def bump_members_version():
+    """Invalidate the cached project -> members map."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 2, None)
+
+
+def _member_rows():
+    """(project_id, user_id, username, first_name, last_name) of active team members, managers and owners."""
+    return (
+        ProjectMembership.objects
+        .filter(role__in=MEMBER_ROLES, user__is_active=True)
+        .values_list('project_id', 'user_id', 'user__username', 'user__first_name', 'user__last_name')
+        .distinct()
+    )
+
+
+def _compute_members_map():
+    members = {}
+    for project_id, user_id, username, first_name, last_name in _member_rows():
+        name = f"{first_name} {last_name}".strip() or username
+        members.setdefault(project_id, []).append((username, {'id': user_id, 'name': name}))
+    return {
+        project_id: [member for _, member in sorted(rows, key=lambda row: row[0])]
+        for project_id, rows in members.items()
+    }
+
+
+def get_members_map():
+    """``{project_id: [{'id', 'name'}, ...]}`` for every project, members ordered by username."""
+    key = f"projects:members:{cache.get(VERSION_KEY, 1)}"
+    members = cache.get(key)
+    if members is None:
+        members = _compute_members_map()
+        cache.set(key, members, CACHE_TTL)
+    return members
+
+
+def get_project_members(project_id):
+    return get_members_map().get(project_id, [])
+
+
+# Maintenance (called from the receivers in projects.models)
+
+def sync_fk_memberships(project):
+    """Align the client/manager/owner rows of ``project`` with its foreign keys."""
+    wanted = {(role, getattr(project, field)) for role, field in FK_ROLES.items() if getattr(project, field)}
+    current = set(
+        ProjectMembership.objects
+        .filter(project=project, role__in=FK_ROLES)
+        .values_list('role', 'user_id')
+    )
+    stale = current - wanted
+    if stale:
+        condition = Q()
+        for role, user_id in stale:
+            condition |= Q(role=role, user_id=user_id)
+        ProjectMembership.objects.filter(condition, project=project).delete()
+    ProjectMembership.objects.bulk_create(
+        [ProjectMembership(project=project, role=role, user_id=user_id) for role, user_id in wanted - current],
+        ignore_conflicts=True,
+    )
+    if stale or wanted - current:
+        bump_members_version()
+
+
+def sync_team_change(instance, action, reverse, pk_set):
+    """Apply a ``team`` m2m_changed event, from either side of the relation."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    team = ProjectMembership.objects.filter(role=Role.TEAM)
+    team = team.filter(user=instance) if reverse else team.filter(project=instance)
+    if action == 'post_clear':
+        team.delete()
+    elif action == 'post_remove':
+        team.filter(**{'project_id__in' if reverse else 'user_id__in': pk_set}).delete()
+    else:
+        ProjectMembership.objects.bulk_create(
+            [
+                ProjectMembership(role=Role.TEAM, project_id=pk if reverse else instance.pk,
+                                  user_id=instance.pk if reverse else pk)
+                for pk in pk_set
+            ],
+            ignore_conflicts=True,
+        )
+    bump_members_version()
+
+
+def rebuild():
+    """Rewrite every membership row from the projects. Returns the number of rows."""
+    rows = [
+        ProjectMembership(project_id=project_id, user_id=user_id, role=Role.TEAM)
+        for project_id, user_id in Project.team.through.objects.values_list('project_id', 'user_id')
+    ]
+    for project_id, *user_ids in Project.objects.values_list('id', *FK_ROLES.values()):
+        rows += [
+            ProjectMembership(project_id=project_id, user_id=user_id, role=role)
+            for role, user_id in zip(FK_ROLES, user_ids)
+            if user_id
+        ]
+    with transaction.atomic():
+        ProjectMembership.objects.all().delete()
+        ProjectMembership.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+    bump_members_version()
+    return len(rows)
+
+
+# Visibility
+
+def member_project_ids(user, roles=MEMBER_ROLES):
+    """Subquery of ids of the projects where ``user`` holds one of ``roles``."""
+    return ProjectMembership.objects.filter(user=user, role__in=roles).values('project_id')
+
+
+def visible_project_ids(user):
+    """
+    Subquery of the project ids ``user`` can see through membership.
+
+    Internal users see projects where they are on the team, manager or owner;
+    clients see projects with external access where they are client or team.
+    Use as ``pk__in``/``project__in`` so the outer query needs no join and no
+    DISTINCT. Callers handle users with global permissions themselves.
+    """
+    if getattr(user, 'role', None) == user.Role.CLIENT:
+        return (
+            ProjectMembership.objects
+            .filter(user=user, role__in=CLIENT_ROLES, project__external_access=True)
+            .values('project_id')
+        )
+    return member_project_ids(user)
+
+
+def visible_projects(user, queryset=None):
+    queryset = Project.objects.all() if queryset is None else queryset
+    return queryset.filter(pk__in=visible_project_ids(user))
+
+
+def colleague_issue_ids(user):
+    return Issue.colleagues.through.objects.filter(user=user).values('issue_id')
+
+
+def visible_issues(user, queryset=None, involved=False):
+    """
+    Issues of projects visible to ``user``.
+
+    With ``involved``, internal users also see issues they are assigned to or
+    collaborate on, whatever the project.
+    """
+    queryset = Issue.objects.all() if queryset is None else queryset
+    condition = Q(project__in=visible_project_ids(user))
+    if involved and getattr(user, 'role', None) != user.Role.CLIENT:
+        condition |= Q(assigned_to=user) | Q(pk__in=colleague_issue_ids(user))
+    return queryset.filter(condition)
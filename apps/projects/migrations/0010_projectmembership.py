@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_memberships(apps, schema_editor):
+    Project = apps.get_model('projects', 'Project')
+    ProjectMembership = apps.get_model('projects', 'ProjectMembership')
+    rows = [
+        ProjectMembership(project_id=project_id, user_id=user_id, role='TEAM')
+        for project_id, user_id in Project.team.through.objects.values_list('project_id', 'user_id')
+    ]
+    fk_roles = (('CLIENT', 'client_id'), ('MANAGER', 'project_manager_id'), ('OWNER', 'project_owner_id'))
+    for project_id, *user_ids in Project.objects.values_list('id', *[field for _, field in fk_roles]):
+        rows += [
+            ProjectMembership(project_id=project_id, user_id=user_id, role=role)
+            for (role, _), user_id in zip(fk_roles, user_ids)
+            if user_id
+        ]
+    ProjectMembership.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0009_issue_colleagues'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('TEAM', 'Team'), ('MANAGER', 'Project Manager'), ('OWNER', 'Project Owner'), ('CLIENT', 'Client')], max_length=20)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='projects.project')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='project_memberships', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Project Membership',
+                'verbose_name_plural': 'Project Memberships',
+                'constraints': [models.UniqueConstraint(fields=('user', 'role', 'project'), name='projects_membership_user_role_project')],
+            },
+        ),
+        migrations.RunPython(populate_memberships, migrations.RunPython.noop),
+    ]
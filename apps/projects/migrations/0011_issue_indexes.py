@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0010_projectmembership'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['issue_type', 'status', 'due_date'], name='projects_is_issue_t_b9aeac_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['assigned_to', 'issue_type'], name='projects_is_assigne_267c4a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(condition=models.Q(('status__in', ['TODO', 'DOING'])), fields=['due_date'], name='projects_issue_open_due_idx'),
+        ),
+    ]
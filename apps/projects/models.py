@@ -1,7 +1,12 @@
-from django.db import models, transaction
+from django.db import models
 from django.conf import settings
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
 from django.utils.translation import gettext_lazy as _
 
+from apps.core import sequences
+
 class CostCenter(models.Model):
     name = models.CharField(max_length=100)
     code = models.CharField(max_length=20, unique=True)
@@ -116,12 +121,88 @@ class Issue(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['issue_type', 'status', 'due_date']),
+            models.Index(fields=['assigned_to', 'issue_type']),
+            # Alerts and boards only look at open issues
+            models.Index(fields=['due_date'], condition=Q(status__in=['TODO', 'DOING']), name='projects_issue_open_due_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
     def save(self, *args, **kwargs):
         if self.public_id is None:
-            with transaction.atomic():
-                last = Issue.objects.aggregate(models.Max('public_id'))['public_id__max'] or 0
-                self.public_id = last + 1
+            self.public_id = sequences.next_value('projects.issue.public_id')
         return super().save(*args, **kwargs)
+
+
+class ProjectMembership(models.Model):
+    """
+    Denormalized (user, project, role) rows for visibility checks.
+
+    Mirrors Project.client/project_manager/project_owner and the team M2M so
+    that "projects this user takes part in" is one indexed lookup instead of
+    OR-joins across the team table. Kept in sync by the receivers below;
+    ``rebuild_project_memberships`` rewrites it from scratch.
+    """
+    class Role(models.TextChoices):
+        TEAM = 'TEAM', _('Team')
+        MANAGER = 'MANAGER', _('Project Manager')
+        OWNER = 'OWNER', _('Project Owner')
+        CLIENT = 'CLIENT', _('Client')
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='project_memberships')
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='memberships')
+    role = models.CharField(max_length=20, choices=Role.choices)
+
+    class Meta:
+        verbose_name = _("Project Membership")
+        verbose_name_plural = _("Project Memberships")
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'role', 'project'], name='projects_membership_user_role_project'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.role} {self.project_id}"
+
+
+@receiver(m2m_changed, sender=Issue.colleagues.through)
+def invalidate_issue_colleagues(sender, action, **kwargs):
+    # Saves and deletes bump the tag from core.models.invalidate_cached_queries
+    if action.startswith('post_'):
+        from apps.core.caching import bump_tags
+        bump_tags('issue')
+
+
+@receiver(post_delete, sender=Project)
+def invalidate_project_members(sender, **kwargs):
+    # Saves and team changes bump the version from sync_project_memberships/sync_team_memberships
+    from .membership import bump_members_version
+    bump_members_version()
+
+
+@receiver(post_save, sender='core.User')
+@receiver(post_save, sender='core.InternalUser')
+@receiver(post_save, sender='core.ExternalUser')
+@receiver(post_delete, sender='core.User')
+def invalidate_members_on_user_change(sender, update_fields=None, **kwargs):
+    # Names and active flag are part of the members map; skip e.g. last_login updates
+    if update_fields is None or {'username', 'first_name', 'last_name', 'is_active'} & set(update_fields):
+        from .membership import bump_members_version
+        bump_members_version()
+
+
+@receiver(post_save, sender=Project)
+def sync_project_memberships(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    from .membership import sync_fk_memberships
+    sync_fk_memberships(instance)
+
+
+@receiver(m2m_changed, sender=Project.team.through)
+def sync_team_memberships(sender, instance, action, reverse, pk_set, **kwargs):
+    from .membership import sync_team_change
+    sync_team_change(instance, action, reverse, pk_set)
@@ -1,6 +1,7 @@
 from django.urls import path
 from .views import (
     ProjectListView,
+    ProjectListDataView,
     ProjectCreateView,
     ProjectDetailView,
     ProjectUpdateView,
@@ -11,6 +12,7 @@ from .views import (
     ProjectKanbanView,
     ProjectRisksView,
     QuickTaskCreateView,
+    ProjectMembersView,
     TaskAssignedListView,
     IssueDetailView,
     IssueUpdateView,
@@ -20,6 +22,7 @@ app_name = 'projects'
 
 urlpatterns = [
     path('', ProjectListView.as_view(), name='project_list'),
+    path('data/', ProjectListDataView.as_view(), name='project_list_data'),
     path('create/', ProjectCreateView.as_view(), name='project_create'),
     path('<int:pk>/', ProjectDetailView.as_view(), name='project_detail'),
     path('<int:pk>/tasks/', ProjectTasksView.as_view(), name='project_tasks'),
@@ -28,6 +31,7 @@ urlpatterns = [
     path('<int:pk>/hours/', ProjectHoursView.as_view(), name='project_hours'),
     path('<int:pk>/edit/', ProjectUpdateView.as_view(), name='project_update'),
     path('<int:pk>/delete/', ProjectDeleteView.as_view(), name='project_delete'),
+    path('<int:pk>/members/', ProjectMembersView.as_view(), name='project_members'),
     path('task/<int:pk>/', IssueDetailView.as_view(), name='task_detail'),
     path('task/<int:pk>/edit/', IssueUpdateView.as_view(), name='task_edit'),
     path('issues/<int:pk>/', IssueDetailView.as_view(), name='issue_detail'),
@@ -1,15 +1,20 @@
 
+from django.http import Http404, JsonResponse
+from django.core.paginator import Paginator
+from django.views import View
 from django.views.generic import ListView, CreateView, DetailView, UpdateView, DeleteView, TemplateView
 from django.contrib import messages
 from datetime import datetime
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from django.urls import reverse_lazy, reverse
 from django.shortcuts import redirect, get_object_or_404
-from django.db.models import Q, Sum
+from django.db.models import Q
 from decimal import Decimal
 from .models import Project, Issue
 from .forms import ProjectForm, IssueForm
-from apps.timesheet.models import TimeEntry
+from .hours import decode_cursor, entries_page, month_user_matrix, user_totals
+from .listing import as_json, project_list, sort_key
+from .membership import colleague_issue_ids, get_project_members, visible_issues, visible_projects
 
 
 class ProjectAccessMixin:
@@ -21,18 +26,7 @@ class ProjectAccessMixin:
         if user.is_superuser or user.has_perm('projects.view_project') or user.has_perm('projects.change_project'):
             return qs
 
-        if getattr(user, 'role', None) == user.Role.CLIENT:
-            return qs.filter(
-                external_access=True
-            ).filter(
-                Q(client=user) | Q(team=user)
-            )
-
-        return qs.filter(
-            Q(team=user) |
-            Q(project_manager=user) |
-            Q(project_owner=user)
-        )
+        return visible_projects(user, qs)
 
 
 class ProjectUpdateView(LoginRequiredMixin, PermissionRequiredMixin, ProjectAccessMixin, UpdateView):
@@ -75,12 +69,41 @@ class ProjectListView(LoginRequiredMixin, ProjectAccessMixin, ListView):
     paginate_by = 10
 
     def get_queryset(self):
-        from django.db.models import Sum
-        
-        qs = self.get_project_queryset()
-        return qs.annotate(
-            total_hours=Sum('time_entries__hours')
-        ).order_by('-created_at')
+        # Figures come from correlated subqueries (see listing.py), not joins
+        return project_list(self.get_project_queryset(), self.request.GET)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['sort'] = sort_key(self.request.GET)
+        return context
+
+
+class ProjectListDataView(LoginRequiredMixin, ProjectAccessMixin, View):
+    """
+    Lista de projetos em JSON, com os mesmos números da ProjectListView.
+
+    Filtros: ``q``, ``status`` (repetível), ``external_access``, ``has_open_tasks``;
+    ordenação: ``sort`` (ex.: ``-total_hours``); paginação: ``page``, ``page_size`` (até 100).
+    """
+    max_page_size = 100
+
+    def get(self, request, *args, **kwargs):
+        try:
+            page_size = max(1, min(int(request.GET.get('page_size', 25)), self.max_page_size))
+        except ValueError:
+            page_size = 25
+        paginator = Paginator(project_list(self.get_project_queryset(), request.GET), page_size)
+        page = paginator.get_page(request.GET.get('page'))
+        return JsonResponse({
+            'count': paginator.count,
+            'page': page.number,
+            'num_pages': paginator.num_pages,
+            'sort': sort_key(request.GET),
+            'results': [
+                {**as_json(project), 'url': reverse('projects:project_detail', args=[project.pk])}
+                for project in page
+            ],
+        })
 
 class ProjectCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
     model = Project
@@ -132,17 +155,7 @@ class TaskUpdateView(LoginRequiredMixin, UpdateView):
         user = self.request.user
         if user.is_superuser or user.has_perm('projects.change_project'):
             return qs
-        if getattr(user, 'role', None) == user.Role.CLIENT:
-            return qs.filter(
-                project__external_access=True
-            ).filter(
-                Q(project__client=user) | Q(project__team=user)
-            )
-        return qs.filter(
-            Q(project__team=user) |
-            Q(project__project_manager=user) |
-            Q(project__project_owner=user)
-        )
+        return visible_issues(user, qs)
 
     def post(self, request, *args, **kwargs):
         self.object = self.get_object()
@@ -182,19 +195,7 @@ class IssueDetailView(LoginRequiredMixin, DetailView):
         user = self.request.user
         if user.is_superuser or user.has_perm('projects.view_project'):
             return qs
-        if getattr(user, 'role', None) == user.Role.CLIENT:
-            return qs.filter(
-                project__external_access=True
-            ).filter(
-                Q(project__client=user) | Q(project__team=user)
-            )
-        return qs.filter(
-            Q(project__team=user) |
-            Q(project__project_manager=user) |
-            Q(project__project_owner=user) |
-            Q(assigned_to=user) |
-            Q(colleagues=user)
-        ).distinct()
+        return visible_issues(user, qs, involved=True)
 
 class IssueUpdateView(LoginRequiredMixin, UpdateView):
     model = Issue
@@ -207,19 +208,7 @@ class IssueUpdateView(LoginRequiredMixin, UpdateView):
         user = self.request.user
         if user.is_superuser or user.has_perm('projects.change_project'):
             return qs
-        if getattr(user, 'role', None) == user.Role.CLIENT:
-            return qs.filter(
-                project__external_access=True
-            ).filter(
-                Q(project__client=user) | Q(project__team=user)
-            )
-        return qs.filter(
-            Q(project__team=user) |
-            Q(project__project_manager=user) |
-            Q(project__project_owner=user) |
-            Q(assigned_to=user) |
-            Q(colleagues=user)
-        ).distinct()
+        return visible_issues(user, qs, involved=True)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -283,6 +272,16 @@ class ProjectRisksView(LoginRequiredMixin, ProjectAccessMixin, TemplateView):
         return context
 
 
+class ProjectMembersView(LoginRequiredMixin, ProjectAccessMixin, View):
+    """Active members (team, manager and owner) of a project, for the task assignee select."""
+
+    def get(self, request, pk):
+        # Projects the user cannot open are reported as missing
+        if not self.get_project_queryset().filter(pk=pk).exists():
+            raise Http404
+        return JsonResponse({'project': pk, 'members': get_project_members(pk)})
+
+
 class QuickTaskCreateView(LoginRequiredMixin, TemplateView):
     template_name = 'projects/task_quick_create.html'
 
@@ -294,20 +293,10 @@ class QuickTaskCreateView(LoginRequiredMixin, TemplateView):
         project_id = self.request.GET.get('project')
         selected_project = Project.objects.filter(pk=project_id).first() if project_id else None
 
-        projects_qs = Project.objects.all().order_by('name').prefetch_related('team', 'project_manager', 'project_owner')
-        context['projects'] = projects_qs
-        project_members = {}
-        for proj in projects_qs:
-            member_ids = set(proj.team.values_list('id', flat=True))
-            if proj.project_manager_id:
-                member_ids.add(proj.project_manager_id)
-            if proj.project_owner_id:
-                member_ids.add(proj.project_owner_id)
-            members = User.objects.filter(id__in=member_ids, is_active=True).order_by('username')
-            project_members[proj.id] = [{"id": m.id, "name": m.get_full_name() or m.username} for m in members]
-        context['project_members_map'] = project_members
+        # Members are loaded per selected project from ProjectMembersView
+        context['projects'] = Project.objects.order_by('name').only('id', 'name')
         if selected_project:
-            member_ids = [m['id'] for m in project_members.get(selected_project.id, [])]
+            member_ids = [m['id'] for m in get_project_members(selected_project.id)]
             context['internal_users'] = User.objects.filter(id__in=member_ids).order_by('username')
         else:
             context['internal_users'] = User.objects.none()
@@ -403,75 +392,31 @@ class TaskAssignedListView(LoginRequiredMixin, ListView):
         return Issue.objects.filter(
             issue_type=Issue.IssueType.TASK
         ).prefetch_related('colleagues').filter(
-            Q(assigned_to=self.request.user) | Q(colleagues=self.request.user)
-        ).order_by('-due_date', 'title').distinct()
+            Q(assigned_to=self.request.user) | Q(pk__in=colleague_issue_ids(self.request.user))
+        ).order_by('-due_date', 'title')
 
 
-class ProjectHoursView(LoginRequiredMixin, ProjectAccessMixin, ListView):
-    model = TimeEntry
+class ProjectHoursView(LoginRequiredMixin, ProjectAccessMixin, TemplateView):
+    """
+    Horas do projeto: matriz mês x usuário (agregada no banco e em cache) e
+    lista de apontamentos paginada por cursor (``?cursor=<data>.<id>``).
+    """
     template_name = 'projects/project_hours.html'
-    context_object_name = 'time_entries'
-    paginate_by = 50
-
-    def get_project(self):
-        return get_object_or_404(self.get_project_queryset(), pk=self.kwargs['pk'])
-
-    def get_queryset(self):
-        project = self.get_project()
-        qs = TimeEntry.objects.filter(project=project).select_related(
-            'project', 'task', 'activity', 'timesheet__user'
-        ).order_by('-date')
-
-        user = self.request.user
-        # Full access if global view/change permission or superuser
-        if user.is_superuser or user.has_perm('timesheet.view_timeentry') or user.has_perm('timesheet.change_timeentry'):
-            return qs
-
-        # Otherwise only if user can access the project (ProjectAccessMixin)
-        allowed_project = self.get_project_queryset().filter(pk=project.pk)
-        if allowed_project.exists():
-            return qs
-
-        return TimeEntry.objects.none()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        project = self.get_project()
-        entries = context['time_entries']
-        total_hours = entries.aggregate(total=Sum('hours'))['total'] or 0
-        per_user_total = entries.values('timesheet__user__username').annotate(total=Sum('hours'))
-
-        # Group entries by month
-        month_groups = []
-        grouped = {}
-        for entry in entries:
-            key = entry.date.strftime('%Y-%m')
-            if key not in grouped:
-                grouped[key] = {
-                    'label': entry.date.strftime('%b/%Y'),
-                    'entries': [],
-                }
-            grouped[key]['entries'].append(entry)
-
-        # Aggregate hours per user inside each month group
-        for key, data in grouped.items():
-            per_user = {}
-            for e in data['entries']:
-                username = e.timesheet.user.username if e.timesheet and e.timesheet.user else '-'
-                per_user[username] = per_user.get(username, Decimal('0')) + (e.hours or Decimal('0'))
-            data['per_user'] = [{'user': u, 'hours': h} for u, h in per_user.items()]
-            data['total'] = sum(per_user.values()) if per_user else Decimal('0')
-            # Order users by hours desc then name
-            data['per_user'].sort(key=lambda x: (-x['hours'], x['user']))
-            month_groups.append((key, data))
-
-        # Sort months desc
-        month_groups.sort(key=lambda x: x[0], reverse=True)
+        project = get_object_or_404(self.get_project_queryset(), pk=self.kwargs['pk'])
+        matrix = month_user_matrix(project.pk)
+        cursor = self.request.GET.get('cursor')
+        entries, next_cursor = entries_page(project.pk, cursor)
 
         context.update({
             'project': project,
-            'total_hours': total_hours,
-            'hours_per_user': per_user_total,
-            'month_groups': month_groups,
+            'total_hours': sum((month['total'] for month in matrix), Decimal('0')),
+            'hours_per_user': user_totals(matrix),
+            'month_groups': matrix,
+            'time_entries': entries,
+            'next_cursor': next_cursor,
+            'is_first_page': decode_cursor(cursor) is None,
         })
         return context
@@ -1,8 +1,8 @@
 from django.contrib import admin
 from django.db.models import Sum
-from unfold.admin import ModelAdmin
+from unfold.admin import ModelAdmin, TabularInline
 
-from .models import Activity, TimeEntry, Timesheet
+from .models import Activity, TimeEntry, Timesheet, TimesheetApprovalRequirement
 
 @admin.register(Activity)
 class ActivityAdmin(ModelAdmin):
@@ -12,6 +12,16 @@ class ActivityAdmin(ModelAdmin):
     list_editable = ('active',)
     ordering = ('name',)
 
+class TimesheetApprovalRequirementInline(TabularInline):
+    model = TimesheetApprovalRequirement
+    extra = 0
+    fields = ('manager', 'approved_at')
+    readonly_fields = ('manager', 'approved_at')
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
 @admin.register(Timesheet)
 class TimesheetAdmin(ModelAdmin):
     list_display = ('user', 'period', 'status', 'approved_by', 'total_hours')
@@ -28,6 +38,7 @@ class TimesheetAdmin(ModelAdmin):
     date_hierarchy = 'start_date'
     ordering = ('-start_date',)
     list_per_page = 25
+    inlines = [TimesheetApprovalRequirementInline]
 
     def get_queryset(self, request):
         qs = super().get_queryset(request)
@@ -0,0 +1,225 @@
+"""
+Approval workflow of submitted timesheets.
+
+Submitting a sheet writes one ``TimesheetApprovalRequirement`` per project
+manager with hours on it, so a manager's inbox is an indexed lookup on
+``(manager, approved_at)`` and "every manager approved" is a single count.
+Users with ``timesheet.change_timesheet`` (and superusers) approve or reject
+any sheet at once; managers only their own requirement. Nobody approves or
+rejects their own sheet.
+
+``transition`` applies an action to many sheets at once and reports the
+outcome of each; the single-sheet helpers are thin wrappers around it.
+"""
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from apps.core.caching import invalidate
+from apps.core.search import index_many
+
+from .models import TimeEntry, Timesheet, TimesheetApprovalRequirement
+
+PENDING = (Timesheet.Status.SUBMITTED, Timesheet.Status.PARTIALLY_APPROVED)
+
+
+class ApprovalError(Exception):
+    """The transition is not allowed; the message is shown to the user."""
+
+
+def is_approver(user):
+    """Approves or rejects any sheet without waiting for the project managers."""
+    return user.is_superuser or user.has_perm('timesheet.change_timesheet')
+
+
+def is_manager(user):
+    return getattr(user, 'role', None) == user.Role.MANAGER
+
+
+def create_requirements(timesheet):
+    """(Re)write the requirements of a sheet being submitted."""
+    manager_ids = (
+        TimeEntry.objects.filter(timesheet=timesheet, project__project_manager__isnull=False)
+        .values_list('project__project_manager', flat=True)
+        .distinct()
+    )
+    with transaction.atomic():
+        TimesheetApprovalRequirement.objects.filter(timesheet=timesheet).delete()
+        TimesheetApprovalRequirement.objects.bulk_create(
+            [TimesheetApprovalRequirement(timesheet=timesheet, manager_id=pk) for pk in manager_ids]
+        )
+
+
+def pending_for(manager):
+    """Sheets waiting for ``manager``'s approval (one requirement per sheet, no DISTINCT)."""
+    return Timesheet.objects.filter(
+        status__in=PENDING,
+        approval_requirements__manager=manager,
+        approval_requirements__approved_at__isnull=True,
+    )
+
+
+def requires(timesheet, manager):
+    """Whether ``manager`` is one of the approvers of ``timesheet``."""
+    return TimesheetApprovalRequirement.objects.filter(timesheet=timesheet, manager=manager).exists()
+
+
+# Transitions
+#
+# Single-sheet actions go through the same batch code so both paths share one
+# set of rules: scope is checked for the whole batch with two queries and the
+# allowed sheets are moved with a handful of UPDATEs in one transaction.
+
+ACTIONS = ('approve', 'reject', 'cancel')
+
+MESSAGES = {
+    'not_found': 'Folha de ponto não encontrada.',
+    'approve_own': 'Você não pode aprovar a própria folha. Solicite a aprovação de outro usuário.',
+    'reject_own': 'Você não pode rejeitar a própria folha. Solicite a aprovação de outro usuário.',
+    'approve_status': 'Apenas folhas enviadas podem ser aprovadas.',
+    'reject_status': 'Apenas folhas enviadas podem ser rejeitadas.',
+    'cancel_status': 'Apenas folhas enviadas podem ser canceladas.',
+    'approve_scope': 'Você não tem permissão para aprovar esta folha.',
+    'reject_scope': 'Você não tem permissão para rejeitar esta folha.',
+    'cancel_scope': 'Você não tem permissão para cancelar esta folha.',
+    'approve_done': 'Você já aprovou esta folha.',
+}
+
+
+def check(user, ids, action):
+    """
+    Split ``ids`` into the sheets ``user`` may move with ``action`` and errors.
+
+    Returns ``(allowed_ids, {id: message})``. Must run inside a transaction:
+    the sheets are locked until the transition is written.
+    """
+    sheets = {
+        row['pk']: row
+        for row in Timesheet.objects.select_for_update().filter(pk__in=ids).values('pk', 'user_id', 'status')
+    }
+    approver = is_approver(user)
+    requirements = {}
+    if action != 'cancel' and not approver and is_manager(user):
+        requirements = dict(
+            TimesheetApprovalRequirement.objects.filter(manager=user, timesheet_id__in=list(sheets))
+            .values_list('timesheet_id', 'approved_at')
+        )
+
+    allowed, errors = [], {}
+    for pk in ids:
+        sheet = sheets.get(pk)
+        if sheet is None:
+            error = 'not_found'
+        elif action == 'cancel':
+            if sheet['status'] not in PENDING:
+                error = 'cancel_status'
+            elif sheet['user_id'] != user.pk and not approver:
+                error = 'cancel_scope'
+            else:
+                error = None
+        elif sheet['user_id'] == user.pk:
+            error = f'{action}_own'
+        elif sheet['status'] not in PENDING:
+            error = f'{action}_status'
+        elif approver:
+            error = None
+        elif pk not in requirements:
+            error = f'{action}_scope'
+        elif action == 'approve' and requirements[pk] is not None:
+            error = 'approve_done'
+        else:
+            error = None
+        if error:
+            errors[pk] = MESSAGES[error]
+        else:
+            allowed.append(pk)
+    return allowed, errors
+
+
+def _approve(user, ids, now):
+    """Returns ``{id: new status}``."""
+    requirements = TimesheetApprovalRequirement.objects.filter(timesheet_id__in=ids, approved_at__isnull=True)
+    through = Timesheet.partial_approvers.through
+    if is_approver(user):
+        requirements.update(approved_at=now)
+        through.objects.filter(timesheet_id__in=ids).delete()
+        approved, partial = ids, []
+    else:
+        requirements.filter(manager=user).update(approved_at=now)
+        through.objects.bulk_create(
+            [through(timesheet_id=pk, user_id=user.pk) for pk in ids], ignore_conflicts=True,
+        )
+        remaining = dict(
+            Timesheet.objects.filter(pk__in=ids)
+            .annotate(pending=Count('approval_requirements', filter=Q(approval_requirements__approved_at__isnull=True)))
+            .values_list('pk', 'pending')
+        )
+        approved = [pk for pk in ids if not remaining[pk]]
+        partial = [pk for pk in ids if remaining[pk]]
+    Timesheet.objects.filter(pk__in=approved).update(status=Timesheet.Status.APPROVED, approved_by=user, updated_at=now)
+    Timesheet.objects.filter(pk__in=partial).update(status=Timesheet.Status.PARTIALLY_APPROVED, updated_at=now)
+    statuses = dict.fromkeys(approved, Timesheet.Status.APPROVED)
+    statuses.update(dict.fromkeys(partial, Timesheet.Status.PARTIALLY_APPROVED))
+    return statuses
+
+
+def _reset(ids, now, **changes):
+    """Move sheets back out of the approval flow (rejected or draft)."""
+    Timesheet.objects.filter(pk__in=ids).update(approved_by=None, updated_at=now, **changes)
+    Timesheet.partial_approvers.through.objects.filter(timesheet_id__in=ids).delete()
+    TimesheetApprovalRequirement.objects.filter(timesheet_id__in=ids).delete()
+    return dict.fromkeys(ids, changes['status'])
+
+
+def transition(user, ids, action, reason=''):
+    """
+    Apply ``action`` ('approve', 'reject' or 'cancel') to the sheets ``ids``.
+
+    Sheets that fail the checks are left untouched; the others move together
+    in one transaction. Returns ``{id: {'ok': True, 'status': ...}}`` or
+    ``{id: {'ok': False, 'message': ...}}`` for every requested id.
+    """
+    if action not in ACTIONS:
+        raise ValueError(action)
+    ids = list(dict.fromkeys(int(pk) for pk in ids))
+    now = timezone.now()
+    with transaction.atomic():
+        allowed, errors = check(user, ids, action)
+        if not allowed:
+            statuses = {}
+        elif action == 'approve':
+            statuses = _approve(user, allowed, now)
+        elif action == 'reject':
+            statuses = _reset(allowed, now, status=Timesheet.Status.REJECTED, rejection_reason=reason)
+        else:
+            statuses = _reset(allowed, now, status=Timesheet.Status.DRAFT, rejection_reason='')
+        # update() skips post_save: refresh the search documents and cached queries of the moved sheets
+        moved = list(Timesheet.objects.filter(pk__in=allowed).select_related('user'))
+        index_many(moved)
+        invalidate(*moved)
+    return {
+        pk: {'ok': False, 'message': errors[pk]} if pk in errors else {'ok': True, 'status': statuses[pk]}
+        for pk in ids
+    }
+
+
+def _single(timesheet, user, action, reason=''):
+    result = transition(user, [timesheet.pk], action, reason)[timesheet.pk]
+    if not result['ok']:
+        raise ApprovalError(result['message'])
+    timesheet.refresh_from_db()
+    return result['status']
+
+
+def approve(timesheet, user):
+    """Approve ``timesheet`` fully (approvers) or ``user``'s part of it (managers). Returns the new status."""
+    return _single(timesheet, user, 'approve')
+
+
+def reject(timesheet, user, reason=''):
+    return _single(timesheet, user, 'reject', reason)
+
+
+def cancel(timesheet, user):
+    """Owner (or approver) takes a submitted sheet back to draft."""
+    return _single(timesheet, user, 'cancel')
@@ -0,0 +1,121 @@
+import csv
+import tempfile
+from datetime import datetime
+
+from django.utils import timezone
+
+from .models import TimeEntry, Timesheet
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+# Rows fetched per round-trip by the server-side cursor
+EXPORT_CHUNK_SIZE = 2000
+
+TIMESHEET_HEADER = ['ID', 'Usuário', 'Início', 'Fim', 'Status', 'Aprovado por', 'Criado em', 'Atualizado em']
+ENTRY_HEADER = ['ID', 'Timesheet', 'Usuário', 'Projeto', 'Tarefa', 'Atividade', 'Data', 'Horas', 'Status']
+
+
+def parse_report_filters(params):
+    """Read the ``start_date``/``end_date``/``status`` filters shared by the reports dashboard and exports."""
+    def parse_date(val):
+        try:
+            return datetime.fromisoformat(val).date()
+        except Exception:
+            return None
+
+    return {
+        'start_date': parse_date(params.get('start_date')),
+        'end_date': parse_date(params.get('end_date')),
+        'status': params.get('status') or '',
+    }
+
+
+def filtered_timesheets(filters):
+    qs = Timesheet.objects.all()
+    if filters['start_date']:
+        qs = qs.filter(start_date__gte=filters['start_date'])
+    if filters['end_date']:
+        qs = qs.filter(end_date__lte=filters['end_date'])
+    if filters['status']:
+        qs = qs.filter(status=filters['status'])
+    return qs
+
+
+def filtered_entries(filters):
+    qs = TimeEntry.objects.exclude(hours__isnull=True)
+    if filters['start_date']:
+        qs = qs.filter(date__gte=filters['start_date'])
+    if filters['end_date']:
+        qs = qs.filter(date__lte=filters['end_date'])
+    if filters['status']:
+        qs = qs.filter(timesheet__status=filters['status'])
+    return qs
+
+
+def timesheet_rows(filters):
+    """Yield one export row per timesheet, streamed from a server-side cursor."""
+    rows = (
+        filtered_timesheets(filters)
+        .order_by('id')
+        .values_list(
+            'id', 'user__username', 'start_date', 'end_date', 'status',
+            'approved_by__username', 'created_at', 'updated_at',
+        )
+    )
+    for row in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [value if value is not None else '' for value in row]
+
+
+def entry_rows(filters):
+    """Yield one export row per time entry (user, project, task, activity, date, hours)."""
+    rows = (
+        filtered_entries(filters)
+        .order_by('date', 'id')
+        .values_list(
+            'id', 'timesheet_id', 'timesheet__user__username', 'project__name', 'task__title',
+            'activity__name', 'date', 'hours', 'timesheet__status',
+        )
+    )
+    for row in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [value if value is not None else '' for value in row]
+
+
+class _Echo:
+    """File-like object whose ``write`` returns the value, so csv.writer can feed a generator."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(header, rows):
+    """Yield CSV lines for ``header`` followed by ``rows`` without buffering the file."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def write_xlsx(header, rows, title):
+    """
+    Write ``rows`` with openpyxl's write-only mode into a temporary file.
+
+    Write-only worksheets flush each row to disk as it is appended, so memory
+    stays flat; the returned file is rewound and ready to be streamed.
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(title=title)
+    ws.append(header)
+    for row in rows:
+        # Excel has no timezone support: write aware datetimes in local time
+        ws.append([
+            timezone.localtime(value).replace(tzinfo=None)
+            if isinstance(value, datetime) and timezone.is_aware(value) else value
+            for value in row
+        ])
+    output = tempfile.TemporaryFile()
+    wb.save(output)
+    output.seek(0)
+    return output
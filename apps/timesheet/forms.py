@@ -46,6 +46,21 @@ class TimeEntryForm(forms.ModelForm):
         for field in self.fields.values():
             field.widget.attrs['class'] = 'form-control'
 
+    def clean(self):
+        cleaned_data = super().clean()
+        # Uma célula da grade (timesheet, projeto, tarefa, atividade, data) tem um único lançamento
+        if self.instance.timesheet_id and not self.errors:
+            cell = TimeEntry.objects.filter(
+                timesheet_id=self.instance.timesheet_id,
+                project=cleaned_data.get('project'),
+                task=cleaned_data.get('task'),
+                activity=cleaned_data.get('activity'),
+                date=cleaned_data.get('date'),
+            ).exclude(pk=self.instance.pk)
+            if cell.exists():
+                raise forms.ValidationError("Já existe lançamento para este projeto, tarefa e atividade nesta data.")
+        return cleaned_data
+
 
 class ActivityForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.timesheet import rollup
+
+
+class Command(BaseCommand):
+    help = "Reconstrói o consolidado semanal de horas (WeeklyHoursRollup) a partir dos lançamentos."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help="Apenas compara o consolidado com os lançamentos, sem reescrever.",
+        )
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            mismatches = rollup.verify()
+            for key, expected, actual in sorted(mismatches, key=str)[:50]:
+                self.stdout.write(f" - {key}: esperado={expected} atual={actual}")
+            if mismatches:
+                raise CommandError(f"{len(mismatches)} bucket(s) divergentes. Rode sem --verify para reconstruir.")
+            self.stdout.write(self.style.SUCCESS("Consolidado de horas confere com os lançamentos."))
+            return
+
+        self.stdout.write(self.style.WARNING("Reconstruindo consolidado semanal de horas..."))
+        written = rollup.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Concluído. {written} bucket(s) gravados."))
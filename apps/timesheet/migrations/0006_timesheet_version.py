@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timesheet', '0005_alter_timeentry_task'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timesheet',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
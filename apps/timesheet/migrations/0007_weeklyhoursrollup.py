@@ -0,0 +1,69 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+
+
+def populate_rollup(apps, schema_editor):
+    import calendar
+    from datetime import timedelta
+
+    TimeEntry = apps.get_model('timesheet', 'TimeEntry')
+    WeeklyHoursRollup = apps.get_model('timesheet', 'WeeklyHoursRollup')
+    rows = (
+        TimeEntry.objects
+        .values('project_id', 'activity_id', user_id=F('timesheet__user_id'), week=TruncWeek('date'), month=TruncMonth('date'))
+        .annotate(total=Sum('hours'), count=Count('id'))
+        .order_by()
+    )
+    objs = []
+    for row in rows:
+        period_start = max(row['week'], row['month'])
+        month_end = period_start.replace(day=calendar.monthrange(period_start.year, period_start.month)[1])
+        objs.append(WeeklyHoursRollup(
+            user_id=row['user_id'],
+            project_id=row['project_id'],
+            activity_id=row['activity_id'],
+            week_start=row['week'],
+            period_start=period_start,
+            period_end=min(row['week'] + timedelta(days=6), month_end),
+            hours=row['total'] or 0,
+            entry_count=row['count'],
+        ))
+    WeeklyHoursRollup.objects.bulk_create(objs, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0009_issue_colleagues'),
+        ('timesheet', '0006_timesheet_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeeklyHoursRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week_start', models.DateField()),
+                ('period_start', models.DateField()),
+                ('period_end', models.DateField()),
+                ('hours', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('entry_count', models.IntegerField(default=0)),
+                ('activity', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='timesheet.activity')),
+                ('project', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='hours_rollup', to='projects.project')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='hours_rollup', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Consolidado semanal de horas',
+                'verbose_name_plural': 'Consolidados semanais de horas',
+                'indexes': [models.Index(fields=['project', 'period_start'], name='timesheet_w_project_1a0a05_idx'), models.Index(fields=['user', 'period_start'], name='timesheet_w_user_id_5036cf_idx'), models.Index(fields=['period_start', 'period_end'], name='timesheet_w_period__be2281_idx')],
+                'unique_together': {('user', 'project', 'activity', 'period_start')},
+            },
+        ),
+        migrations.RunPython(populate_rollup, migrations.RunPython.noop),
+    ]
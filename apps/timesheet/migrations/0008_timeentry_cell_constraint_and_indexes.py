@@ -0,0 +1,70 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:50
+
+from datetime import timedelta
+
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Min, Sum
+
+
+def period_start(day):
+    """Start of the rollup bucket holding ``day`` (frozen copy of rollup.bucket_bounds)."""
+    return max(day - timedelta(days=day.weekday()), day.replace(day=1))
+
+
+def merge_duplicate_cells(apps, schema_editor):
+    """Fold duplicated grid cells into their oldest entry before the unique constraint."""
+    TimeEntry = apps.get_model('timesheet', 'TimeEntry')
+    WeeklyHoursRollup = apps.get_model('timesheet', 'WeeklyHoursRollup')
+    duplicates = (
+        TimeEntry.objects.filter(timesheet__isnull=False)
+        .values('timesheet_id', 'project_id', 'task_id', 'activity_id', 'date', user_id=F('timesheet__user_id'))
+        .annotate(keep=Min('id'), total=Sum('hours'), count=Count('id'))
+        .filter(count__gt=1)
+        .order_by()
+    )
+    for cell in duplicates:
+        TimeEntry.objects.filter(pk=cell['keep']).update(hours=cell['total'])
+        TimeEntry.objects.filter(
+            timesheet_id=cell['timesheet_id'], project_id=cell['project_id'], task_id=cell['task_id'],
+            activity_id=cell['activity_id'], date=cell['date'],
+        ).exclude(pk=cell['keep']).delete()
+        # Hours are unchanged, the bucket just counts fewer entries
+        WeeklyHoursRollup.objects.filter(
+            user_id=cell['user_id'], project_id=cell['project_id'], activity_id=cell['activity_id'],
+            period_start=period_start(cell['date']),
+        ).update(entry_count=F('entry_count') - (cell['count'] - 1))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0011_issue_indexes'),
+        ('timesheet', '0007_weeklyhoursrollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_cells, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='timeentry',
+            index=models.Index(fields=['date'], name='timesheet_t_date_77411c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeentry',
+            index=models.Index(fields=['project', 'date'], name='timesheet_t_project_9e5474_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timesheet',
+            index=models.Index(fields=['status', 'start_date'], name='timesheet_t_status_857a12_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timesheet',
+            index=models.Index(condition=models.Q(('status__in', ['SUBMITTED', 'PARTIALLY_APPROVED'])), fields=['start_date'], name='timesheet_pending_start_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='timeentry',
+            constraint=models.UniqueConstraint(models.F('timesheet'), django.db.models.functions.comparison.Coalesce('project', models.Value(0)), django.db.models.functions.comparison.Coalesce('task', models.Value(0)), django.db.models.functions.comparison.Coalesce('activity', models.Value(0)), models.F('date'), name='timesheet_entry_cell'),
+        ),
+    ]
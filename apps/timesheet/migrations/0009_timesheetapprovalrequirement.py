@@ -0,0 +1,60 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_requirements(apps, schema_editor):
+    """Requirements of the sheets already waiting for approval, keeping partial approvals."""
+    Timesheet = apps.get_model('timesheet', 'Timesheet')
+    TimeEntry = apps.get_model('timesheet', 'TimeEntry')
+    TimesheetApprovalRequirement = apps.get_model('timesheet', 'TimesheetApprovalRequirement')
+    pending = Timesheet.objects.filter(status__in=['SUBMITTED', 'PARTIALLY_APPROVED'])
+    approved = set(
+        Timesheet.partial_approvers.through.objects
+        .filter(timesheet__in=pending).values_list('timesheet_id', 'user_id')
+    )
+    updated_at = dict(pending.values_list('id', 'updated_at'))
+    pairs = (
+        TimeEntry.objects.filter(timesheet__in=pending, project__project_manager__isnull=False)
+        .values_list('timesheet_id', 'project__project_manager_id').distinct()
+    )
+    TimesheetApprovalRequirement.objects.bulk_create(
+        [
+            TimesheetApprovalRequirement(
+                timesheet_id=timesheet_id, manager_id=manager_id,
+                approved_at=updated_at[timesheet_id] if (timesheet_id, manager_id) in approved else None,
+            )
+            for timesheet_id, manager_id in pairs
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0011_issue_indexes'),
+        ('timesheet', '0008_timeentry_cell_constraint_and_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimesheetApprovalRequirement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('approved_at', models.DateTimeField(blank=True, null=True)),
+                ('manager', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timesheet_approval_requirements', to=settings.AUTH_USER_MODEL)),
+                ('timesheet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='approval_requirements', to='timesheet.timesheet')),
+            ],
+            options={
+                'verbose_name': 'Aprovação necessária',
+                'verbose_name_plural': 'Aprovações necessárias',
+                'indexes': [models.Index(fields=['manager', 'approved_at'], name='timesheet_t_manager_8984d8_idx')],
+                'constraints': [models.UniqueConstraint(fields=('timesheet', 'manager'), name='timesheet_approval_requirement_unique')],
+            },
+        ),
+        migrations.RunPython(populate_requirements, migrations.RunPython.noop),
+    ]
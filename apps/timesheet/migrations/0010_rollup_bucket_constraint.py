@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:16
+
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_buckets(apps, schema_editor):
+    """Fold buckets duplicated through NULL keys into their oldest row before the constraint."""
+    WeeklyHoursRollup = apps.get_model('timesheet', 'WeeklyHoursRollup')
+    duplicates = (
+        WeeklyHoursRollup.objects.values('user_id', 'project_id', 'activity_id', 'period_start')
+        .annotate(keep=Min('id'), total=Sum('hours'), entries=Sum('entry_count'), count=Count('id'))
+        .filter(count__gt=1)
+        .order_by()
+    )
+    for bucket in duplicates:
+        WeeklyHoursRollup.objects.filter(pk=bucket['keep']).update(hours=bucket['total'], entry_count=bucket['entries'])
+        WeeklyHoursRollup.objects.filter(
+            user_id=bucket['user_id'], project_id=bucket['project_id'], activity_id=bucket['activity_id'],
+            period_start=bucket['period_start'],
+        ).exclude(pk=bucket['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0011_issue_indexes'),
+        ('timesheet', '0009_timesheetapprovalrequirement'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_buckets, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='weeklyhoursrollup',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='weeklyhoursrollup',
+            constraint=models.UniqueConstraint(django.db.models.functions.comparison.Coalesce('user', models.Value(0)), django.db.models.functions.comparison.Coalesce('project', models.Value(0)), django.db.models.functions.comparison.Coalesce('activity', models.Value(0)), models.F('period_start'), name='timesheet_rollup_bucket'),
+        ),
+    ]
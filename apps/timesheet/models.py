@@ -1,5 +1,9 @@
 from django.db import models
 from django.conf import settings
+from django.db.models import F, Q, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
 from django.utils.translation import gettext_lazy as _
 from datetime import timedelta, datetime
 
@@ -30,6 +34,8 @@ class Timesheet(models.Model):
     approved_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='approved_timesheets')
     partial_approvers = models.ManyToManyField(settings.AUTH_USER_MODEL, blank=True, related_name='partially_approved_timesheets')
     rejection_reason = models.TextField(blank=True)
+    # Optimistic lock for grid writes; bumped on every save of the hours grid
+    version = models.PositiveIntegerField(default=0, editable=False)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -37,6 +43,15 @@ class Timesheet(models.Model):
     class Meta:
         ordering = ['-start_date']
         unique_together = ['user', 'start_date']
+        indexes = [
+            models.Index(fields=['status', 'start_date']),
+            # Approval queue: only a small fraction of the table is pending
+            models.Index(
+                fields=['start_date'],
+                condition=Q(status__in=['SUBMITTED', 'PARTIALLY_APPROVED']),
+                name='timesheet_pending_start_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user} ({self.start_date} - {self.end_date})"
@@ -62,6 +77,128 @@ class TimeEntry(models.Model):
         ordering = ['date', 'project']
         verbose_name = "Lançamento de horas"
         verbose_name_plural = "Lançamentos de horas"
+        constraints = [
+            # One entry per grid cell; NULL task/activity are part of the key
+            models.UniqueConstraint(
+                F('timesheet'),
+                Coalesce('project', Value(0)),
+                Coalesce('task', Value(0)),
+                Coalesce('activity', Value(0)),
+                F('date'),
+                name='timesheet_entry_cell',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['date']),
+            models.Index(fields=['project', 'date']),
+        ]
 
     def __str__(self):
         return f"{self.date} - {self.project} - {self.hours}h"
+
+
+class TimesheetApprovalRequirement(models.Model):
+    """
+    One project manager whose approval a submitted timesheet needs.
+
+    Written when the sheet is submitted, one row per manager of a project with
+    hours on it. A manager's inbox is the rows with no ``approved_at``; the
+    sheet is approved once none is left.
+    """
+    timesheet = models.ForeignKey(Timesheet, on_delete=models.CASCADE, related_name='approval_requirements')
+    manager = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='timesheet_approval_requirements')
+    approved_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Aprovação necessária"
+        verbose_name_plural = "Aprovações necessárias"
+        constraints = [
+            models.UniqueConstraint(fields=['timesheet', 'manager'], name='timesheet_approval_requirement_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['manager', 'approved_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.timesheet_id} - {self.manager_id}: {self.approved_at or 'pendente'}"
+
+
+class WeeklyHoursRollup(models.Model):
+    """
+    Hours per (user, project, activity, ISO week), maintained incrementally from TimeEntry.
+
+    Weeks that cross a month boundary are split into one bucket per month so
+    monthly figures stay exact; ``period_start``/``period_end`` are the days
+    actually covered by the bucket.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True, related_name='hours_rollup')
+    project = models.ForeignKey('projects.Project', on_delete=models.CASCADE, null=True, blank=True, related_name='hours_rollup')
+    activity = models.ForeignKey(Activity, on_delete=models.SET_NULL, null=True, blank=True)
+    week_start = models.DateField()
+    period_start = models.DateField()
+    period_end = models.DateField()
+    hours = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    entry_count = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Consolidado semanal de horas"
+        verbose_name_plural = "Consolidados semanais de horas"
+        constraints = [
+            # NULLs never collide in a plain unique key; a NULL activity/project is a bucket too
+            models.UniqueConstraint(
+                Coalesce('user', Value(0)),
+                Coalesce('project', Value(0)),
+                Coalesce('activity', Value(0)),
+                F('period_start'),
+                name='timesheet_rollup_bucket',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['project', 'period_start']),
+            models.Index(fields=['user', 'period_start']),
+            models.Index(fields=['period_start', 'period_end']),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.project} - {self.period_start}: {self.hours}h"
+
+
+@receiver(pre_save, sender=TimeEntry)
+def remember_rollup_state(sender, instance, raw=False, **kwargs):
+    if raw or not instance.pk:
+        return
+    from .rollup import entry_state
+    instance._rollup_old = entry_state(TimeEntry.objects.filter(pk=instance.pk).values(
+        'timesheet_id', 'timesheet__user_id', 'project_id', 'activity_id', 'date', 'hours'
+    ).first())
+
+
+@receiver(post_save, sender=TimeEntry)
+def update_rollup_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    from .rollup import apply_entry_change
+    apply_entry_change(old=getattr(instance, '_rollup_old', None), new=instance)
+    instance._rollup_old = None
+
+
+@receiver(post_delete, sender=TimeEntry)
+def update_rollup_on_delete(sender, instance, **kwargs):
+    from .rollup import apply_entry_change
+    apply_entry_change(old=instance, new=None)
+
+
+@receiver(pre_delete, sender=Activity)
+def release_activity(sender, instance, **kwargs):
+    # Rows referencing the activity become activity-less; fold them into the
+    # ones that already are before SET_NULL makes them collide
+    from .rollup import fold_activity
+    from .services import merge_detached_cells
+    merge_detached_cells('activity', instance.pk)
+    fold_activity(instance.pk)
+
+
+@receiver(pre_delete, sender='projects.Issue')
+def release_task(sender, instance, **kwargs):
+    from .services import merge_detached_cells
+    merge_detached_cells('task', instance.pk)
@@ -0,0 +1,282 @@
+import calendar
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date as date_cls, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+
+from .models import TimeEntry, Timesheet, WeeklyHoursRollup
+
+# Batch collecting deltas while inside ``deferred()``; None means apply immediately
+_pending = ContextVar('weekly_hours_rollup_batch', default=None)
+
+# Grouping dimensions for ``sum_hours``: (rollup expression, raw TimeEntry expression)
+DIMENSIONS = {
+    'month': (TruncMonth('period_start'), TruncMonth('date')),
+    'user': (F('user_id'), F('timesheet__user_id')),
+    'username': (F('user__username'), F('timesheet__user__username')),
+    'project': (F('project_id'), F('project_id')),
+}
+
+
+class _Batch:
+    def __init__(self):
+        self.deltas = defaultdict(lambda: [Decimal('0'), 0])
+        self.timesheet_users = {}
+
+
+def bucket_bounds(day):
+    """Return ``(week_start, period_start, period_end)`` of the bucket holding ``day``."""
+    week_start = day - timedelta(days=day.weekday())
+    week_end = week_start + timedelta(days=6)
+    month_start = day.replace(day=1)
+    month_end = day.replace(day=calendar.monthrange(day.year, day.month)[1])
+    return week_start, max(week_start, month_start), min(week_end, month_end)
+
+
+def _timesheet_user_id(entry):
+    if entry.timesheet_id is None:
+        return None
+    if TimeEntry.timesheet.is_cached(entry):
+        return entry.timesheet.user_id
+    batch = _pending.get()
+    if batch is not None and entry.timesheet_id in batch.timesheet_users:
+        return batch.timesheet_users[entry.timesheet_id]
+    user_id = Timesheet.objects.filter(pk=entry.timesheet_id).values_list('user_id', flat=True).first()
+    if batch is not None:
+        batch.timesheet_users[entry.timesheet_id] = user_id
+    return user_id
+
+
+def entry_state(entry):
+    """
+    Normalise an entry into ``(user_id, project_id, activity_id, date, hours)``.
+
+    Accepts a TimeEntry, a ``values()`` dict (with ``timesheet__user_id``), an
+    already normalised tuple or None.
+    """
+    if entry is None or isinstance(entry, tuple):
+        return entry
+    if isinstance(entry, dict):
+        user_id = entry['timesheet__user_id']
+        project_id, activity_id, day, hours = entry['project_id'], entry['activity_id'], entry['date'], entry['hours']
+    else:
+        user_id = _timesheet_user_id(entry)
+        project_id, activity_id, day, hours = entry.project_id, entry.activity_id, entry.date, entry.hours
+    if isinstance(day, str):
+        day = date_cls.fromisoformat(day)
+    return (user_id, project_id, activity_id, day, Decimal(str(hours or 0)))
+
+
+def _add_delta(deltas, state, sign):
+    user_id, project_id, activity_id, day, hours = state
+    period_start = bucket_bounds(day)[1]
+    bucket = deltas[(user_id, project_id, activity_id, period_start)]
+    bucket[0] += sign * hours
+    bucket[1] += sign
+
+
+def apply_entry_change(old=None, new=None):
+    """Move an entry's contribution from its ``old`` state to its ``new`` one."""
+    old, new = entry_state(old), entry_state(new)
+    if old == new:
+        return
+    batch = _pending.get()
+    deltas = batch.deltas if batch is not None else defaultdict(lambda: [Decimal('0'), 0])
+    if old is not None:
+        _add_delta(deltas, old, -1)
+    if new is not None:
+        _add_delta(deltas, new, 1)
+    if batch is None:
+        apply_deltas(deltas)
+
+
+def apply_deltas(deltas):
+    """Apply ``{(user_id, project_id, activity_id, period_start): [hours, count]}`` with one UPDATE per bucket."""
+    for (user_id, project_id, activity_id, period_start), (hours, count) in deltas.items():
+        if not hours and not count:
+            continue
+        rows = WeeklyHoursRollup.objects.filter(
+            user_id=user_id, project_id=project_id, activity_id=activity_id, period_start=period_start,
+        )
+        changes = {'hours': F('hours') + hours, 'entry_count': F('entry_count') + count}
+        if rows.update(**changes):
+            if count < 0:
+                rows.filter(entry_count__lte=0).delete()
+            continue
+        if count <= 0:
+            # Nothing to subtract from (e.g. bucket already removed by a cascade)
+            continue
+        week_start, _, period_end = bucket_bounds(period_start)
+        try:
+            with transaction.atomic():
+                WeeklyHoursRollup.objects.create(
+                    user_id=user_id,
+                    project_id=project_id,
+                    activity_id=activity_id,
+                    week_start=week_start,
+                    period_start=period_start,
+                    period_end=period_end,
+                    hours=hours,
+                    entry_count=count,
+                )
+        except IntegrityError:
+            # Created concurrently by another writer
+            rows.update(**changes)
+
+
+def fold_activity(activity_id):
+    """Merge the buckets of an Activity being deleted into the matching activity-less buckets."""
+    for row in WeeklyHoursRollup.objects.filter(activity_id=activity_id):
+        target = WeeklyHoursRollup.objects.filter(
+            user_id=row.user_id, project_id=row.project_id, activity_id=None, period_start=row.period_start,
+        )
+        if target.update(hours=F('hours') + row.hours, entry_count=F('entry_count') + row.entry_count):
+            row.delete()
+
+
+@contextmanager
+def deferred(timesheet=None):
+    """
+    Collect rollup deltas from signals and bulk writes and apply them once on exit.
+
+    Used by the bulk grid save so a whole grid costs one UPDATE per touched
+    bucket instead of one per entry. Nested calls share the outer batch.
+    """
+    batch = _pending.get()
+    if batch is not None:
+        yield batch
+        return
+    batch = _Batch()
+    if timesheet is not None:
+        batch.timesheet_users[timesheet.pk] = timesheet.user_id
+    token = _pending.set(batch)
+    try:
+        yield batch
+    finally:
+        _pending.reset(token)
+    apply_deltas(batch.deltas)
+
+
+def _expected_buckets():
+    return (
+        TimeEntry.objects
+        .values('project_id', 'activity_id', user_id=F('timesheet__user_id'), week=TruncWeek('date'), month=TruncMonth('date'))
+        .annotate(total=Sum('hours'), count=Count('id'))
+        .order_by()
+    )
+
+
+def rebuild(batch_size=1000):
+    """Recompute the whole rollup from TimeEntry. Returns the number of buckets written."""
+    written = 0
+    with transaction.atomic():
+        WeeklyHoursRollup.objects.all().delete()
+        objs = []
+        for row in _expected_buckets().iterator(chunk_size=batch_size):
+            period_start = max(row['week'], row['month'])
+            objs.append(WeeklyHoursRollup(
+                user_id=row['user_id'],
+                project_id=row['project_id'],
+                activity_id=row['activity_id'],
+                week_start=row['week'],
+                period_start=period_start,
+                period_end=bucket_bounds(period_start)[2],
+                hours=row['total'] or 0,
+                entry_count=row['count'],
+            ))
+            if len(objs) >= batch_size:
+                WeeklyHoursRollup.objects.bulk_create(objs)
+                written += len(objs)
+                objs = []
+        if objs:
+            WeeklyHoursRollup.objects.bulk_create(objs)
+            written += len(objs)
+    return written
+
+
+def verify():
+    """Compare the rollup with TimeEntry; returns ``[(key, expected, actual)]`` for mismatching buckets."""
+    expected = {}
+    for row in _expected_buckets():
+        key = (row['user_id'], row['project_id'], row['activity_id'], max(row['week'], row['month']))
+        expected[key] = (Decimal(row['total'] or 0), row['count'])
+
+    actual = {}
+    rows = (
+        WeeklyHoursRollup.objects
+        .values('user_id', 'project_id', 'activity_id', 'period_start')
+        .annotate(total=Sum('hours'), count=Sum('entry_count'))
+        .order_by()
+    )
+    for row in rows:
+        key = (row['user_id'], row['project_id'], row['activity_id'], row['period_start'])
+        actual[key] = (Decimal(row['total'] or 0), row['count'])
+
+    mismatches = []
+    for key in expected.keys() | actual.keys():
+        if expected.get(key) != actual.get(key):
+            mismatches.append((key, expected.get(key), actual.get(key)))
+    return mismatches
+
+
+def _entry_lookup(name):
+    if name == 'user' or name.startswith('user_') or name.startswith('user__'):
+        return f'timesheet__{name}'
+    return name
+
+
+def _edge_entries(start, end, filters):
+    """Raw entries of the buckets only partially covered by ``[start, end]``."""
+    ranges = []
+    if start:
+        _, period_start, period_end = bucket_bounds(start)
+        if period_start < start:
+            ranges.append((start, min(period_end, end) if end else period_end))
+    if end:
+        _, period_start, period_end = bucket_bounds(end)
+        if period_end > end:
+            ranges.append((max(period_start, start) if start else period_start, end))
+    ranges = [(lo, hi) for lo, hi in ranges if lo <= hi]
+    if not ranges:
+        return None
+    q = Q()
+    for lo, hi in ranges:
+        q |= Q(date__range=(lo, hi))
+    return TimeEntry.objects.filter(q).filter(**{_entry_lookup(k): v for k, v in filters.items()})
+
+
+def sum_hours(start=None, end=None, by=None, **filters):
+    """
+    Sum hours over ``[start, end]`` from the rollup.
+
+    Only buckets partially covered by the range are read from TimeEntry, so
+    the cost depends on the number of weeks, not entries. ``filters`` use
+    rollup field names (``user``, ``project``, ``activity``...). With ``by``
+    (a key of ``DIMENSIONS``) returns ``{value: Decimal}``, otherwise a Decimal.
+    """
+    buckets = WeeklyHoursRollup.objects.filter(**filters)
+    if start:
+        buckets = buckets.filter(period_start__gte=start)
+    if end:
+        buckets = buckets.filter(period_end__lte=end)
+    edges = _edge_entries(start, end, filters)
+
+    if by is None:
+        total = buckets.aggregate(total=Sum('hours'))['total'] or Decimal('0')
+        if edges is not None:
+            total += edges.aggregate(total=Sum('hours'))['total'] or Decimal('0')
+        return total
+
+    rollup_expr, entry_expr = DIMENSIONS[by]
+    result = defaultdict(Decimal)
+    for row in buckets.values(group=rollup_expr).annotate(total=Sum('hours')).order_by():
+        result[row['group']] += row['total'] or 0
+    if edges is not None:
+        for row in edges.values(group=entry_expr).annotate(total=Sum('hours')).order_by():
+            result[row['group']] += row['total'] or 0
+    return dict(result)
@@ -0,0 +1,297 @@
+import logging
+from collections import defaultdict
+from datetime import date as date_cls, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import rollup
+from .models import TimeEntry, Timesheet
+from .signals import time_entries_bulk_saved
+
+logger = logging.getLogger(__name__)
+
+HOURS_QUANTUM = Decimal('0.01')
+
+
+class StaleTimesheetError(Exception):
+    """The grid was changed by another writer since the client loaded it."""
+
+    def __init__(self, current_version):
+        super().__init__(f"Timesheet is at version {current_version}")
+        self.current_version = current_version
+
+
+def _parse_optional_id(raw):
+    if raw in (None, '', 'None', 'null'):
+        return None
+    return int(raw)
+
+
+def parse_hours(value):
+    """Parse a grid cell value ("7,5", "8", "") into a Decimal; empty means zero."""
+    val_str = str(value if value is not None else '').replace(',', '.').strip()
+    if not val_str:
+        return Decimal('0')
+    hours = Decimal(val_str).quantize(HOURS_QUANTUM)
+    if hours < 0:
+        raise ValueError(f"Negative hours: {value}")
+    return hours
+
+
+def parse_grid_post(data):
+    """
+    Group posted ``hours_{proj}_{task}_{act}_{date}`` keys by grid row.
+
+    Returns ``{(project_id, task_id, activity_id): {date: Decimal}}``; malformed
+    keys are logged and skipped.
+    """
+    grid_data = defaultdict(dict)
+    for key, value in data.items():
+        if not key.startswith('hours_'):
+            continue
+        parts = key.split('_')
+        if len(parts) < 5:
+            continue
+        try:
+            project_id = int(parts[1])
+            task_id = _parse_optional_id(parts[2])
+            activity_id = _parse_optional_id(parts[3])
+            day = date_cls.fromisoformat(parts[4])
+            hours = parse_hours(value)
+        except (ValueError, TypeError, InvalidOperation) as e:
+            logger.error(f"Error parsing grid key {key}: {e}")
+            continue
+        grid_data[(project_id, task_id, activity_id)][day] = hours
+    return grid_data
+
+
+def parse_grid_cells(cells):
+    """
+    Group a delta payload ``[{project, task, activity, date, hours}, ...]`` by grid row.
+
+    Same output shape as ``parse_grid_post``; raises ``ValueError`` on the
+    first malformed cell so the whole delta can be rejected.
+    """
+    if not isinstance(cells, list):
+        raise ValueError("cells must be a list")
+    grid_data = defaultdict(dict)
+    for index, cell in enumerate(cells):
+        try:
+            project_id = int(cell['project'])
+            task_id = _parse_optional_id(cell.get('task'))
+            activity_id = _parse_optional_id(cell.get('activity'))
+            day = date_cls.fromisoformat(cell['date'])
+            hours = parse_hours(cell.get('hours'))
+        except (KeyError, ValueError, TypeError, AttributeError, InvalidOperation) as e:
+            raise ValueError(f"Invalid cell #{index}: {e}")
+        grid_data[(project_id, task_id, activity_id)][day] = hours
+    return grid_data
+
+
+def bump_version(timesheet):
+    """Invalidate clients holding the current grid after a row-level change."""
+    Timesheet.objects.filter(pk=timesheet.pk).update(version=F('version') + 1)
+
+
+def merge_detached_cells(field, pk):
+    """
+    Merge the entries about to lose ``field`` ('task' or 'activity', whose row
+    ``pk`` is being deleted) into the cell without it on the same row and day.
+
+    SET_NULL would otherwise turn them into duplicates of that cell and break
+    the ``timesheet_entry_cell`` constraint. Saves and deletes go through the
+    model so the rollup follows; touched sheets get a new grid version.
+    """
+    cell = ('timesheet_id', 'project_id', 'task_id', 'activity_id', 'date')
+    timesheet_ids = set()
+    with transaction.atomic():
+        for entry in TimeEntry.objects.filter(timesheet__isnull=False, **{field: pk}):
+            lookup = {name: getattr(entry, name) for name in cell}
+            lookup[f'{field}_id'] = None
+            target = TimeEntry.objects.filter(**lookup).first()
+            if target is None:
+                continue
+            target.hours += entry.hours
+            target.description = '\n'.join(filter(None, [target.description, entry.description]))
+            target.save()
+            entry.delete()
+            timesheet_ids.add(entry.timesheet_id)
+        Timesheet.objects.filter(pk__in=timesheet_ids).update(version=F('version') + 1)
+
+
+def save_grid(timesheet, grid_data, allowed_project_ids, expected_version=None):
+    """
+    Apply the posted grid to ``timesheet`` with set-based writes.
+
+    All entries of the timesheet are loaded once and diffed in memory against
+    ``grid_data``; the result is written with one ``bulk_create``, one
+    ``bulk_update`` and one ``delete`` inside a single transaction. Each row
+    keeps an anchor entry on ``start_date`` so it survives with zero hours;
+    other zeroed cells are removed. The ``timesheet_entry_cell`` constraint
+    guarantees at most one entry per cell.
+
+    Every save bumps ``timesheet.version``. When ``expected_version`` is given
+    the bump is a compare-and-swap and ``StaleTimesheetError`` is raised if
+    another write got there first. Weekly hours rollup deltas are collected
+    for the whole grid and applied once per touched bucket.
+
+    Returns ``{'created': n, 'updated': n, 'deleted': n, 'rejected_projects': [...], 'version': n}``.
+    """
+    rejected_projects = set()
+    to_create = []
+    to_update = []
+    to_delete = []
+
+    with transaction.atomic(), rollup.deferred(timesheet):
+        versions = Timesheet.objects.filter(pk=timesheet.pk)
+        if expected_version is not None:
+            versions = versions.filter(version=expected_version)
+        if not versions.update(version=F('version') + 1):
+            raise StaleTimesheetError(
+                Timesheet.objects.filter(pk=timesheet.pk).values_list('version', flat=True).first()
+            )
+        timesheet.refresh_from_db(fields=['version'])
+
+        existing = {
+            (entry.project_id, entry.task_id, entry.activity_id, entry.date): entry
+            for entry in TimeEntry.objects.filter(timesheet=timesheet)
+            .only('id', 'project_id', 'task_id', 'activity_id', 'date', 'hours')
+        }
+
+        now = timezone.now()
+        for (proj_id, task_id, act_id), daily_data in grid_data.items():
+            if proj_id not in allowed_project_ids:
+                rejected_projects.add(proj_id)
+                continue
+
+            cells = {
+                day: hours for day, hours in daily_data.items()
+                if timesheet.start_date <= day <= timesheet.end_date
+            }
+            # Ensure the anchor entry exists so the row is kept even with all hours at 0
+            if timesheet.start_date not in cells and (proj_id, task_id, act_id, timesheet.start_date) not in existing:
+                cells[timesheet.start_date] = Decimal('0')
+
+            for day, hours in cells.items():
+                entry = existing.get((proj_id, task_id, act_id, day))
+                is_anchor = day == timesheet.start_date
+
+                if entry is None:
+                    if hours or is_anchor:
+                        to_create.append(TimeEntry(
+                            timesheet=timesheet,
+                            project_id=proj_id,
+                            task_id=task_id,
+                            activity_id=act_id,
+                            date=day,
+                            hours=hours,
+                        ))
+                elif not hours and not is_anchor:
+                    to_delete.append(entry)
+                elif entry.hours != hours:
+                    old_state = rollup.entry_state(entry)
+                    entry.hours = hours
+                    rollup.apply_entry_change(old=old_state, new=entry)
+                    entry.updated_at = now
+                    to_update.append(entry)
+
+        if to_create:
+            TimeEntry.objects.bulk_create(to_create)
+            for entry in to_create:
+                rollup.apply_entry_change(new=entry)
+        if to_update:
+            TimeEntry.objects.bulk_update(to_update, ['hours', 'updated_at'])
+        if to_delete:
+            TimeEntry.objects.filter(pk__in=[e.pk for e in to_delete]).delete()
+        if to_create or to_update:
+            time_entries_bulk_saved.send(
+                sender=TimeEntry,
+                timesheet=timesheet,
+                entry_ids=[e.pk for e in to_create + to_update],
+            )
+
+    return {
+        'created': len(to_create),
+        'updated': len(to_update),
+        'deleted': len(to_delete),
+        'rejected_projects': sorted(rejected_projects),
+        'version': timesheet.version,
+    }
+
+
+def build_grid(timesheet, entries):
+    """
+    Pivot ``entries`` into the weekly grid with a single ``values()`` query.
+
+    Rows are keyed by ``(project_id, task_id, activity_id)`` and carry a
+    fixed-length ``hours`` list aligned with ``days``; row totals, daily
+    totals and the grand total are accumulated in the same pass. The result
+    feeds both the HTML template and ``grid_as_json``.
+    """
+    num_days = (timesheet.end_date - timesheet.start_date).days + 1
+    days = [timesheet.start_date + timedelta(days=i) for i in range(num_days)]
+    day_totals = [Decimal('0')] * num_days
+    rows = {}
+
+    values = entries.values(
+        'project_id', 'project__name',
+        'task_id', 'task__title',
+        'activity_id', 'activity__name',
+        'date', 'hours',
+    ).order_by('date', 'project_id', 'id')
+
+    for entry in values:
+        key = (entry['project_id'], entry['task_id'], entry['activity_id'])
+        row = rows.get(key)
+        if row is None:
+            row = rows[key] = {
+                'project_id': entry['project_id'],
+                'project_name': entry['project__name'],
+                'task_id': entry['task_id'],
+                'task_title': entry['task__title'],
+                'activity_id': entry['activity_id'],
+                'activity_name': entry['activity__name'],
+                'hours': [Decimal('0')] * num_days,
+                'total': Decimal('0'),
+            }
+        index = (entry['date'] - timesheet.start_date).days
+        hours = entry['hours'] or Decimal('0')
+        if not 0 <= index < num_days or not hours:
+            continue
+        row['hours'][index] += hours
+        row['total'] += hours
+        day_totals[index] += hours
+
+    return {
+        'days': days,
+        'rows': list(rows.values()),
+        'day_totals': day_totals,
+        'total': sum(day_totals, Decimal('0')),
+    }
+
+
+def grid_as_json(grid, timesheet):
+    """JSON-friendly variant of ``build_grid`` for the JS grid."""
+    return {
+        'timesheet': timesheet.pk,
+        'version': timesheet.version,
+        'days': [day.isoformat() for day in grid['days']],
+        'rows': [
+            {
+                'project': row['project_id'],
+                'project_name': row['project_name'],
+                'task': row['task_id'],
+                'task_title': row['task_title'],
+                'activity': row['activity_id'],
+                'activity_name': row['activity_name'],
+                'hours': [float(h) for h in row['hours']],
+                'total': float(row['total']),
+            }
+            for row in grid['rows']
+        ],
+        'day_totals': [float(h) for h in grid['day_totals']],
+        'total': float(grid['total']),
+    }
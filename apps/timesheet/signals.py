@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Sent by services.save_grid after its bulk writes, which bypass the model
+# post_save signal. Receivers get ``timesheet`` and ``entry_ids`` (created or
+# updated entries); deletions still send post_delete per entry.
+time_entries_bulk_saved = Signal()
@@ -2,8 +2,8 @@ from django.urls import path
 from django.urls import path
 from .views import (
     TimeEntryListView, TimeEntryCreateView, TimeEntryUpdateView,
-    TimesheetListView, TimesheetCreateView, TimesheetDetailView, TimesheetActionView,
-    TimesheetDeleteView, TimesheetApprovalListView,
+    TimesheetListView, TimesheetCreateView, TimesheetDetailView, TimesheetActionView, TimesheetCellsView,
+    TimesheetDeleteView, TimesheetApprovalListView, TimesheetBulkApprovalView, TimesheetBatchTransitionView,
     ReportsDashboardView, ReportsExportView,
     ActivityListView, ActivityCreateView, ActivityUpdateView, ActivityDeleteView
 )
@@ -13,16 +13,19 @@ app_name = 'timesheet'
 urlpatterns = [
     path('', TimesheetListView.as_view(), name='timesheet_list'),
     path('approvals/', TimesheetApprovalListView.as_view(), name='timesheet_approval_list'),
+    path('approvals/bulk/', TimesheetBulkApprovalView.as_view(), name='timesheet_approval_bulk'),
     path(
         'approvals/he/',
         TimesheetApprovalListView.as_view(template_name='timesheet/timesheet_approval_he_list.html'),
         name='timesheet_approval_he_list'
     ),
+    path('batch/', TimesheetBatchTransitionView.as_view(), name='timesheet_batch'),
     path('entries/', TimeEntryListView.as_view(), name='entry_list'),
     path('create/', TimesheetCreateView.as_view(), name='timesheet_create'),
     path('delete/<int:pk>/', TimesheetDeleteView.as_view(), name='timesheet_delete'),
     path('<int:pk>/', TimesheetDetailView.as_view(), name='timesheet_detail'),
     path('<int:pk>/action/', TimesheetActionView.as_view(), name='timesheet_action'),
+    path('<int:pk>/cells/', TimesheetCellsView.as_view(), name='timesheet_cells'),
     path('entries/add/', TimeEntryCreateView.as_view(), name='entry_create'),
     path('entries/<int:pk>/edit/', TimeEntryUpdateView.as_view(), name='entry_edit'),
     path('reports/', ReportsDashboardView.as_view(), name='reports_dashboard'),
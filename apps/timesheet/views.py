@@ -1,4 +1,4 @@
-from collections import defaultdict
+from collections import Counter, defaultdict
 import calendar
 from datetime import timedelta, datetime
 from django.contrib import messages
@@ -7,14 +7,15 @@ from django.views.generic import ListView, CreateView, UpdateView, DeleteView
 from django.shortcuts import redirect, get_object_or_404
 from django.http import JsonResponse
 from django.urls import reverse_lazy
-from django.db import IntegrityError, models
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.db import IntegrityError, models, transaction
 from django.db.models import Q, Count, Sum
-from django.db.models.functions import TruncMonth
 import json
-import csv
+from urllib.parse import urlencode
 from io import BytesIO
+from itertools import islice
 from datetime import datetime
-from django.http import HttpResponse
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 from django.views import View, generic
 try:
     import openpyxl
@@ -27,8 +28,19 @@ except ImportError:
     letter = None
     canvas = None
 from .models import TimeEntry, Timesheet, Activity
+from .exports import (
+    ENTRY_HEADER, TIMESHEET_HEADER, entry_rows, filtered_entries, filtered_timesheets, parse_report_filters,
+    stream_csv, timesheet_rows, write_xlsx,
+)
+from . import approvals
+from .rollup import sum_hours
 from apps.projects.models import Project, Issue
+from apps.projects.membership import member_project_ids
 from .forms import ActivityForm, TimeEntryForm, TimesheetForm
+from .services import (
+    StaleTimesheetError, build_grid, bump_version, grid_as_json,
+    parse_grid_cells, parse_grid_post, save_grid,
+)
 
 class TimesheetListView(LoginRequiredMixin, ListView):
     model = Timesheet
@@ -67,11 +79,7 @@ class TimesheetListView(LoginRequiredMixin, ListView):
         context['grouped_timesheets'] = grouped_ordered
         return context
 
-class TimesheetApprovalListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
-    model = Timesheet
-    template_name = 'timesheet/timesheet_approval_list.html'
-    context_object_name = 'timesheets'
-    paginate_by = 20
+class ApprovalAccessMixin(PermissionRequiredMixin):
     permission_required = 'core.access_approvals'
     raise_exception = True
 
@@ -84,28 +92,99 @@ class TimesheetApprovalListView(LoginRequiredMixin, PermissionRequiredMixin, Lis
             return True
         return super().has_permission()
 
+
+class TimesheetApprovalListView(LoginRequiredMixin, ApprovalAccessMixin, ListView):
+    model = Timesheet
+    template_name = 'timesheet/timesheet_approval_list.html'
+    context_object_name = 'timesheets'
+    paginate_by = 20
+
     def get_queryset(self):
         user = self.request.user
         if not (getattr(user, 'role', None) == getattr(user, 'Role', None).MANAGER or user.has_perm('timesheet.change_timesheet') or user.is_superuser):
             return Timesheet.objects.none()
 
-        qs = Timesheet.objects.filter(
-            Q(status=Timesheet.Status.SUBMITTED) | Q(status=Timesheet.Status.PARTIALLY_APPROVED)
-        ).filter(
-            entries__project__project_manager=user
-        ).exclude(
-            partial_approvers=user
-        ).distinct().order_by('-start_date')
-
-        if user.has_perm('timesheet.change_timesheet') or user.is_superuser:
-            return qs
-
-        return qs
+        return approvals.pending_for(user).select_related('user').order_by('-start_date')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         return context
 
+
+BATCH_STATUS_MESSAGES = {
+    Timesheet.Status.APPROVED: '{} folha(s) aprovada(s).',
+    Timesheet.Status.PARTIALLY_APPROVED: '{} folha(s) aguardando a aprovação de outros gestores.',
+    Timesheet.Status.REJECTED: '{} folha(s) rejeitada(s).',
+    Timesheet.Status.DRAFT: '{} envio(s) cancelado(s).',
+}
+
+
+class TimesheetBulkApprovalView(LoginRequiredMixin, ApprovalAccessMixin, View):
+    """Aprova ou rejeita de uma vez as folhas marcadas na caixa de aprovações."""
+
+    def post(self, request, *args, **kwargs):
+        action = request.POST.get('action')
+        ids = [pk for pk in request.POST.getlist('timesheet_ids') if pk.isdigit()]
+        next_url = request.POST.get('next', '')
+        if not url_has_allowed_host_and_scheme(next_url, {request.get_host()}):
+            next_url = reverse_lazy('timesheet:timesheet_approval_list')
+        if action not in ('approve', 'reject'):
+            messages.error(request, 'Ação inválida.')
+            return redirect(next_url)
+        if not ids:
+            messages.error(request, 'Selecione ao menos uma folha de ponto.')
+            return redirect(next_url)
+
+        results = approvals.transition(request.user, ids, action, request.POST.get('reason', ''))
+        moved = Counter(result['status'] for result in results.values() if result['ok'])
+        for status, count in moved.items():
+            messages.success(request, BATCH_STATUS_MESSAGES[status].format(count))
+        failed = Counter(result['message'] for result in results.values() if not result['ok'])
+        for message, count in failed.items():
+            messages.warning(request, f"{count} folha(s) não processada(s): {message}")
+        return redirect(next_url)
+
+
+class TimesheetBatchTransitionView(LoginRequiredMixin, View):
+    """
+    Transição em lote (JSON) para fechamento de mês.
+
+    Body: ``{"action": "approve"|"reject"|"cancel", "ids": [...], "reason": ""}``.
+    Escopo e regras de cada folha são os mesmos da ação individual; folhas
+    que não passam são devolvidas com a mensagem e não impedem as demais.
+    """
+    http_method_names = ['post']
+    max_batch = 1000
+
+    def post(self, request, *args, **kwargs):
+        try:
+            payload = json.loads(request.body or b'{}')
+            action = payload['action']
+            ids = payload['ids']
+            reason = str(payload.get('reason', ''))
+        except (ValueError, TypeError, KeyError) as e:
+            return JsonResponse({'status': 'error', 'message': f'Payload inválido: {e}'}, status=400)
+        if not isinstance(action, str) or action not in approvals.ACTIONS:
+            return JsonResponse({'status': 'error', 'message': 'Ação inválida.'}, status=400)
+        if not isinstance(ids, list) or not ids or len(ids) > self.max_batch:
+            return JsonResponse(
+                {'status': 'error', 'message': f'Informe de 1 a {self.max_batch} folhas de ponto.'}, status=400,
+            )
+        # bool é subclasse de int, mas true/false não são ids
+        if not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in ids):
+            return JsonResponse({'status': 'error', 'message': 'Os ids devem ser números inteiros.'}, status=400)
+        if action == 'reject' and not reason.strip():
+            return JsonResponse({'status': 'error', 'message': 'Informe o motivo da rejeição.'}, status=400)
+
+        results = approvals.transition(request.user, ids, action, reason)
+        succeeded = sum(result['ok'] for result in results.values())
+        return JsonResponse({
+            'status': 'success',
+            'summary': {'requested': len(results), 'succeeded': succeeded, 'failed': len(results) - succeeded},
+            'results': [{'id': pk, **result} for pk, result in results.items()],
+        })
+
+
 class TimesheetCreateView(LoginRequiredMixin, CreateView):
     model = Timesheet
     form_class = TimesheetForm
@@ -138,12 +217,9 @@ class TimesheetDetailView(LoginRequiredMixin, ListView): # Using ListView to lis
 
     def _assignable_projects(self, user):
         return Project.objects.filter(
-            status__in=[Project.Status.PLANNED, Project.Status.IN_PROGRESS, Project.Status.LATE]
-        ).filter(
-            Q(team=user) |
-            Q(project_manager=user) |
-            Q(project_owner=user)
-        ).distinct()
+            status__in=[Project.Status.PLANNED, Project.Status.IN_PROGRESS, Project.Status.LATE],
+            pk__in=member_project_ids(user),
+        )
 
     def get_queryset(self):
         timesheet = self.get_timesheet()
@@ -155,13 +231,23 @@ class TimesheetDetailView(LoginRequiredMixin, ListView): # Using ListView to lis
         return qs
 
     def get_timesheet(self):
+        if hasattr(self, '_timesheet'):
+            return self._timesheet
         qs = Timesheet.objects.all()
         user = self.request.user
         if user.role == getattr(user, 'Role', None).MANAGER and not (user.has_perm('timesheet.view_timesheet') or user.has_perm('timesheet.change_timesheet') or user.is_superuser):
             qs = qs.filter(Q(entries__project__project_manager=user) | Q(user=user)).distinct()
         elif not (user.has_perm('timesheet.view_timesheet') or user.has_perm('timesheet.change_timesheet') or user.is_superuser):
             qs = qs.filter(user=user)
-        return get_object_or_404(qs, pk=self.kwargs['pk'])
+        self._timesheet = get_object_or_404(qs, pk=self.kwargs['pk'])
+        return self._timesheet
+
+    def get(self, request, *args, **kwargs):
+        if request.GET.get('format') == 'json':
+            timesheet = self.get_timesheet()
+            grid = build_grid(timesheet, self.get_queryset())
+            return JsonResponse(grid_as_json(grid, timesheet))
+        return super().get(request, *args, **kwargs)
 
     def _can_approve(self, user, timesheet):
         if user == timesheet.user:
@@ -169,7 +255,7 @@ class TimesheetDetailView(LoginRequiredMixin, ListView): # Using ListView to lis
         if user.is_superuser or user.has_perm('timesheet.change_timesheet'):
             return timesheet.status in [Timesheet.Status.SUBMITTED, Timesheet.Status.PARTIALLY_APPROVED]
         if user.role == getattr(user, 'Role', None).MANAGER:
-            return timesheet.status in [Timesheet.Status.SUBMITTED, Timesheet.Status.PARTIALLY_APPROVED] and timesheet.entries.filter(project__project_manager=user).exists()
+            return timesheet.status in [Timesheet.Status.SUBMITTED, Timesheet.Status.PARTIALLY_APPROVED] and approvals.requires(timesheet, user)
         return False
 
     def get_context_data(self, **kwargs):
@@ -186,19 +272,16 @@ class TimesheetDetailView(LoginRequiredMixin, ListView): # Using ListView to lis
         else:
             context['back_url'] = reverse_lazy('timesheet:timesheet_list')
         
-        # Generate days of the week
-        days = []
-        current_date = timesheet.start_date
-        while current_date <= timesheet.end_date:
-            days.append(current_date)
-            current_date += timedelta(days=1)
-        context['days'] = days
-        
+        grid = build_grid(timesheet, context['entries'])
+        context['days'] = grid['days']
+        context['grid_rows'] = grid['rows']
+        context['day_totals'] = grid['day_totals']
+        context['total_timesheet_hours'] = grid['total']
+
         # Context for Add Row Modal
         # Filter projects:
         # 1. Status must be IN_PROGRESS or LATE (active for timesheets)
         # 2. User must be in the team OR be the project manager OR be the project owner
-        from django.db.models import Q
         projects = self._assignable_projects(self.request.user)
         context['projects'] = projects
         task_qs = Issue.objects.filter(
@@ -214,38 +297,6 @@ class TimesheetDetailView(LoginRequiredMixin, ListView): # Using ListView to lis
         context['project_tasks_map'] = project_tasks
         context['activities'] = Activity.objects.filter(active=True)
 
-        # Group entries by Project/Task/Activity for the grid
-        rows = {} # Key: (project_id, task_id, activity_id) -> {day: hours}
-        for entry in context['entries']:
-            key = (entry.project, entry.task, entry.activity)
-            if key not in rows:
-                rows[key] = {'project': entry.project, 'task': entry.task, 'activity': entry.activity, 'days': {}}
-            rows[key]['days'][entry.date] = entry.hours
-            
-        # Convert rows to a list with ordered daily hours
-        grid_rows = []
-        for key, data in rows.items():
-            daily_data = [] # Changed to list of dicts to include date for input name
-            total_hours = 0
-            for day in days:
-                hours = data['days'].get(day, 0) # Default to 0 for calculation
-                daily_data.append({'date': day, 'hours': hours if hours != 0 else ''})
-                total_hours += float(hours) if hours else 0
-            
-            grid_rows.append({
-                'project': data['project'],
-                'task': data['task'],
-                'activity': data['activity'],
-                'daily_data': daily_data,
-                'total_hours': total_hours
-            })
-            
-        context['grid_rows'] = grid_rows
-        
-        # Calculate total hours for the entire timesheet
-        total_timesheet_hours = sum(row['total_hours'] for row in grid_rows)
-        context['total_timesheet_hours'] = total_timesheet_hours
-        
         return context
 
 class TimesheetActionView(LoginRequiredMixin, UpdateView):
@@ -255,12 +306,9 @@ class TimesheetActionView(LoginRequiredMixin, UpdateView):
 
     def _assignable_projects(self, user):
         return Project.objects.filter(
-            status__in=[Project.Status.PLANNED, Project.Status.IN_PROGRESS, Project.Status.LATE]
-        ).filter(
-            Q(team=user) |
-            Q(project_manager=user) |
-            Q(project_owner=user)
-        ).distinct()
+            status__in=[Project.Status.PLANNED, Project.Status.IN_PROGRESS, Project.Status.LATE],
+            pk__in=member_project_ids(user),
+        )
     
     def get_queryset(self):
         qs = super().get_queryset()
@@ -271,6 +319,12 @@ class TimesheetActionView(LoginRequiredMixin, UpdateView):
             qs = qs.filter(user=user)
         return qs
 
+    def _can_operate(self, user, timesheet):
+        # Only owner or privileged users can operate on a timesheet
+        if user == timesheet.user or user.has_perm('timesheet.change_timesheet') or user.is_superuser:
+            return True
+        return user.role == getattr(user, 'Role', None).MANAGER and timesheet.entries.filter(project__project_manager=user).exists()
+
     def post(self, request, *args, **kwargs):
         timesheet = self.get_object()
         action = request.POST.get('action')
@@ -285,14 +339,8 @@ class TimesheetActionView(LoginRequiredMixin, UpdateView):
             if 'timesheet/approvals' in referer and url_has_allowed_host_and_scheme(referer, {host}):
                 return redirect(referer)
             return redirect('timesheet:timesheet_detail', pk=timesheet.pk)
-        
-        print(f"DEBUG: TimesheetActionView.post called. Action: {action}, User: {request.user}")
-        print(f"DEBUG: Entries BEFORE: {TimeEntry.objects.filter(timesheet=timesheet).count()}")
-        print(f"DEBUG: POST keys: {list(request.POST.keys())}")
 
-        # Only owner or privileged users can operate on a timesheet
-        manager_scope = timesheet.entries.filter(project__project_manager=request.user).exists()
-        if not (request.user == timesheet.user or request.user.has_perm('timesheet.change_timesheet') or request.user.is_superuser or (request.user.role == getattr(request.user, 'Role', None).MANAGER and manager_scope)):
+        if not self._can_operate(request.user, timesheet):
             return redirect('timesheet:timesheet_list')
         is_editable = timesheet.status in [Timesheet.Status.DRAFT, Timesheet.Status.REJECTED]
         
@@ -303,70 +351,30 @@ class TimesheetActionView(LoginRequiredMixin, UpdateView):
                 messages.error(request, 'Não é possível enviar uma folha de ponto sem horas lançadas.')
                 return redirect_back()
                 
-            timesheet.status = Timesheet.Status.SUBMITTED
-            timesheet.partial_approvers.clear()
-            timesheet.approved_by = None
-            timesheet.save()
-        elif action == 'approve':
-            if timesheet.user == request.user:
-                messages.error(request, 'Você não pode aprovar a própria folha. Solicite a aprovação de outro usuário.')
-                return redirect_back()
-            is_manager = request.user.role == getattr(request.user, 'Role', None).MANAGER
-            has_scope = timesheet.entries.filter(project__project_manager=request.user).exists()
-            if is_manager and not has_scope and not (request.user.has_perm('timesheet.change_timesheet') or request.user.is_superuser):
-                messages.error(request, 'Você não tem permissão para aprovar esta folha.')
-                return redirect_back()
-
-            if request.user.has_perm('timesheet.change_timesheet') or request.user.is_superuser:
-                timesheet.status = Timesheet.Status.APPROVED
-                timesheet.approved_by = request.user
+            with transaction.atomic():
+                timesheet.status = Timesheet.Status.SUBMITTED
                 timesheet.partial_approvers.clear()
+                timesheet.approved_by = None
                 timesheet.save()
-            elif is_manager and has_scope:
-                # Register partial approval
-                timesheet.partial_approvers.add(request.user)
-                all_managers = set(
-                    timesheet.entries.exclude(project__project_manager__isnull=True).values_list('project__project_manager', flat=True)
-                )
-                approved_managers = set(timesheet.partial_approvers.values_list('id', flat=True))
-                if all_managers and all_managers.issubset(approved_managers):
-                    timesheet.status = Timesheet.Status.APPROVED
-                    timesheet.approved_by = request.user
-                else:
-                    timesheet.status = Timesheet.Status.PARTIALLY_APPROVED
-                timesheet.save()
-            else:
-                messages.error(request, 'Você não tem permissão para aprovar esta folha.')
-        elif action == 'reject':
-            if timesheet.user == request.user:
-                messages.error(request, 'Você não pode rejeitar a própria folha. Solicite a aprovação de outro usuário.')
+                approvals.create_requirements(timesheet)
+        elif action == 'approve':
+            try:
+                approvals.approve(timesheet, request.user)
+            except approvals.ApprovalError as exc:
+                messages.error(request, str(exc))
                 return redirect_back()
-            is_manager = request.user.role == getattr(request.user, 'Role', None).MANAGER
-            has_scope = timesheet.entries.filter(project__project_manager=request.user).exists()
-            if not (request.user.has_perm('timesheet.change_timesheet') or request.user.is_superuser or (is_manager and has_scope)):
-                messages.error(request, 'Você não tem permissão para rejeitar esta folha.')
+        elif action == 'reject':
+            try:
+                approvals.reject(timesheet, request.user, request.POST.get('reason', ''))
+            except approvals.ApprovalError as exc:
+                messages.error(request, str(exc))
                 return redirect_back()
-
-            if request.user.role == getattr(request.user, 'Role', None).MANAGER or request.user.has_perm('timesheet.change_timesheet') or request.user.is_superuser:
-                timesheet.status = Timesheet.Status.REJECTED
-                timesheet.rejection_reason = request.POST.get('reason', '')
-                timesheet.partial_approvers.clear()
-                timesheet.approved_by = None
-                timesheet.save()
-            else:
-                messages.error(request, 'Você não tem permissão para rejeitar esta folha.')
         elif action == 'cancel':
-            if timesheet.status not in [Timesheet.Status.SUBMITTED, Timesheet.Status.PARTIALLY_APPROVED]:
-                messages.error(request, 'Apenas folhas enviadas podem ser canceladas.')
-                return redirect_back()
-            if request.user != timesheet.user and not (request.user.has_perm('timesheet.change_timesheet') or request.user.is_superuser):
-                messages.error(request, 'Você não tem permissão para cancelar esta folha.')
+            try:
+                approvals.cancel(timesheet, request.user)
+            except approvals.ApprovalError as exc:
+                messages.error(request, str(exc))
                 return redirect_back()
-            timesheet.status = Timesheet.Status.DRAFT
-            timesheet.approved_by = None
-            timesheet.rejection_reason = ''
-            timesheet.partial_approvers.clear()
-            timesheet.save()
             messages.success(request, 'Envio cancelado. Folha retornou para rascunho.')
         elif action == 'add_row':
             if not is_editable:
@@ -380,20 +388,22 @@ class TimesheetActionView(LoginRequiredMixin, UpdateView):
                 return redirect_back()
             
             # Create an initial entry for the start date to ensure the row appears
-            TimeEntry.objects.create(
+            # (the row may already exist: one entry per cell)
+            TimeEntry.objects.get_or_create(
                 timesheet=timesheet,
                 project_id=project_id,
                 task_id=task_id,
                 activity_id=activity_id,
                 date=timesheet.start_date,
-                hours=0
+                defaults={'hours': 0},
             )
+            bump_version(timesheet)
         elif action == 'delete_row':
             if not is_editable:
                 return redirect_back()
             project_id = request.POST.get('project_id')
             task_id = request.POST.get('task_id') or None
-            activity_id = request.POST.get('activity_id')
+            activity_id = request.POST.get('activity_id') or None
             
             # Delete all TimeEntry records for this combination
             TimeEntry.objects.filter(
@@ -402,102 +412,78 @@ class TimesheetActionView(LoginRequiredMixin, UpdateView):
                 task_id=task_id,
                 activity_id=activity_id
             ).delete()
+            bump_version(timesheet)
         elif action == 'save_grid':
             if not is_editable:
                 return redirect_back()
-            
-            from django.db import transaction
-            import logging
-            logger = logging.getLogger(__name__)
 
-            with transaction.atomic():
-                # 1. Parse and group data from POST
-                # Structure: {(proj, task, act): {date: hours}}
-                grid_data = defaultdict(dict)
-                
-                print(f"DEBUG: POST keys: {list(request.POST.keys())}")
-
-                for key, value in request.POST.items():
-                    if key.startswith('hours_'):
-                        # Format: hours_{proj}_{task}_{act}_{date}
-                        parts = key.split('_')
-                        if len(parts) >= 5:
-                            try:
-                                project_id = int(parts[1])
-                                
-                                # Handle Task ID
-                                raw_task = parts[2]
-                                task_id = int(raw_task) if raw_task not in ('', 'None', 'None') and raw_task is not None else None
-                                
-                                # Handle Activity ID
-                                raw_act = parts[3]
-                                activity_id = int(raw_act) if raw_act not in ('', 'None', 'None') and raw_act is not None else None
-                                
-                                date_str = parts[4]
-                                
-                                # Parse hours
-                                val_str = (value or '').replace(',', '.').strip()
-                                hours = float(val_str) if val_str else 0.0
-                                
-                                print(f"DEBUG: Parsed {key} -> Proj: {project_id}, Task: {task_id}, Act: {activity_id}, Date: {date_str}, Hours: {hours}")
-                                
-                                grid_data[(project_id, task_id, activity_id)][date_str] = hours
-                                
-                            except (ValueError, TypeError) as e:
-                                print(f"DEBUG: Error parsing grid key {key}: {e}")
-                                logger.error(f"Error parsing grid key {key}: {e}")
-                                continue
-
-                # 2. Process each row
-                for (proj_id, task_id, act_id), daily_data in grid_data.items():
-                    if proj_id not in allowed_project_ids:
-                        messages.error(request, 'Não é possível registrar horas em projeto não elegível (completo ou sem acesso).')
-                        continue
-                    # Ensure anchor entry exists (Start Date)
-                    # We do this first to ensure the row is preserved even if all hours are 0
-                    TimeEntry.objects.get_or_create(
-                        timesheet=timesheet,
-                        project_id=proj_id,
-                        task_id=task_id,
-                        activity_id=act_id,
-                        date=timesheet.start_date,
-                        defaults={'hours': 0}
-                    )
-
-                    # Update/Create entries for specific dates
-                    for date_str, hours in daily_data.items():
-                        # Remove duplicates for this specific cell if any exist (cleanup)
-                        entries = TimeEntry.objects.filter(
-                            timesheet=timesheet,
-                            project_id=proj_id,
-                            task_id=task_id,
-                            activity_id=act_id,
-                            date=date_str
-                        )
-                        if entries.count() > 1:
-                            # Keep first, delete others
-                            entries.exclude(pk=entries.first().pk).delete()
-                        
-                        try:
-                            entry, created = TimeEntry.objects.update_or_create(
-                                timesheet=timesheet,
-                                project_id=proj_id,
-                                task_id=task_id,
-                                activity_id=act_id,
-                                date=date_str,
-                                defaults={'hours': hours}
-                            )
-                            print(f"DEBUG: Entry {'created' if created else 'updated'}: {entry.id}, date={entry.date}, hours={entry.hours}")
-                        except Exception as e:
-                            print(f"DEBUG: Error saving entry {date_str}: {e}")
-                            logger.error(f"Error saving entry {date_str}: {e}")
+            grid_data = parse_grid_post(request.POST)
+            diff = save_grid(timesheet, grid_data, allowed_project_ids)
+            if diff['rejected_projects']:
+                messages.error(request, 'Não é possível registrar horas em projeto não elegível (completo ou sem acesso).')
 
             # Return JSON response for AJAX requests, redirect for form submissions
             if request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.content_type == 'multipart/form-data':
-                return JsonResponse({'status': 'success', 'message': 'Hours saved successfully'})
+                return JsonResponse({
+                    'status': 'success',
+                    'message': 'Hours saved successfully',
+                    'version': diff['version'],
+                    'diff': {
+                        'created': diff['created'],
+                        'updated': diff['updated'],
+                        'deleted': diff['deleted'],
+                    },
+                })
 
         return redirect_back()
 
+
+class TimesheetCellsView(TimesheetActionView):
+    """
+    JSON autosave for the grid: applies only the changed cells.
+
+    Body: ``{"version": n, "cells": [{"project", "task", "activity", "date", "hours"}]}``.
+    A version that no longer matches the timesheet is rejected with 409 so the
+    client reloads instead of overwriting someone else's changes.
+    """
+    http_method_names = ['post']
+
+    def post(self, request, *args, **kwargs):
+        timesheet = self.get_object()
+        if not self._can_operate(request.user, timesheet):
+            return JsonResponse({'status': 'error', 'message': 'Sem permissão para alterar esta folha.'}, status=403)
+        if timesheet.status not in [Timesheet.Status.DRAFT, Timesheet.Status.REJECTED]:
+            return JsonResponse({'status': 'error', 'message': 'Folha não editável.'}, status=400)
+
+        try:
+            payload = json.loads(request.body or b'{}')
+            version = int(payload['version'])
+            grid_data = parse_grid_cells(payload.get('cells', []))
+        except (ValueError, TypeError, KeyError) as e:
+            return JsonResponse({'status': 'error', 'message': f'Payload inválido: {e}'}, status=400)
+
+        allowed_project_ids = set(self._assignable_projects(request.user).values_list('id', flat=True))
+        try:
+            diff = save_grid(timesheet, grid_data, allowed_project_ids, expected_version=version)
+        except StaleTimesheetError as e:
+            return JsonResponse({
+                'status': 'conflict',
+                'message': 'A folha foi alterada em outra sessão. Recarregue a página.',
+                'version': e.current_version,
+            }, status=409)
+
+        return JsonResponse({
+            'status': 'success',
+            'version': diff['version'],
+            'diff': {
+                'created': diff['created'],
+                'updated': diff['updated'],
+                'deleted': diff['deleted'],
+            },
+            'rejected_projects': diff['rejected_projects'],
+        })
+
+
 class TimeEntryListView(LoginRequiredMixin, ListView):
     model = TimeEntry
     template_name = 'timesheet/timeentry_list.html'
@@ -572,31 +558,12 @@ class ReportsDashboardView(LoginRequiredMixin, PermissionRequiredMixin, generic.
         context = super().get_context_data(**kwargs)
 
         # Filters
-        params = self.request.GET
-        start_date = params.get('start_date')
-        end_date = params.get('end_date')
-        status_filter = params.get('status')
-
-        def parse_date(val):
-            try:
-                return datetime.fromisoformat(val).date()
-            except Exception:
-                return None
-
-        start_date = parse_date(start_date)
-        end_date = parse_date(end_date)
-
-        ts_qs = Timesheet.objects.all()
-        te_qs = TimeEntry.objects.exclude(hours__isnull=True)
+        filters = parse_report_filters(self.request.GET)
+        start_date = filters['start_date']
+        end_date = filters['end_date']
+        status_filter = filters['status']
 
-        if start_date:
-            ts_qs = ts_qs.filter(start_date__gte=start_date)
-            te_qs = te_qs.filter(date__gte=start_date)
-        if end_date:
-            ts_qs = ts_qs.filter(end_date__lte=end_date)
-            te_qs = te_qs.filter(date__lte=end_date)
-        if status_filter:
-            ts_qs = ts_qs.filter(status=status_filter)
+        ts_qs = filtered_timesheets(filters)
 
         status_data = list(
             ts_qs.values('status')
@@ -604,33 +571,33 @@ class ReportsDashboardView(LoginRequiredMixin, PermissionRequiredMixin, generic.
             .order_by('status')
         )
 
-        monthly_hours = list(
-            te_qs
-            .annotate(month=TruncMonth('date'))
-            .values('month')
-            .annotate(total=Sum('hours'))
-            .order_by('month')
-        )
+        # Hours come from the weekly rollup instead of scanning TimeEntry
+        hours_by_month = sum_hours(start_date, end_date, by='month')
+        monthly_hours = [
+            {'month': month, 'total': total}
+            for month, total in sorted(hours_by_month.items())
+        ]
 
+        # Same GROUP BY status as the chart, no extra COUNT per status
+        by_status = {row['status']: row['total'] for row in status_data}
         approvals = {
-            'pending': ts_qs.filter(status=Timesheet.Status.SUBMITTED).count(),
-            'partial': ts_qs.filter(status=Timesheet.Status.PARTIALLY_APPROVED).count(),
-            'approved': ts_qs.filter(status=Timesheet.Status.APPROVED).count(),
-            'rejected': ts_qs.filter(status=Timesheet.Status.REJECTED).count(),
+            'pending': by_status.get(Timesheet.Status.SUBMITTED, 0),
+            'partial': by_status.get(Timesheet.Status.PARTIALLY_APPROVED, 0),
+            'approved': by_status.get(Timesheet.Status.APPROVED, 0),
+            'rejected': by_status.get(Timesheet.Status.REJECTED, 0),
         }
 
         # KPIs
         total_ts = sum([row['total'] for row in status_data]) if status_data else 0
-        hours_total = te_qs.aggregate(total=Sum('hours'))['total'] or 0
+        hours_total = sum(hours_by_month.values(), 0)
         months_count = len(monthly_hours) or 1
         avg_hours_per_month = hours_total / months_count if months_count else 0
 
-        top_users = list(
-            te_qs
-            .values('timesheet__user__username')
-            .annotate(total=Sum('hours'))
-            .order_by('-total')[:5]
-        )
+        hours_by_user = sum_hours(start_date, end_date, by='username')
+        top_users = [
+            {'timesheet__user__username': username, 'total': total}
+            for username, total in sorted(hours_by_user.items(), key=lambda item: item[1], reverse=True)[:5]
+        ]
 
         context.update({
             'status_data': json.dumps(status_data, default=str),
@@ -650,60 +617,62 @@ class ReportsDashboardView(LoginRequiredMixin, PermissionRequiredMixin, generic.
                 'start_date': start_date.isoformat() if start_date else '',
                 'end_date': end_date.isoformat() if end_date else '',
                 'status': status_filter or '',
-            }
+            },
         })
+        context['export_query'] = urlencode(context['filters'])
         return context
 
 
 class ReportsExportView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    """
+    Export timesheets (default) or, with ``?level=entries``, individual time entries.
+
+    CSV and XLSX are streamed from a server-side cursor so memory stays bounded
+    regardless of the number of rows; both honour the reports dashboard filters.
+    """
     permission_required = 'core.access_reports'
     raise_exception = True
 
     def get(self, request, *args, **kwargs):
         fmt = request.GET.get('format', 'csv').lower()
-        queryset = Timesheet.objects.select_related('user', 'approved_by')
-        rows = []
-        for ts in queryset:
-            rows.append([
-                ts.id,
-                ts.user.username,
-                ts.start_date,
-                ts.end_date,
-                ts.status,
-                ts.approved_by.username if ts.approved_by else '',
-                ts.created_at,
-                ts.updated_at,
-            ])
+        filters = parse_report_filters(request.GET)
+        entries = request.GET.get('level') == 'entries'
+        if entries:
+            header, rows, filename = ENTRY_HEADER, entry_rows(filters), 'reports_time_entries'
+        else:
+            header, rows, filename = TIMESHEET_HEADER, timesheet_rows(filters), 'reports_timesheets'
 
         if fmt == 'csv':
-            response = HttpResponse(content_type='text/csv')
-            response['Content-Disposition'] = 'attachment; filename="reports_timesheets.csv"'
-            writer = csv.writer(response)
-            writer.writerow(['ID', 'Usuário', 'Início', 'Fim', 'Status', 'Aprovado por', 'Criado em', 'Atualizado em'])
-            writer.writerows(rows)
+            response = StreamingHttpResponse(stream_csv(header, rows), content_type='text/csv')
+            response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
             return response
 
         if fmt == 'xlsx' and openpyxl:
-            wb = openpyxl.Workbook()
-            ws = wb.active
-            ws.append(['ID', 'Usuário', 'Início', 'Fim', 'Status', 'Aprovado por', 'Criado em', 'Atualizado em'])
-            for r in rows:
-                ws.append(r)
-            stream = BytesIO()
-            wb.save(stream)
-            response = HttpResponse(stream.getvalue(), content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-            response['Content-Disposition'] = 'attachment; filename="reports_timesheets.xlsx"'
-            return response
+            return FileResponse(
+                write_xlsx(header, rows, title='Relatório'),
+                as_attachment=True,
+                filename=f'{filename}.xlsx',
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            )
 
         if fmt == 'pdf' and canvas and letter:
             buffer = BytesIO()
             p = canvas.Canvas(buffer, pagesize=letter)
-            p.setTitle('Relatório de Timesheets')
-            p.drawString(50, 750, 'Relatório de Timesheets')
-            p.drawString(50, 730, f'Total registros: {len(rows)}')
+            if entries:
+                title, total = 'Relatório de Lançamentos', filtered_entries(filters).count()
+            else:
+                title, total = 'Relatório de Timesheets', filtered_timesheets(filters).count()
+            p.setTitle(title)
+            p.drawString(50, 750, title)
+            p.drawString(50, 730, f'Total registros: {total}')
             y = 700
-            for r in rows[:40]:
-                line = f"ID {r[0]} | {r[1]} | {r[2]} -> {r[3]} | {r[4]}"
+            # The PDF is a summary: only the first 40 rows are listed
+            for r in islice(rows, 40):
+                if entries:
+                    # Task, or the activity when the entry has none
+                    line = f"ID {r[0]} | {r[6]} | {r[2]} | {r[3]} | {r[4] or r[5]} | {r[7]}h"
+                else:
+                    line = f"ID {r[0]} | {r[1]} | {r[2]} -> {r[3]} | {r[4]}"
                 p.drawString(50, y, line)
                 y -= 15
                 if y < 50:
@@ -713,7 +682,7 @@ class ReportsExportView(LoginRequiredMixin, PermissionRequiredMixin, View):
             pdf = buffer.getvalue()
             buffer.close()
             response = HttpResponse(pdf, content_type='application/pdf')
-            response['Content-Disposition'] = 'attachment; filename="reports_timesheets.pdf"'
+            response['Content-Disposition'] = f'attachment; filename="{filename}.pdf"'
             return response
 
         return HttpResponse('Formato não suportado ou dependência ausente.', status=400)
@@ -2,6 +2,7 @@
 Django settings for erp_core project.
 """
 
+from decimal import Decimal
 from pathlib import Path
 import os
 from django.urls import reverse_lazy
@@ -80,7 +81,6 @@ TEMPLATES = [
                 'django.contrib.messages.context_processors.messages',
                 'apps.core.context_processors.module_access',
                 'apps.core.context_processors.admin_last_update',
-                'apps.core.context_processors.alert_notifications',
             ],
         },
     },
@@ -96,6 +96,36 @@ DATABASES = {
     )
 }
 
+# Cache shared by every worker: API throttling, apps.core.caching and the
+# per-user widgets. CACHE_BACKEND is 'file' (default; one directory shared by
+# the workers of a host), 'redis' or 'memcached' (need the redis/pymemcache
+# client installed) or 'locmem' (per process, development only).
+# CACHE_LOCATION is the directory or the server URL. Use redis or memcached in
+# production: every file-backend write (one per throttled API request) scans
+# the cache directory, and its incr is not atomic across workers.
+CACHE_BACKENDS = {
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR / '.cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+    'memcached': ('django.core.cache.backends.memcached.PyMemcacheCache', '127.0.0.1:11211'),
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'erp-core'),
+}
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'file')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': os.getenv('CACHE_LOCATION', CACHE_BACKENDS[CACHE_BACKEND][1]),
+        'KEY_PREFIX': os.getenv('CACHE_KEY_PREFIX', 'erp'),
+        'TIMEOUT': 300,
+    },
+}
+if CACHE_BACKEND in ('file', 'locmem'):
+    # Culling scans the whole store, so keep it well above the working set
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', '20000'))}
+# Hit/miss counters of apps.core.caching (`manage.py cache_stats`), kept per
+# process and added to the shared cache at most every CACHE_STATS_FLUSH_SECONDS
+CACHE_STATS = os.getenv('CACHE_STATS', 'True') == 'True'
+CACHE_STATS_FLUSH_SECONDS = int(os.getenv('CACHE_STATS_FLUSH_SECONDS', '60'))
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -311,11 +341,54 @@ LOGGING = {
     },
 }
 
+# Manifest with the code's last update shown on the admin index; written by
+# `manage.py write_build_manifest`. A refresh interval > 0 re-checks its mtime.
+BUILD_MANIFEST_PATH = Path(os.getenv('BUILD_MANIFEST_PATH', BASE_DIR / 'build_manifest.json'))
+BUILD_MANIFEST_REFRESH_SECONDS = int(os.getenv('BUILD_MANIFEST_REFRESH_SECONDS', '0'))
+
 # REST Framework settings
 REST_FRAMEWORK = {
     "DEFAULT_THROTTLE_CLASSES": ["apps.api.throttling.APIKeyRateThrottle"],
     "DEFAULT_THROTTLE_RATES": {"api": "100/min"},
     "DEFAULT_PERMISSION_CLASSES": [],
     "DEFAULT_AUTHENTICATION_CLASSES": [],
+    "DEFAULT_PAGINATION_CLASS": "apps.api.pagination.KeysetPagination",
+    "PAGE_SIZE": 100,
 }
+# Upper bound for ?page_size= on the v1 API (apps.api.pagination)
+API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', '1000'))
+# Change feed only serves log rows inserted more than this many seconds ago,
+# so rows from transactions that commit out of id order are not skipped by a
+# client's cursor. A heuristic: keep it above the longest transaction that
+# writes to the change log (irrelevant on SQLite, which serializes writers)
+CHANGE_FEED_LAG_SECONDS = int(os.getenv('CHANGE_FEED_LAG_SECONDS', '5'))
+
+# API key authentication cache (apps.api.authentication): per-process TTL and
+# optional shared tier (a CACHES alias; empty disables it)
+API_KEY_CACHE_TTL = int(os.getenv('API_KEY_CACHE_TTL', '30'))
+API_KEY_SHARED_CACHE = os.getenv('API_KEY_SHARED_CACHE', '') or None
+API_KEY_SHARED_CACHE_TTL = int(os.getenv('API_KEY_SHARED_CACHE_TTL', '300'))
+
+# API request log buffer (apps.api.logbuffer)
+API_LOG_BUFFER_SIZE = int(os.getenv('API_LOG_BUFFER_SIZE', '10000'))
+API_LOG_BATCH_SIZE = int(os.getenv('API_LOG_BATCH_SIZE', '200'))
+API_LOG_FLUSH_INTERVAL_MS = int(os.getenv('API_LOG_FLUSH_INTERVAL_MS', '1000'))
+# Fraction of 2xx requests that are logged; errors are always logged
+API_LOG_SAMPLE_RATE = float(os.getenv('API_LOG_SAMPLE_RATE', '1.0'))
+
+
+# Navbar search suggestions (apps.core.suggest): seconds before each process
+# reloads its in-memory prefix index to pick up other processes' changes
+SEARCH_SUGGEST_INDEX_TTL = int(os.getenv('SEARCH_SUGGEST_INDEX_TTL', '300'))
+# Most recent objects of each kind kept in that index; older ones are looked
+# up in the database when the index does not fill a suggestion group
+SEARCH_SUGGEST_INDEX_SIZE = int(os.getenv('SEARCH_SUGGEST_INDEX_SIZE', '5000'))
+
+# Issue/Ticket public_id allocation (apps.core.sequences): values each process
+# reserves per counter-row update on databases without native sequences.
+# Larger blocks mean fewer row locks but bigger numbering gaps on restart.
+PUBLIC_ID_BLOCK_SIZE = int(os.getenv('PUBLIC_ID_BLOCK_SIZE', '10'))
 
+# Project list budget burn (apps.projects.listing): cost of one logged hour,
+# in the project's currency. 0 leaves the burn column empty.
+PROJECT_HOURLY_COST = Decimal(os.getenv('PROJECT_HOURLY_COST', '0'))
@@ -146,67 +146,95 @@ document.addEventListener('DOMContentLoaded', function () {
         saveTimers.set(input, timer);
     }
 
-    function autoSaveField(input) {
-        // Visual feedback: saving state (optional, maybe distinct border?)
+    var cellsUrl = gridForm.dataset.cellsUrl;
+    var gridVersion = parseInt(gridForm.dataset.version) || 0;
+    // Cells changed since the last save, keyed by input name
+    var pendingCells = new Map();
+    var inFlight = null;
 
-        var formData = new FormData();
-        formData.append('action', 'save_grid');
-        formData.append('csrfmiddlewaretoken', csrftoken);
-        // Enviar valor cru; string vazia significa excluir registro
-        formData.append(input.name, input.value);
+    function cellFromInput(input) {
+        // Format: hours_{proj}_{task}_{act}_{date}
+        var parts = input.name.split('_');
+        return {
+            project: parts[1],
+            task: parts[2] === 'None' ? null : parts[2],
+            activity: parts[3] === 'None' ? null : parts[3],
+            date: parts[4],
+            // Enviar valor cru; string vazia significa excluir registro
+            hours: input.value
+        };
+    }
 
-        var actionUrl = gridForm.getAttribute('action');
-        fetch(actionUrl, {
-            method: 'POST',
-            body: formData,
-            headers: {
-                'X-CSRFToken': csrftoken
-            }
-        }).then(function (response) {
-            if (response.ok) {
-                console.log('Auto-saved:', input.name, input.value);
-                // Success feedback
-                input.classList.remove('is-invalid');
-                input.classList.add('is-valid');
+    function markInputs(names, cssClass) {
+        names.forEach(function (name) {
+            var input = gridForm.querySelector('input[name="' + name + '"]');
+            if (!input) return;
+            input.classList.remove('is-valid', 'is-invalid');
+            input.classList.add(cssClass);
+            if (cssClass === 'is-valid') {
                 // Remove success class after 2 seconds
                 setTimeout(function () {
                     input.classList.remove('is-valid');
                 }, 2000);
-            } else {
-                console.error('Auto-save failed:', response.status);
-                // Error feedback
-                input.classList.remove('is-valid');
-                input.classList.add('is-invalid');
             }
+        });
+    }
+
+    function flushPending() {
+        if (inFlight) {
+            // Chain after the running request; it will pick up the new cells
+            return inFlight.then(flushPending);
+        }
+        if (pendingCells.size === 0) {
+            return Promise.resolve();
+        }
+
+        var names = Array.from(pendingCells.keys());
+        var cells = Array.from(pendingCells.values());
+        pendingCells.clear();
+
+        inFlight = fetch(cellsUrl, {
+            method: 'POST',
+            body: JSON.stringify({ version: gridVersion, cells: cells }),
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': csrftoken
+            }
+        }).then(function (response) {
+            return response.json().then(function (data) {
+                if (response.ok) {
+                    gridVersion = data.version;
+                    markInputs(names, 'is-valid');
+                } else if (response.status === 409) {
+                    markInputs(names, 'is-invalid');
+                    alert(data.message);
+                    window.location.reload();
+                } else {
+                    console.error('Auto-save failed:', response.status, data.message);
+                    markInputs(names, 'is-invalid');
+                }
+            });
         }).catch(function (error) {
             console.error('Auto-save error:', error);
-            // Error feedback
-            input.classList.remove('is-valid');
-            input.classList.add('is-invalid');
+            markInputs(names, 'is-invalid');
+        }).then(function () {
+            inFlight = null;
         });
+        return inFlight.then(flushPending);
+    }
+
+    function autoSaveField(input) {
+        pendingCells.set(input.name, cellFromInput(input));
+        return flushPending();
     }
 
     function saveAllFields() {
-        var promises = [];
-        var actionUrl = gridForm.getAttribute('action');
-        inputs.forEach(function (input) {
-            if (input.value && parseFloat(input.value) > 0) {
-                var formData = new FormData();
-                formData.append('action', 'save_grid');
-                formData.append('csrfmiddlewaretoken', csrftoken);
-                formData.append(input.name, input.value);
-
-                var promise = fetch(actionUrl, {
-                    method: 'POST',
-                    body: formData,
-                    headers: {
-                        'X-CSRFToken': csrftoken
-                    }
-                });
-                promises.push(promise);
-            }
+        saveTimers.forEach(function (timer, input) {
+            clearTimeout(timer);
+            pendingCells.set(input.name, cellFromInput(input));
         });
-        return Promise.all(promises);
+        saveTimers.clear();
+        return flushPending();
     }
 
     // Attach to add row modal form